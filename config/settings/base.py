@@ -129,7 +129,9 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 
-MAX_UPLOAD_SIZE = 5242880
+# 업로드 파일 제한 (pybo/upload_handlers.py에서 업로드 중에 검사)
+MAX_UPLOAD_SIZE = 5242880  # 파일 1개의 최대 크기 (5MB), 넘으면 받는 도중 중단
+MAX_UPLOAD_PIXELS = 50 * 1000 * 1000  # 이미지 1개의 최대 픽셀 수 (헤더로 확인)
 
 ALLOWED_FILE_TYPES=[
 
@@ -142,6 +144,42 @@ ALLOWED_FILE_TYPES=[
 
 ]
 
+# 업로드 핸들러는 장고 기본값을 사용하고, 이미지를 올리는 질문/답변 뷰에서만
+# 검증 핸들러(pybo.upload_handlers.ImageUploadHandler)를 맨 앞에 추가하여 크기/형식 검사를 먼저 수행
+
+# 조회수 설정
+VIEW_COUNT_DEDUPE_WINDOW = 60 * 30  # 같은 세션의 재조회를 무시하는 시간(초)
+VIEW_COUNT_FLUSH_INTERVAL = 10  # 누적된 조회수를 DB에 반영하는 주기(초)
+VIEW_COUNT_MAX_PENDING = 100  # 이 개수만큼 쌓이면 주기와 상관없이 반영
+
+# 캐시 설정
+# 외부 서비스 없이 동작하도록 로컬 메모리 캐시를 사용 (프로세스마다 별도의 캐시)
+# 로컬 메모리 캐시에서는 한 워커의 캐시 무효화(pybo/signals.py)가 다른 워커에 전달되지 않아
+# 다른 워커는 PAGE_CACHE_TIMEOUT 동안 이전 페이지를 보여줄 수 있다.
+# 여러 워커(WEB_CONCURRENCY > 1)가 캐시를 공유해야 하면 'django.core.cache.backends.filebased.FileBasedCache'로 바꾸고
+# LOCATION에 디렉터리 경로를 지정한다.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pybo',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+PAGE_CACHE_TIMEOUT = 60 * 10  # 질문 목록 페이지 및 상세 조각 캐시 유지 시간(초)
+
+# 마크다운 렌더링 캐시에 보관할 본문 수 (pybo/markdown_cache.py)
+MARKDOWN_CACHE_SIZE = 2048
+
+# 질문 이미지의 지각 해시(dHash)로 비슷한 이미지 찾기 (pybo/image_hash.py)
+# 해밍 거리가 max_distance 이하이면 같은 사진(크기 변경, 재압축 등)으로 보고 원본 질문의 분석 결과를 재사용
+# max_candidates: 한 번에 비교할 최대 후보 수 (해시 값이 한쪽에 몰린 경우 대비)
+IMAGE_HASH = {
+    'max_distance': 6,
+    'max_candidates': 2000,
+}
+
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static', # static 디렉터리를 추가
@@ -220,4 +258,101 @@ LOGGING = {
             'level': 'INFO',
         },
     }
-}
\ No newline at end of file
+}
+# AI 결과 이미지 인코딩 설정 (pybo/ai_system/result_encoder.py의 DEFAULT_ENCODING을 덮어씀)
+# format: 'jpeg', 'webp', 'png' / 바꾸면 결과 파일 이름도 바뀌어 이전 결과를 재사용하지 않음
+AI_RESULT_ENCODING = {
+    'format': 'jpeg',
+    'jpeg_quality': 85,
+    'jpeg_progressive': True,
+    'background': False,  # True이면 응답을 기다리지 않고 백그라운드 스레드에서 인코딩/저장
+}
+
+# AI 얼굴 탐지 타일링 설정 (pybo/ai_system/ai_system.py의 FaceDetectors)
+# 긴 변이 tile_size보다 큰 이미지는 tile_overlap만큼 겹치는 타일로 나누어 탐지 (None이면 끔)
+# 탐지기의 작업 메모리는 타일 크기에 비례하고, 디코딩한 원본 배열(픽셀당 3바이트)은 이미지 크기만큼 한 번 보관함
+AI_DETECTION_TILING = {
+    'tile_size': 2048,
+    'tile_overlap': 256,  # 가장 큰 얼굴보다 크게
+    'parallel': True,  # 탐지기마다 별도 스레드
+}
+
+# AI 탐지기 캐스케이드 기준 (질문 등록 시 '빠른 탐지' 방식을 선택한 경우, pybo/ai_system/cascade.py의 CascadePolicy)
+# 탐지기별 신뢰도 기준은 보정된 값이 아닌 기본값이므로, /ai/status/의 cascade 통계를 보고 'low_confidence'로 조정
+AI_CASCADE_POLICY = {
+    'min_confidence': None,  # None이면 탐지기별 기준 사용
+    'low_confidence': {},  # 탐지기별 기준 덮어쓰기, 예: {'DlibFaceDetector': 0.3}
+    'min_face_size': 24,  # 이보다 작은 얼굴이 있으면 다음 탐지기 실행
+    'count_tolerance': 0.2,  # 이전 탐지기와 검출 수가 이 비율 이상 다르면 다음 탐지기 실행
+}
+
+# AI 추론 스레드 수 (torch, OpenCV, TensorFlow, OpenMP/MKL에 한 번에 적용, pybo/ai_system/runtime.py)
+# None이면 (사용 가능한 코어 수 / WEB_CONCURRENCY 워커 수)로 정함
+AI_NUM_THREADS = None
+
+# AI 추론 서버 (manage.py inference_server, pybo/ai_system/inference_server.py)
+# 서버가 실행 중이면 워커는 모델을 로드하지 않고 소켓으로 분석을 요청하며, 연결할 수 없으면 프로세스 내에서 추론
+# socket이 None이면 항상 프로세스 내에서 추론
+AI_INFERENCE_SERVER = {
+    'socket': os.environ.get('PYBO_INFERENCE_SOCKET', os.path.join(BASE_DIR, 'run', 'inference.sock')),
+    'timeout': 60,  # 응답 대기 시간(초), 초과하면 프로세스 내 추론으로 대체
+    'retry_interval': 10,  # 연결 실패 후 다시 연결을 시도하기까지의 시간(초)
+    'frame_ring_size': 64 * 1024 * 1024,  # 디코딩된 프레임을 서버에 공유 메모리로 넘기는 워커별 링 버퍼 크기 (None이면 이미지 바이트 전송)
+    'max_batch': 8,  # 서버가 한 번에 처리할 최대 요청 수
+    'max_wait_ms': 5,  # 서버가 첫 요청 후 다른 요청을 기다리는 최대 시간(ms)
+    'max_queue': 64,  # 서버의 대기 요청이 이 수를 넘으면 거절 (워커는 질문을 저장하고 분석을 미룸, 응답은 정상)
+}
+
+# AI 마이크로 배치 (프로세스 내 추론, pybo/ai_system/micro_batcher.py)
+# 동시에 처리 중인 요청들의 얼굴을 max_wait_ms 동안 또는 max_batch개까지 모아 FairFace를 한 번에 실행 (None이면 끔)
+AI_MICRO_BATCHING = {
+    'max_batch': 32,
+    'max_wait_ms': 5,
+}
+
+# AI 분석 작업 스케줄러 (워커 프로세스별, pybo/ai_system/scheduler.py)
+# 작업 클래스(질문 등록 'interactive', 다시 분석 'bulk', 채우기 'backfill')의 가중치와 사용자별 공정 순서로 실행
+# 대기 작업이 max_depth개를 넘으면 질문은 저장하고 분석을 미룸 (AI 답변에 지연 안내, reanalyze_images --priority backfill로 처리)
+# 429(Retry-After) 응답은 사용자 작업이 user_quota개를 넘은 경우에만 (부하는 HTTP가 아닌 AI_ADMISSION의 축소/지연으로 조절)
+AI_ANALYSIS_SCHEDULER = {
+    'concurrency': 2,  # 워커 프로세스에서 동시에 실행하는 분석 작업 수
+    'max_depth': 16,
+    'user_quota': 4,  # 사용자별 대기 + 실행 중인 작업 수
+    'weights': {'interactive': 8, 'bulk': 2, 'backfill': 1},
+    'max_wait': 120,  # 실행 차례를 기다리는 최대 시간(초)
+}
+
+# AI 분석 수락 제어 (질문 등록, pybo/ai_system/admission.py)
+# 처리 중인 분석의 예상 비용 합계가 budget을 넘으면 가장 빠른 탐지기만 사용 -> FairFace 생략 -> 분석 지연 순으로 줄임
+# 비용: reference_pixels 크기 이미지 기준 yolo 1, mtcnn 2, dlib 3, fairface 1 (큰 이미지는 픽셀 수에 비례)
+AI_ADMISSION = {
+    'budget': 12,
+    'reference_pixels': 2_000_000,
+}
+
+# AI 결과 이미지 렌더링 (pybo/render_cache.py, 결과 이미지 뷰 ai_views.analysis_image)
+# on_demand가 True이면 분석할 때 결과 이미지를 파일로 저장하지 않고, 원본과 저장된 분석 결과로 요청 시 그려서 제공
+# 그린 이미지는 워커 프로세스별로 cache_bytes까지 메모리에 보관
+AI_RESULT_RENDERING = {
+    'on_demand': True,
+    'cache_bytes': 64 * 1024 * 1024,
+}
+
+# AI 얼굴 인코딩 저장소 (pybo/face_analysis.py의 load_face_embeddings, FaceEmbedding 모델)
+# 계산한 얼굴 인코딩을 이미지 해시 + quantum 픽셀 단위로 양자화한 박스로 저장하고, 같은 이미지를 다른 탐지기/예측기로
+# 다시 분석할 때 박스 좌표가 모두 tolerance칸 이내이면 재사용 (None이면 끔)
+AI_FACE_EMBEDDINGS = {
+    'quantum': 8,
+    'tolerance': 1,
+}
+
+# AI 얼굴 검색 (결과 이미지에서 얼굴을 클릭하면 같은 사람이 있는 질문을 찾음, pybo/face_search.py)
+# 저장된 얼굴 인코딩으로 워커 프로세스마다 IVF 인덱스를 만들고 새 인코딩은 검색할 때 추가
+# 설정하면 예측기 없이 탐지만 한 분석도 얼굴마다 인코딩을 계산해 저장 (None이면 검색하지 않음)
+# nprobe: 검색할 때 비교할 목록 수 (목록 수는 sqrt(얼굴 수)) / max_distance: 같은 사람으로 보는 최대 거리
+AI_FACE_SEARCH = {
+    'nprobe': 8,
+    'min_train': 1024,
+    'max_distance': 0.5,
+    'results': 20,
+}
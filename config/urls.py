@@ -15,7 +15,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import include, path
-from pybo.views import base_views
+from pybo.views import base_views, media_views
 from django.conf.urls.static import static
 from django.conf import settings
 
@@ -28,4 +28,4 @@ urlpatterns = [
 ]
 
 handler404 = 'common.views.page_not_found'
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) # MEDIA_URL로 시작하는 URL은 MEDIA_ROOT에서 파일을 찾아 반환
\ No newline at end of file
+urlpatterns += static(settings.MEDIA_URL, view=media_views.serve_media, document_root=settings.MEDIA_ROOT) # MEDIA_URL로 시작하는 URL은 MEDIA_ROOT에서 파일을 찾아 반환 (ETag, Cache-Control 포함)
\ No newline at end of file
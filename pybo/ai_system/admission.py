@@ -0,0 +1,153 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+#
+# =========================
+# AI 분석 수락 제어 (부하에 따른 단계적 축소)
+# =========================
+# 처리 중인 분석 작업의 예상 비용 합계가 budget을 넘지 않도록, 새 요청을 아래 순서로 줄여서 받는다.
+#   full               선택한 탐지기/예측기를 모두 사용
+#   cheapest_detector  선택한 탐지기 중 가장 빠른 탐지기 하나만 사용
+#   skip_predictors    가장 빠른 탐지기 하나만 사용하고 FairFace 예측은 건너뜀
+#   deferred           지금은 분석하지 않음 (manage.py reanalyze_images --priority backfill로 나중에 처리)
+# 질문은 항상 저장되며, 축소된 방식은 자동 답변에 기록된다.
+#
+# 탐지기별 상대 비용 (ai_system.py의 *FaceDetector.COST와 같은 값, 이 모듈은 모델 라이브러리를 import하지 않음)
+DETECTOR_COSTS = {'yolo': 1, 'mtcnn': 2, 'dlib': 3}
+# 예측기별 상대 비용 (얼굴 크롭 배치 추론이라 이미지 크기와 무관)
+PREDICTOR_COSTS = {'fairface': 1}
+#
+MODES = ('full', 'cheapest_detector', 'skip_predictors', 'deferred')
+#
+#
+def estimate_cost(pixels, detectors, predictors, reference_pixels=2_000_000):
+    """
+    분석 비용 추정: 탐지 비용은 이미지 픽셀 수에 비례 (reference_pixels 이하이면 1배), 예측 비용은 고정
+
+    예) 1920x1080 이미지를 yolo로 탐지 = 1, dlib+yolo+mtcnn + fairface = 7
+    """
+    scale = max(1.0, (pixels or 0) / reference_pixels)
+    return scale * sum(DETECTOR_COSTS.get(name, 1) for name in detectors) + sum(PREDICTOR_COSTS.get(name, 1) for name in predictors)
+    #
+#
+class Admission:
+    """수락된 분석 요청 하나 (with 블록이 끝나면 예약한 비용을 반환)"""
+    def __init__(self, controller, mode, detectors, predictors, cost):
+        self.controller = controller
+        self.mode = mode
+        self.detectors = detectors
+        self.predictors = predictors
+        self.cost = cost
+        self._released = False
+        #
+    #
+    @property
+    def deferred(self):
+        return self.mode == 'deferred'
+        #
+    #
+    @property
+    def note(self):
+        """자동 답변에 덧붙일 축소 안내 (full이면 빈 문자열)"""
+        if self.mode == 'cheapest_detector':
+            return f"AI 분석 요청이 많아 가장 빠른 탐지기({self.detectors[0]})만 사용했습니다."
+        if self.mode == 'skip_predictors':
+            return f"AI 분석 요청이 많아 가장 빠른 탐지기({self.detectors[0]})만 사용하고 인종/성별 예측은 건너뛰었습니다."
+        if self.mode == 'deferred':
+            return "AI 분석 요청이 많아 분석을 미뤘습니다. 결과 이미지는 나중에 추가됩니다."
+            #
+        #
+        return ""
+        #
+    #
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self.cost)
+            #
+        #
+    #
+    def __enter__(self):
+        return self
+        #
+    #
+    def __exit__(self, *exc_info):
+        self.release()
+        #
+    #
+#
+class AdmissionController:
+    """
+    처리 중인 분석 작업의 예상 비용 합계(in_flight)를 추적하고, 새 요청을 budget 안에 들어가는 가장 높은 단계로 수락
+
+    처리 중인 작업이 없으면 비용과 관계없이 full로 수락한다 (큰 이미지 하나가 항상 미뤄지지 않도록).
+    """
+    def __init__(self, budget=12, reference_pixels=2_000_000):
+        self.budget = budget
+        self.reference_pixels = reference_pixels
+        self._lock = threading.Lock()
+        self.in_flight = 0.0
+        self.modes = Counter()
+        #
+    #
+    @classmethod
+    def from_settings(cls):
+        return cls(**(getattr(settings, 'AI_ADMISSION', None) or {}))
+        #
+    #
+    def plans(self, detectors, predictors):
+        """(단계, 탐지기, 예측기) 후보를 비용이 큰 순서로 반환"""
+        detectors, predictors = list(detectors), list(predictors)
+        cheapest = sorted(detectors, key=lambda name: DETECTOR_COSTS.get(name, 1))[:1]
+        plans = [('full', detectors, predictors)]
+        if len(detectors) > 1:
+            plans.append(('cheapest_detector', cheapest, predictors))
+            #
+        #
+        if predictors and cheapest:
+            plans.append(('skip_predictors', cheapest, []))
+            #
+        #
+        return plans
+        #
+    #
+    def admit(self, pixels, detectors, predictors, force=None):
+        """
+        요청을 수락하고 Admission을 반환 (예약한 비용은 Admission.release() 또는 with 블록이 끝날 때 반환)
+
+        force='deferred'이면 비용과 관계없이 분석을 미룬다 (스케줄러 대기열이 가득 찬 경우 등).
+        """
+        with self._lock:
+            if force != 'deferred':
+                for mode, plan_detectors, plan_predictors in self.plans(detectors, predictors):
+                    cost = estimate_cost(pixels, plan_detectors, plan_predictors, self.reference_pixels)
+                    if self.in_flight == 0 or self.in_flight + cost <= self.budget:
+                        self.in_flight += cost
+                        self.modes[mode] += 1
+                        return Admission(self, mode, plan_detectors, plan_predictors, cost)
+                        #
+                    #
+                #
+            #
+            self.modes['deferred'] += 1
+            return Admission(self, 'deferred', [], [], 0.0)
+            #
+        #
+    #
+    def _release(self, cost):
+        with self._lock:
+            self.in_flight = max(0.0, self.in_flight - cost)
+            #
+        #
+    #
+    def snapshot(self):
+        with self._lock:
+            return {'in_flight': self.in_flight, 'budget': self.budget, 'modes': {mode: self.modes[mode] for mode in MODES}}
+            #
+        #
+    #
+#
+# 프로세스당 하나의 수락 제어기 (질문 등록 요청)
+admission_controller = AdmissionController.from_settings()
+#
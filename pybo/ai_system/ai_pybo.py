@@ -1,7 +1,3 @@
-import logging  # 로그 출력을 위한 모듈
-import cv2  # OpenCV를 사용하여 이미지 처리
-import os  # 파일 경로 처리 및 시스템 관련 작업을 위한 모듈
-#
 from .ai_system import setup_django_system  # AI 시스템 설정을 위한 데코레이터 가져오기
 
 # ===============================
@@ -13,7 +9,7 @@ def start_ai(request, image_path, face_recognition_system, target_encodings, sel
     AI 얼굴 인식 시스템을 시작하는 함수입니다.
     
     이 함수는 이미지 경로를 받아 얼굴 인식 시스템을 이용하여 이미지를 처리하고,
-    처리된 결과 이미지 경로를 반환합니다.
+    처리된 결과 이미지 경로와 분석 결과를 반환합니다.
     
     Args:
         request: Django의 HTTP 요청 객체
@@ -24,13 +20,14 @@ def start_ai(request, image_path, face_recognition_system, target_encodings, sel
         selected_predictors: 사용자가 선택한 예측기 목록
     
     Returns:
-        str: 처리된 이미지의 출력 경로
+        tuple: (처리된 이미지의 출력 경로, 분석 결과 FaceAnalysis)
+               결과 이미지를 요청 시 그리는 설정이면 출력 경로는 None, 실패하면 둘 다 None
     """
     
     # 얼굴 인식 시스템을 사용하여 이미지를 처리하고, 결과 이미지의 경로를 받음
     output_path = face_recognition_system.process_image(image_path, target_encodings)
     
-    # 처리된 이미지의 경로를 반환
-    return output_path
+    # 처리된 이미지의 경로와 분석 결과를 반환
+    return output_path, face_recognition_system.face_analysis
     #
 #
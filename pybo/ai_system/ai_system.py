@@ -1,22 +1,31 @@
 import logging
 import os
 import cv2
-import dlib
-import torch
-import torch.nn as nn
 import numpy as np
 import pickle
-import face_recognition
 from PIL import Image, ImageDraw, ImageFont
-from torchvision import models, transforms
-from ultralytics import YOLO
-from mtcnn import MTCNN
 import piexif
 from abc import ABC, abstractmethod
 import io
-import shutil
+import hashlib
+import tempfile
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import warnings
+from django.conf import settings
+from .result_encoder import ResultEncoder
+from .model_registry import model_registry
+from .runtime import apply_torch_threads
+from .inference_client import InferenceClient, InferenceUnavailable
+from .micro_batcher import MicroBatcher
+from .frame_transport import FrameRing, FrameTooLarge, iter_shared_frames
+from .scheduler import SchedulerBusy
+from .cascade import CascadePolicy, cascade_stats
+#
+# dlib, torch, torchvision, ultralytics, mtcnn(TensorFlow), face_recognition은 import만으로
+# 수 초와 수백 MB를 사용하므로, 해당 탐지기/예측기를 처음 생성하거나 사용할 때 import한다.
 #
 # =========================
 # 로깅 및 경고 설정
@@ -49,6 +58,100 @@ def resize_image_with_padding(image, target_size):
     return new_img, scale, top, left
     #
 #
+# FairFace 입력 크기와 너무 작아 예측하지 않는 얼굴의 최소 크기(픽셀)
+FACE_INPUT_SIZE = 224
+FACE_MIN_SIZE = 8
+#
+def clamp_face_box(face, width, height, margin=0.0):
+    """얼굴 좌표(x, y, x2, y2)를 이미지 범위 안으로 자르는 함수 (margin: 박스 크기 대비 확장 비율)"""
+    x, y, x2, y2 = (int(v) for v in face)
+    if margin:
+        dx, dy = int((x2 - x) * margin), int((y2 - y) * margin)
+        x, y, x2, y2 = x - dx, y - dy, x2 + dx, y2 + dy
+        #
+    #
+    return max(0, min(x, width)), max(0, min(y, height)), max(0, min(x2, width)), max(0, min(y2, height))
+    #
+#
+def extract_face_crops(image_rgb, faces, margin=0.0, min_size=FACE_MIN_SIZE):
+    """
+    얼굴 영역을 잘라내는 함수
+
+    탐지기 좌표는 이미지 밖(MTCNN의 음수 좌표 등)일 수 있으므로 이미지 범위로 자른 뒤,
+    min_size보다 작은 얼굴은 제외한다. 잘라낸 얼굴은 복사하지 않은 NumPy 뷰로 반환한다.
+
+    Returns:
+        boxes: 이미지 범위로 자른 얼굴 좌표 목록 (그리기/인코딩용, margin 미적용)
+        crops: margin을 적용한 얼굴 이미지 뷰 목록 (boxes와 같은 순서)
+        rejected: 제외된 얼굴 수
+    """
+    height, width = image_rgb.shape[:2]
+    boxes, crops = [], []
+    for face in faces:
+        box = clamp_face_box(face, width, height)
+        x, y, x2, y2 = box
+        if x2 - x < min_size or y2 - y < min_size:
+            continue
+            #
+        #
+        cx, cy, cx2, cy2 = clamp_face_box(face, width, height, margin) if margin else box
+        boxes.append(box)
+        crops.append(image_rgb[cy:cy2, cx:cx2]) # 슬라이싱은 복사 없이 뷰를 반환
+        #
+    #
+    return boxes, crops, len(faces) - len(boxes)
+    #
+#
+def resize_crops(crops, size=FACE_INPUT_SIZE):
+    """얼굴 이미지들을 size x size로 리사이즈해 하나의 (N, size, size, 3) uint8 배열로 반환"""
+    batch = np.empty((len(crops), size, size, 3), dtype=np.uint8) # 배치 배열을 한 번만 할당
+    for i, crop in enumerate(crops):
+        cv2.resize(crop, (size, size), dst=batch[i], interpolation=cv2.INTER_LINEAR) # 배치 배열에 바로 기록
+        #
+    #
+    return batch
+    #
+#
+def decode_image_rgb(data):
+    """인코딩된 이미지 바이트(JPEG/PNG 등)를 RGB 배열로 디코딩하는 함수 (cv2.imread와 같은 결과)"""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("이미지를 디코딩할 수 없습니다.")
+        #
+    #
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image) # 제자리 변환 (원본 크기의 배열을 하나만 사용)
+    #
+#
+def read_image_rgb(image_path):
+    """이미지 파일을 RGB 배열로 읽는 함수 (읽을 수 없으면 ValueError)"""
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"이미지를 읽을 수 없습니다: {image_path}")
+        #
+    #
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image) # 제자리 변환 (원본 크기의 배열을 하나만 사용)
+    #
+#
+def iter_tiles(height, width, tile_size, overlap):
+    """이미지를 overlap만큼 겹치는 tile_size 크기의 타일 좌표(x0, y0, x1, y1)로 나누는 함수 (마지막 타일은 가장자리에 맞춤)"""
+    step = max(1, tile_size - overlap)
+    #
+    def starts(length):
+        positions = list(range(0, max(length - tile_size, 0) + 1, step))
+        if positions[-1] + tile_size < length:
+            positions.append(length - tile_size)
+            #
+        #
+        return positions
+        #
+    #
+    for y0 in starts(height):
+        for x0 in starts(width):
+            yield x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height)
+            #
+        #
+    #
+#
 def draw_korean_text(config, image, text, position, font_size, font_color=(255, 255, 255), background_color=(0, 0, 0)):
     """이미지에 한글 텍스트를 그리는 함수"""
     #
@@ -119,63 +222,133 @@ def extend_image_with_text(config, image, text, font_size, font_color=(255, 255,
     return np.array(extended_image_pil)
     #
 #
-def copy_image_and_add_metadata(image_path, output_folder):
-    """ 이미지 복사 및 메타데이터 추가 함수 """
-    # 출력 폴더 생성
-    os.makedirs(output_folder, exist_ok=True)
-    # output_folder 경로에 이미지 복사
-    shutil.copy(image_path, output_folder)
-    # 복사된 이미지 경로
-    copied_image_path = os.path.join(output_folder, os.path.basename(image_path))
+# 분석한 원본 이미지에 기록하는 EXIF 메타데이터
+EXIF_ZEROTH_IFD = {
+    piexif.ImageIFD.Make: u"oldcamera",
+    piexif.ImageIFD.XResolution: (96, 1),
+    piexif.ImageIFD.YResolution: (96, 1),
+    piexif.ImageIFD.Software: u"piexif",
+    piexif.ImageIFD.Artist: u"0!code",
+}
+#
+EXIF_EXIF_IFD = {
+    piexif.ExifIFD.DateTimeOriginal: u"2099:09:29 10:10:10",
+    piexif.ExifIFD.LensMake: u"LensMake",
+    piexif.ExifIFD.Sharpness: 65535,
+    piexif.ExifIFD.LensSpecification: ((1, 1), (1, 1), (1, 1), (1, 1)),
+}
+#
+EXIF_GPS_IFD = {
+    piexif.GPSIFD.GPSVersionID: (2, 0, 0, 0),
+    piexif.GPSIFD.GPSAltitudeRef: 1,
+    piexif.GPSIFD.GPSDateStamp: u"1999:99:99 99:99:99",
+}
+#
+EXIF_FIRST_IFD = {
+    piexif.ImageIFD.Make: u"oldcamera",
+    piexif.ImageIFD.XResolution: (40, 1),
+    piexif.ImageIFD.YResolution: (40, 1),
+    piexif.ImageIFD.Software: u"piexif"
+}
+#
+def make_exif_thumbnail(image_rgb, size=50):
+    """이미 디코딩된 RGB 배열로 EXIF 썸네일(JPEG 바이트)을 만드는 함수"""
+    h, w = image_rgb.shape[:2]
+    scale = min(size / w, size / h, 1.0)
+    thumb = cv2.resize(image_rgb, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', cv2.cvtColor(thumb, cv2.COLOR_RGB2BGR))
+    return buffer.tobytes() if ok else None
     #
-    # 복사된 이미지 연 후 메타데이터 추가
-    with Image.open(copied_image_path) as meta_im:
-        if meta_im.mode == 'RGBA':
-            meta_im = meta_im.convert('RGB')
-            #
-        #
-        thumb_im = meta_im.copy()
-        o = io.BytesIO()
-        thumb_im.thumbnail((50, 50), Image.Resampling.LANCZOS)
-        thumb_im.save(o, "jpeg")
-        thumbnail = o.getvalue()
+#
+def build_exif_bytes(thumbnail=None):
+    """EXIF 메타데이터를 바이트로 만드는 함수"""
+    exif_dict = {"0th": EXIF_ZEROTH_IFD, "Exif": EXIF_EXIF_IFD, "GPS": EXIF_GPS_IFD}
+    if thumbnail:
+        exif_dict.update({"1st": EXIF_FIRST_IFD, "thumbnail": thumbnail})
         #
-        zeroth_ifd = {
-            piexif.ImageIFD.Make: u"oldcamera",
-            piexif.ImageIFD.XResolution: (96, 1),
-            piexif.ImageIFD.YResolution: (96, 1),
-            piexif.ImageIFD.Software: u"piexif",
-            piexif.ImageIFD.Artist: u"0!code",
-        }
+    #
+    return piexif.dump(exif_dict)
+    #
+#
+def copy_image_and_add_metadata(image_path, output_folder, image_rgb=None):
+    """
+    이미지 복사 및 메타데이터 추가 함수
+
+    원본 파일을 한 번 읽고, 결과 파일을 한 번만 씀
+    - JPEG: 픽셀을 다시 인코딩하지 않고 EXIF 세그먼트만 바이트 스트림에 삽입 (piexif.insert)
+    - 그 외(PNG 등): piexif로 삽입할 수 없으므로 PIL로 EXIF와 함께 한 번 저장
+    썸네일은 이미 디코딩된 image_rgb로 만들고, 없을 때만 읽어 둔 바이트를 디코딩함
+    """
+    with open(image_path, 'rb') as f:
+        source = f.read()
         #
-        exif_ifd = {
-            piexif.ExifIFD.DateTimeOriginal: u"2099:09:29 10:10:10",
-            piexif.ExifIFD.LensMake: u"LensMake",
-            piexif.ExifIFD.Sharpness: 65535,
-            piexif.ExifIFD.LensSpecification: ((1, 1), (1, 1), (1, 1), (1, 1)),
-        }
+    #
+    if image_rgb is None:
+        image_rgb = cv2.cvtColor(cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
         #
-        gps_ifd = {
-            piexif.GPSIFD.GPSVersionID: (2, 0, 0, 0),
-            piexif.GPSIFD.GPSAltitudeRef: 1,
-            piexif.GPSIFD.GPSDateStamp: u"1999:99:99 99:99:99",
-        }
+    #
+    exif_bytes = build_exif_bytes(make_exif_thumbnail(image_rgb))
+    #
+    output = io.BytesIO()
+    if source[:3] == b'\xff\xd8\xff': # JPEG
+        piexif.insert(exif_bytes, source, output)
+    else:
+        with Image.open(io.BytesIO(source)) as meta_im:
+            if meta_im.mode == 'RGBA':
+                meta_im = meta_im.convert('RGB')
+                #
+            #
+            meta_im.save(output, format=meta_im.format or 'PNG', exif=exif_bytes)
+            #
         #
-        first_ifd = {
-            piexif.ImageIFD.Make: u"oldcamera",
-            piexif.ImageIFD.XResolution: (40, 1),
-            piexif.ImageIFD.YResolution: (40, 1),
-            piexif.ImageIFD.Software: u"piexif"
-        }
+    #
+    copied_image_path = os.path.join(output_folder, os.path.basename(image_path))
+    write_bytes_atomic(copied_image_path, output.getvalue()) # 출력 폴더 생성 후 한 번만 저장
+    logging.info(f"이미지가 저장되었습니다. {copied_image_path}")
+    return copied_image_path
+    #
+#
+def file_sha256(image_path, extra=b''):
+    """ 파일 내용(+ 추가 바이트)의 SHA-256 해시를 스트리밍으로 계산하는 함수 """
+    hasher = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            hasher.update(chunk)
+            #
         #
-        exif_dict = {"0th": zeroth_ifd, "Exif": exif_ifd, "GPS": gps_ifd, "1st": first_ifd, "thumbnail": thumbnail}
-        exif_bytes = piexif.dump(exif_dict)
+    hasher.update(extra)
+    return hasher.hexdigest()
+    #
+#
+def write_bytes_atomic(output_path, data):
+    """ 같은 폴더의 임시 파일에 쓴 뒤 이름을 바꿔, 쓰는 도중의 파일이 보이지 않게 저장하는 함수 """
+    output_folder = os.path.dirname(output_path)
+    os.makedirs(output_folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_folder, prefix='.result-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path) # 같은 이름으로 동시에 써도 완성된 파일 중 하나가 남음
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
         #
-        meta_im.save(copied_image_path, exif=exif_bytes)
-        logging.info(f"이미지가 저장되었습니다. {copied_image_path}")
+    #
+#
+def load_target_encodings(pickle_path):
+    """ 타겟 얼굴 인코딩 로드 함수 """
+    with open(pickle_path, 'rb') as f:
+        return np.array(pickle.load(f))
         #
     #
 #
+def face_distance(face_encodings, face_to_compare):
+    """ face_recognition.face_distance와 같은 유클리드 거리 (저장된 인코딩만 비교할 때 dlib을 import하지 않도록) """
+    return np.linalg.norm(np.asarray(face_encodings) - face_to_compare, axis=1)
+    #
+#
 def print_image_exif_data(image_path):
     """ 이미지의 Exif 데이터 출력 함수 """
     with Image.open(image_path) as im:
@@ -232,8 +405,12 @@ class AIModel(ABC):
 # Dlib 모델 Face Detector 구현
 # =========================
 class DlibFaceDetector(AIModel):
+    # 상대적인 실행 비용 (캐스케이드에서 비용이 낮은 탐지기부터 실행)
+    COST = 3
+    #
     def __init__(self, model_path):
         """Dlib 얼굴 탐지 모델 로드"""
+        import dlib # 처음 사용할 때 import
         try:
             logging.info(f"Dlib 모델 로드 중: {model_path}")
             self.detector = dlib.cnn_face_detection_model_v1(model_path)
@@ -248,12 +425,18 @@ class DlibFaceDetector(AIModel):
     #
     def predict(self, image):
         """Dlib을 이용해 이미지에서 얼굴을 탐지"""
+        return self.predict_scored(image)[0]
+        #
+    #
+    def predict_scored(self, image):
+        """얼굴 좌표 목록과 신뢰도 목록을 함께 반환"""
         if self.detector is None:
             logging.error("Dlib 모델이 로드되지 않았습니다.")
-            return []
+            return [], []
             #
         #
-        return [(d.rect.left(), d.rect.top(), d.rect.right(), d.rect.bottom()) for d in self.detector(image, 1)]
+        detections = self.detector(image, 1)
+        return [(d.rect.left(), d.rect.top(), d.rect.right(), d.rect.bottom()) for d in detections], [d.confidence for d in detections]
         #
     #
 #
@@ -261,8 +444,13 @@ class DlibFaceDetector(AIModel):
 # YOLO 모델 Face Detector 구현
 # =========================
 class YOLOFaceDetector(AIModel):
+    # 상대적인 실행 비용 (캐스케이드에서 비용이 낮은 탐지기부터 실행)
+    COST = 1
+    #
     def __init__(self, model_path):
         """YOLO 얼굴 탐지 모델 로드"""
+        from ultralytics import YOLO # 처음 사용할 때 import
+        apply_torch_threads() # ultralytics가 torch를 import하므로 여기서 스레드 수 적용
         try:
             logging.info(f"YOLO 모델 로드 중: {model_path}")
             self.detector = YOLO(model_path)
@@ -277,13 +465,22 @@ class YOLOFaceDetector(AIModel):
     #
     def predict(self, image_path):
         """YOLO을 이용해 이미지에서 얼굴을 탐지"""
+        return self.predict_scored(image_path)[0]
+        #
+    #
+    def predict_scored(self, image_path):
+        """얼굴 좌표 목록과 신뢰도 목록을 함께 반환"""
         if self.detector is None:
             logging.error("YOLO 모델이 로드되지 않았습니다.")
-            return []
+            return [], []
             #
         #
         results = self.detector.predict(image_path, conf=0.35, imgsz=1280, max_det=1000)
-        return [(int(box.xyxy[0][0]), int(box.xyxy[0][1]), int(box.xyxy[0][2]), int(box.xyxy[0][3])) for result in results for box in result.boxes]
+        boxes = [box for result in results for box in result.boxes]
+        return (
+            [(int(box.xyxy[0][0]), int(box.xyxy[0][1]), int(box.xyxy[0][2]), int(box.xyxy[0][3])) for box in boxes],
+            [float(box.conf[0]) for box in boxes],
+        )
         #
     #
 #
@@ -291,8 +488,12 @@ class YOLOFaceDetector(AIModel):
 # MTCNN 모델 Face Detector 구현
 # =========================
 class MTCNNFaceDetector(AIModel):
+    # 상대적인 실행 비용 (캐스케이드에서 비용이 낮은 탐지기부터 실행)
+    COST = 2
+    #
     def __init__(self):
         """MTCNN 얼굴 탐지 모델 로드"""
+        from mtcnn import MTCNN # 처음 사용할 때 import (TensorFlow 포함)
         try:
             logging.info(f"MTCNN 모델 로드 중...")
             self.detector = MTCNN()
@@ -307,12 +508,21 @@ class MTCNNFaceDetector(AIModel):
     #
     def predict(self, image):
         """MTCNN을 이용해 이미지에서 얼굴을 탐지"""
+        return self.predict_scored(image)[0]
+        #
+    #
+    def predict_scored(self, image):
+        """얼굴 좌표 목록과 신뢰도 목록을 함께 반환"""
         if self.detector is None:
             logging.error("MTCNN 모델이 로드되지 않았습니다.")
-            return []
+            return [], []
             #
         #
-        return [(f['box'][0], f['box'][1], f['box'][0] + f['box'][2], f['box'][1] + f['box'][3]) for f in self.detector.detect_faces(image)]
+        detections = self.detector.detect_faces(image)
+        return (
+            [(f['box'][0], f['box'][1], f['box'][0] + f['box'][2], f['box'][1] + f['box'][3]) for f in detections],
+            [f['confidence'] for f in detections],
+        )
         #
     #
 #
@@ -322,6 +532,10 @@ class MTCNNFaceDetector(AIModel):
 class FairFacePredictor(AIModel):
     def __init__(self, model_path):
         """FairFace 모델 로드"""
+        import torch # 처음 사용할 때 import
+        import torch.nn as nn
+        from torchvision import models
+        apply_torch_threads() # torch를 처음 import한 곳에서 스레드 수 적용
         try:
             self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
             logging.info(f"FairFace 모델 load 중:\n{model_path}")
@@ -336,23 +550,46 @@ class FairFacePredictor(AIModel):
             #
         #
     #
+    # ImageNet 정규화 값 (학습 시 사용한 값과 동일)
+    MEAN = (0.485, 0.456, 0.406)
+    STD = (0.229, 0.224, 0.225)
+    #
     def predict(self, face_image):
-        trans = transforms.Compose([
-            transforms.ToPILImage(),
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
-        try:
-            face_image = trans(face_image).unsqueeze(0).to(self.device)
-        except ValueError:
+        """얼굴 이미지 1장 예측 (predict_batch 사용)"""
+        if face_image.size == 0:
             logging.error("이미지가 너무 작거나 손상됨, 예측 건너뜀.")
             return None
             #
         #
+        return self.predict_batch(resize_crops([face_image]))[0]
+        #
+    #
+    def predict_batch(self, batch):
+        """
+        (N, 224, 224, 3) uint8 RGB 배열을 한 번의 forward로 예측
+
+        PIL 변환 없이 텐서로 바로 바꿔 정규화하고, 얼굴마다 결과 딕셔너리를 반환
+        """
+        import torch
+        if len(batch) == 0:
+            return []
+            #
+        #
+        tensor = torch.from_numpy(np.ascontiguousarray(batch)).to(self.device)
+        tensor = tensor.permute(0, 3, 1, 2).float().div_(255) # NHWC uint8 -> NCHW float (0~1)
+        mean = torch.tensor(self.MEAN, device=self.device).view(1, 3, 1, 1)
+        std = torch.tensor(self.STD, device=self.device).view(1, 3, 1, 1)
+        tensor = (tensor - mean) / std
+        #
         with torch.no_grad():
-            outputs = self.model(face_image).cpu().numpy().squeeze()
+            outputs = self.model(tensor).cpu().numpy()
         #
+        return [self._decode(output) for output in outputs]
+        #
+    #
+    @staticmethod
+    def _decode(outputs):
+        """모델 출력 18개 값을 인종/성별/나이 결과로 변환"""
         race_pred = np.argmax(outputs[:4])
         gender_pred = np.argmax(outputs[7:9])
         age_pred = np.argmax(outputs[9:18])
@@ -364,6 +601,7 @@ class FairFacePredictor(AIModel):
         return {"race": race_text, "gender": gender_text, "box_color": box_color, "age": age_text}
         #
     #
+#
 #=====================================================================
 # =========================
 # 추상화: Model 관리자 클래스
@@ -386,35 +624,133 @@ class ModelManager(ABC):
 # FaceDetector 관리자 클래스
 # =========================
 class FaceDetectors(ModelManager):
-    def __init__(self, *detectors):
+    # 탐지 방식: 'all' (선택한 탐지기를 모두 실행), 'cascade' (빠른 탐지기부터 필요한 만큼만 실행)
+    STRATEGIES = ('all', 'cascade')
+    #
+    def __init__(self, *detectors, tile_size=None, tile_overlap=256, parallel=False, strategy='all', cascade_policy=None):
+        """
+        tile_size: 이미지의 긴 변이 이 값보다 크면 겹치는 타일로 나누어 탐지 (None이면 타일링 안 함)
+        tile_overlap: 타일 사이의 겹치는 폭(픽셀), 가장 큰 얼굴보다 크게 설정해야 경계의 얼굴을 놓치지 않음
+        parallel: 'all' 방식의 타일링 시 탐지기마다 별도 스레드에서 실행
+        strategy: 'all' 또는 'cascade'
+        cascade_policy: 'cascade' 방식에서 다음 탐지기를 실행할지 판단하는 CascadePolicy
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"지원하지 않는 탐지 방식입니다: {strategy}")
+            #
+        #
         self.detectors = detectors
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.parallel = parallel
+        self.strategy = strategy
+        self.cascade_policy = cascade_policy or CascadePolicy()
 
     def manage_prediction(self, image, image_path=None):
-        """모든 탐지기를 사용해 얼굴을 탐지하고, 비최대 억제 적용"""
+        """선택된 탐지 방식으로 얼굴을 탐지하고, 비최대 억제 적용"""
         logging.info("얼굴 탐지 시작...")
-        all_faces = []
-        for detector in self.detectors:
-            try:
-                if isinstance(detector, YOLOFaceDetector) and image_path: # YOLOFaceDetector의 경우 이미지 경로를 사용하여 탐지
-                    faces =  detector.predict(image_path)
-                else:
-                    faces =  detector.predict(image)
-            except Exception as e:
-                logging.error(f"얼굴 탐지 중 오류 발생: {e}")
-                raise
-            finally:
-                logging.info(f"{detector} : {len(faces)}개의 얼굴 검출")
+        if self.strategy == 'cascade' and len(self.detectors) > 1:
+            all_faces = self._detect_cascade(image, image_path)
+        elif self.parallel and len(self.detectors) > 1 and self._use_tiles(image):
+            with ThreadPoolExecutor(max_workers=len(self.detectors), thread_name_prefix='pybo-face-detector') as executor:
+                results = list(executor.map(lambda detector: self._run_detector(detector, image, image_path)[0], self.detectors))
                 #
             #
-            all_faces.extend(faces)
+            all_faces = [face for faces in results for face in faces]
+        else:
+            all_faces = []
+            for detector in self.detectors:
+                all_faces.extend(self._run_detector(detector, image, image_path)[0])
+                #
             #
         #
         logging.info(f"총 {len(all_faces)}개의 얼굴 검출.")
         #
-        # 비최대 억제 적용
+        # 비최대 억제 적용 (여러 탐지기나 타일 경계에서 중복 검출된 얼굴이 여기서 합쳐짐)
         return self._apply_non_max_suppression(all_faces)
         #
     #
+    def _detect_cascade(self, image, image_path=None):
+        """비용이 낮은 탐지기부터 실행하고, 정책이 충분하다고 판단하면 나머지 탐지기를 건너뜀"""
+        ordered = sorted(self.detectors, key=lambda detector: getattr(detector, 'COST', 0))
+        all_faces, counts, ran, reasons = [], [], [], []
+        for detector in ordered:
+            faces, scores = self._run_detector(detector, image, image_path)
+            all_faces.extend(faces)
+            ran.append(detector)
+            reason = self.cascade_policy.escalation_reason(detector, faces, scores, counts)
+            counts.append(len(faces))
+            if reason is None:
+                break
+                #
+            #
+            reasons.append(reason)
+            logging.info(f"{type(detector).__name__} 결과가 불충분하여 다음 탐지기 실행 ({reason})")
+            #
+        #
+        cascade_stats.record(ran, ordered[len(ran):], reasons)
+        logging.info(cascade_stats.summary())
+        return all_faces
+        #
+    #
+    def _use_tiles(self, image):
+        return bool(self.tile_size) and max(image.shape[:2]) > self.tile_size
+        #
+    #
+    def _run_detector(self, detector, image, image_path=None):
+        """탐지기 하나로 탐지 (큰 이미지는 타일로 나누어 탐지), 얼굴 좌표와 신뢰도 목록을 반환"""
+        if self._use_tiles(image):
+            return self._detect_tiled(detector, image)
+            #
+        #
+        return self._detect_with(detector, image, image_path)
+        #
+    #
+    def _detect_with(self, detector, image, image_path=None):
+        """탐지기 하나로 얼굴 탐지"""
+        faces, scores = [], []
+        try:
+            with model_registry.inference_lock(detector): # 공유 모델은 동시에 하나의 요청만 사용
+                if isinstance(detector, YOLOFaceDetector):
+                    # YOLOFaceDetector는 이미지 경로를 사용하여 탐지, 경로가 없으면(타일) BGR 배열 전달
+                    faces, scores = detector.predict_scored(image_path if image_path else np.ascontiguousarray(image[..., ::-1]))
+                elif hasattr(detector, 'predict_scored'):
+                    faces, scores = detector.predict_scored(image)
+                else:
+                    faces = detector.predict(image)
+        except Exception as e:
+            logging.error(f"얼굴 탐지 중 오류 발생: {e}")
+            raise
+        finally:
+            logging.info(f"{detector} : {len(faces)}개의 얼굴 검출")
+            #
+        #
+        return faces, scores
+        #
+    #
+    def _detect_tiled(self, detector, image):
+        """
+        이미지를 겹치는 타일로 나누어 탐지한 뒤 좌표를 원본 기준으로 변환
+
+        탐지기에는 타일 크기의 배열만 전달되므로 dlib 업샘플링, MTCNN 피라미드 등 탐지기의 작업 메모리가
+        이미지 전체가 아닌 타일 크기에 비례한다. 디코딩한 원본 배열(픽셀당 3바이트)은 얼굴 영역 자르기와
+        결과 그리기에 원본 해상도가 필요하므로 이미지 크기만큼 한 번 보관한다.
+        모델 객체는 스레드 안전하지 않을 수 있으므로 병렬 실행 시에도 탐지기 하나는 한 스레드에서만 사용한다.
+        """
+        height, width = image.shape[:2]
+        tiles = list(iter_tiles(height, width, self.tile_size, self.tile_overlap))
+        logging.info(f"타일 탐지: {width}x{height} 이미지를 {len(tiles)}개 타일로 분할")
+        faces, scores = [], []
+        for x0, y0, x1, y1 in tiles:
+            tile = np.ascontiguousarray(image[y0:y1, x0:x1]) # 타일 크기만큼만 복사
+            tile_faces, tile_scores = self._detect_with(detector, tile)
+            faces.extend((fx + x0, fy + y0, fx2 + x0, fy2 + y0) for fx, fy, fx2, fy2 in tile_faces)
+            scores.extend(tile_scores)
+            #
+        #
+        return faces, scores
+        #
+    #
     @staticmethod
     def _apply_non_max_suppression(faces):
         """
@@ -456,8 +792,9 @@ class FaceDetectors(ModelManager):
 # FacePredictor 관리자 클래스
 # =========================
 class FacePredictors(ModelManager):
-    def __init__(self, *predictors):
+    def __init__(self, *predictors, batcher=None):
         self.predictors = predictors
+        self.batcher = batcher # 동시 요청의 얼굴을 모아 한 번에 예측하는 MicroBatcher (None이면 요청마다 예측)
 
     def manage_prediction(self, image):
         """FacePredictor의 예측 결과를 관리"""
@@ -465,7 +802,8 @@ class FacePredictors(ModelManager):
         all_predictions = {}
         for predictor in self.predictors:
             try:
-                prediction = predictor.predict(image)
+                with model_registry.inference_lock(predictor):
+                    prediction = predictor.predict(image)
             except Exception as e:
                 logging.error(f"예측 중 오류 발생: {e}")
                 continue
@@ -474,6 +812,41 @@ class FacePredictors(ModelManager):
         return all_predictions
         #
     #
+    def manage_batch_prediction(self, batch):
+        """얼굴 배치(N, 224, 224, 3)의 예측 결과를 얼굴마다 합쳐서 반환"""
+        if self.batcher is not None:
+            return self.batcher.submit(batch) # 다른 요청의 얼굴과 함께 predict_batch에서 실행됨
+            #
+        #
+        return self.predict_batch(batch)
+        #
+    #
+    def predict_batch(self, batch):
+        """얼굴 배치를 바로 예측 (MicroBatcher의 배치 실행 함수)"""
+        logging.info(f"얼굴 배치 예측 시작: {len(batch)}명")
+        all_predictions = [{} for _ in range(len(batch))]
+        for predictor in self.predictors:
+            try:
+                with model_registry.inference_lock(predictor): # 공유 모델은 동시에 하나의 요청만 사용
+                    if hasattr(predictor, 'predict_batch'):
+                        predictions = predictor.predict_batch(batch)
+                    else:
+                        predictions = [predictor.predict(face) for face in batch]
+            except Exception as e:
+                logging.error(f"예측 중 오류 발생: {e}")
+                continue
+                #
+            #
+            for merged, prediction in zip(all_predictions, predictions):
+                if prediction:
+                    merged.update(prediction)
+                    #
+                #
+            #
+        #
+        return all_predictions
+        #
+    #
 #
 # =========================
 # 얼굴 인식 시스템 클래스
@@ -484,32 +857,34 @@ class AiSystem:
         self.config = config
         self.detector_manager = detector_manager
         self.predictor_manager = predictor_manager
+        self.encoder = ResultEncoder(config) # 결과 이미지 인코딩 설정 (형식, 화질)
+        self.face_details = [] # 마지막으로 예측한 얼굴별 정보 (_combine_predictions)
         #
     #
-    def process_image(self, image_path, target_encodings):
-        """이미지에서 얼굴을 탐지하고 결과를 저장"""
+    def process_image(self, image_path, target_encodings, image_rgb=None):
+        """이미지에서 얼굴을 탐지하고 결과를 저장 (image_rgb: 이미 디코딩된 프레임이 있으면 파일을 다시 읽지 않음)"""
         try:
-            image_rgb, faces = self._detect_faces(image_path) # 얼굴 탐지
+            image_rgb, faces = self._detect_faces(image_path, image_rgb) # 얼굴 탐지
             predictions, face_cnt, race_cnt, male_cnt = self._complicate_predictions(image_rgb, faces, target_encodings) # 얼굴 예측
             result_image = self._draw_results(image_rgb, predictions, face_cnt, male_cnt, race_cnt) # 결과 그리기
-            self._save_results(image_path, result_image, predictions) # 결과 저장
+            self._save_results(image_path, result_image, predictions, source_rgb=image_rgb) # 결과 저장
         except Exception as e:
             logging.error(f"이미지 처리 중 오류 발생: {e}")
             #
         #
     #
-    def _detect_faces(self, image_path):
-        """이미지에서 얼굴을 탐지"""
+    def _detect_faces(self, image_path, image_rgb=None):
+        """이미지에서 얼굴을 탐지 (image_rgb가 없으면 image_path에서 읽음)"""
         try:
-            image = cv2.imread(image_path) # 이미지 읽기
-            #
-            # 이미지 읽기 실패 시 예외 발생
-            if image is None: 
-                raise ValueError(f"이미지를 읽을 수 없습니다: {image_path}")
+            if image_rgb is None:
+                # 얼굴 영역 자르기와 결과 그리기에 원본 해상도가 필요하므로 전체를 한 번 디코딩 (읽기 실패 시 예외 발생)
+                image_rgb = read_image_rgb(image_path)
+                detector_path = image_path # YOLO는 파일에서 직접 읽음
+            else:
+                detector_path = None # 이미 디코딩된 프레임을 모든 탐지기에 사용
                 #
             #
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB) # RGB로 변환
-            faces = self.detector_manager.manage_prediction(image_rgb, image_path) # 얼굴 탐지
+            faces = self.detector_manager.manage_prediction(image_rgb, detector_path) # 얼굴 탐지
             logging.info(f"얼굴 탐지 완료: {len(faces)}명")
             #
             return image_rgb, faces # RGB 이미지와 얼굴 좌표 반환
@@ -521,59 +896,174 @@ class AiSystem:
             #
         #
     #
-    def _complicate_predictions(self, image_rgb, faces, target_encodings):
-        """얼굴을 예측 결과를 잘 추합해서 반환"""
+    def _complicate_predictions(self, image_rgb, faces, target_encodings, digest=None):
+        """얼굴을 예측 결과를 잘 추합해서 반환 (digest: 원본 이미지의 SHA-256, 저장된 얼굴 인코딩을 찾을 때 사용)"""
+        # 얼굴 영역 추출 (이미지 범위로 자르고, 너무 작은 얼굴은 제외) 후 한 번에 리사이즈/예측
+        boxes, crops = self._extract_faces(image_rgb, faces)
+        prediction_results = self.predictor_manager.manage_batch_prediction(resize_crops(crops)) if boxes else []
+        return self._combine_predictions(image_rgb, boxes, prediction_results, target_encodings, digest)
+        #
+    #
+    def _extract_faces(self, image_rgb, faces):
+        """예측할 얼굴 좌표와 얼굴 영역(원본 배열의 뷰)을 반환"""
+        boxes, crops, rejected = extract_face_crops(image_rgb, faces, margin=self.config.get('face_margin', 0.0))
+        self.rejected_faces = rejected
+        if rejected:
+            logging.info(f"예측에서 제외된 얼굴: {rejected}명 (이미지 범위 밖 또는 {FACE_MIN_SIZE}px 미만)")
+            #
+        #
+        return boxes, crops
+        #
+    #
+    def _combine_predictions(self, image_rgb, boxes, prediction_results, target_encodings, digest=None):
+        """
+        얼굴별 예측 결과에 얼굴 인코딩 비교 결과를 합치고 인원/성별/인종 수를 집계
+
+        predictions에 담기지 않는 얼굴별 정보(나이, 얼굴 인코딩, 타겟 얼굴과의 거리)는 같은 순서로 self.face_details에 남긴다.
+        digest가 있으면 같은 이미지의 같은 얼굴 영역에서 계산해 둔 얼굴 인코딩을 재사용하고, 새로 계산한 인코딩은 저장한다.
+        """
         predictions = []
+        self.face_details = []
         face_cnt = 0
         race_cnt = {'백인': 0, '흑인': 0, '아시아': 0, '중동': 0}
         male_cnt = 0
         #
-        for face in faces:
-            prediction = self._predict_face(image_rgb, face, target_encodings)
+        stored = self._stored_embeddings(digest, boxes)
+        computed = [None] * len(stored) # 새로 계산한 인코딩 (저장할 것)
+        for i, (box, prediction_result) in enumerate(zip(boxes, prediction_results)):
+            prediction, detail = self._predict_face(image_rgb, box, target_encodings, prediction_result, stored[i])
+            if detail and stored[i] is None:
+                computed[i] = detail['embedding']
+                #
+            #
             if prediction:
                 predictions.append(prediction)
+                self.face_details.append(detail)
                 face_cnt += 1
                 race_text, gender_text = prediction[4], prediction[5]
-                race_cnt[race_text] += 1
+                if race_text in race_cnt:
+                    race_cnt[race_text] += 1
+                    #
+                #
                 if gender_text == '남성':
                     male_cnt += 1
                     #
                 #
             #
         #
+        self._save_embeddings(digest, boxes, computed)
         return predictions, face_cnt, race_cnt, male_cnt
         #
     #
-    def _predict_face(self, image_rgb, face, target_encodings):
-        """단일 얼굴에 대해 예측 수행"""
+    def encode_faces(self, image_rgb, faces, digest=None):
+        """
+        예측기 없이 탐지만 한 경우 얼굴 검색에 사용할 얼굴 인코딩을 계산 (config['face_search']가 없으면 빈 목록)
+
+        faces와 같은 순서로 {'embedding'}을 반환하며, 이미지 범위로 자른 크기가 FACE_MIN_SIZE 미만인 얼굴은 None이다.
+        _combine_predictions와 같은 박스(이미지 범위로 자른 좌표)로 저장된 인코딩을 재사용하고 새 인코딩은 저장한다.
+        """
+        if not self.config.get('face_search') or not faces:
+            return []
+            #
+        #
+        height, width = image_rgb.shape[:2]
+        boxes = [clamp_face_box(face, width, height) for face in faces]
+        stored = self._stored_embeddings(digest, boxes)
+        computed = [None] * len(boxes)
+        for i, (x, y, x2, y2) in enumerate(boxes):
+            if stored[i] is None and x2 - x >= FACE_MIN_SIZE and y2 - y >= FACE_MIN_SIZE:
+                computed[i] = self._face_encoding(image_rgb, boxes[i])
+                #
+            #
+        #
+        self._save_embeddings(digest, boxes, computed)
+        return [{'embedding': embedding if embedding is not None else computed[i]} for i, embedding in enumerate(stored)]
+        #
+    #
+    def _face_encoding(self, image_rgb, face):
+        """얼굴 영역(x, y, x2, y2, 이미지 범위로 자른 값) 하나의 얼굴 인코딩 (실패하면 None)"""
+        import face_recognition # 처음 사용할 때 import
+        x, y, x2, y2 = face
+        encodings = face_recognition.face_encodings(image_rgb, [(y, x2, y2, x)])
+        if not encodings:
+            logging.warning(f"얼굴 인코딩 실패: {face}")
+            return None
+            #
+        #
+        return encodings[0]
+        #
+    #
+    def _stored_embeddings(self, digest, boxes):
+        """boxes와 같은 순서로 저장된 얼굴 인코딩을 반환 (없는 얼굴은 None, config['face_embeddings']나 digest가 없으면 모두 None)"""
+        options = self.config.get('face_embeddings')
+        if not options or not digest or not boxes:
+            return [None] * len(boxes)
+            #
+        #
+        from ..face_analysis import load_face_embeddings # Django 모델은 처음 사용할 때 import
+        try:
+            embeddings = load_face_embeddings(digest, boxes, **options)
+        except Exception as e:
+            logging.warning(f"저장된 얼굴 인코딩을 불러오지 못했습니다: {e}")
+            return [None] * len(boxes)
+            #
+        #
+        reused = sum(embedding is not None for embedding in embeddings)
+        if reused:
+            logging.info(f"저장된 얼굴 인코딩 재사용: {reused}/{len(boxes)}명")
+            #
+        #
+        return embeddings
+        #
+    #
+    def _save_embeddings(self, digest, boxes, embeddings):
+        """새로 계산한 얼굴 인코딩을 이미지 해시 + 양자화한 박스로 저장 (None은 건너뜀)"""
+        options = self.config.get('face_embeddings')
+        if not options or not digest or not any(embedding is not None for embedding in embeddings):
+            return
+            #
+        #
+        from ..face_analysis import save_face_embeddings # Django 모델은 처음 사용할 때 import
+        try:
+            save_face_embeddings(digest, boxes, embeddings, options.get('quantum', 8))
+        except Exception as e:
+            logging.warning(f"얼굴 인코딩을 저장하지 못했습니다: {e}")
+            #
+        #
+    #
+    def _predict_face(self, image_rgb, face, target_encodings, prediction_result, encoding=None):
+        """
+        단일 얼굴의 예측 결과(prediction_result)와 얼굴 인코딩 비교 결과를 합쳐 (prediction, 얼굴별 정보)를 반환
+
+        encoding: 저장소에서 찾은 이 얼굴의 인코딩 (None이면 계산)
+        """
         try:
-            x, y, x2, y2 = face # 얼굴 좌표
-            face_width, face_height = x2 - x, y2 - y # 얼굴 크기
-            face_image = image_rgb[y:y2, x:x2] # 얼굴 이미지
-            encodings = face_recognition.face_encodings(image_rgb, [(y, x + face_width, y + face_height, x)]) # 얼굴 인코딩
-            #
-            # 얼굴 인코딩 실패 시 예외 발생
-            if not encodings:
-                logging.warning(f"얼굴 인코딩 실패: {face}")
-                return None
+            x, y, x2, y2 = face # 얼굴 좌표 (이미지 범위로 잘린 값)
+            if encoding is None:
+                encoding = self._face_encoding(image_rgb, face) # 얼굴 인코딩
+                if encoding is None:
+                    return None, None
+                    #
                 #
-            #   
-            prediction_result = self.predictor_manager.manage_prediction(face_image) # 얼굴 예측
+            #
             race_text = prediction_result.get("race", "알 수 없음") # 인종
             gender_text = prediction_result.get("gender", "알 수 없음") # 성별
             box_color = prediction_result.get("box_color", (0, 0, 0)) # 박스 색상
             age_text = prediction_result.get("age", "알 수 없음") # 나이
             #
-            # 예측 결과 텍스트
-            is_gaka = any(face_recognition.compare_faces(target_encodings, encodings[0], tolerance=0.3))
+            # 예측 결과 텍스트 (compare_faces(tolerance=0.3)와 같은 기준, 가장 가까운 거리는 저장을 위해 남김)
+            distances = face_distance(target_encodings, encoding) if len(target_encodings) else []
+            distance = float(min(distances)) if len(distances) else None
+            is_gaka = distance is not None and distance <= 0.3
             prediction_text = '가카!' if is_gaka and gender_text == '남성' else age_text
             #
-            return x, y, x2 - x, y2 - y, race_text, gender_text, box_color, prediction_text
+            detail = {'age': age_text, 'embedding': encoding, 'distance': distance}
+            return (x, y, x2 - x, y2 - y, race_text, gender_text, box_color, prediction_text), detail
             #
         #
         except Exception as e:
             logging.error(f"단일 얼굴 처리 중 오류 발생: {e}")
-            return None
+            return None, None
             #
         #
     #
@@ -599,18 +1089,19 @@ class AiSystem:
         return image_rgb
         #
     #
-    def _save_results(self, image_path, image_rgb, predictions):
-        """결과 이미지를 저장하고 메타데이터 추가"""
+    def _save_results(self, image_path, image_rgb, predictions, source_rgb=None):
+        """결과 이미지를 저장하고 메타데이터 추가 (source_rgb: 탐지에 사용한 원본 배열, 썸네일 생성에 재사용)"""
         try:
-            output_path = os.path.join(self.config['results_folder'], os.path.basename(image_path)) # 결과 이미지 경로
-            cv2.imwrite(output_path,cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)) # 이미지 저장
+            stem = os.path.splitext(os.path.basename(image_path))[0]
+            output_path = os.path.join(self.config['results_folder'], stem + self.encoder.ext) # 결과 이미지 경로
+            self.encoder.save(image_rgb, output_path, write_bytes_atomic) # 설정된 형식으로 인코딩 후 저장
             logging.info(f"이미지 분석 결과 저장: {output_path}") 
             #
             gaka_detected = any("가카" in pred[7] for pred in predictions) # 가카 여부
             detection_folder = "detection_target" if gaka_detected else "detection_non_target" # 타겟 여부에 따라 폴더 설정
             output_folder = os.path.join(self.config['results_folder'], detection_folder) # 결과 폴더
             #
-            copy_image_and_add_metadata(image_path, output_folder) # 이미지 복사 및 메타데이터 추가
+            copy_image_and_add_metadata(image_path, output_folder, source_rgb) # 이미지 복사 및 메타데이터 추가
             #
             logging.info(f"메타데이터 추가된 이미지 저장: {output_folder}") 
         except Exception as e:
@@ -623,35 +1114,234 @@ class AiSystem:
 # 얼굴 인식 시스템 클래스 for Django
 # =========================
 class ForDjango(AiSystem):
-    def __init__(self, config, detector_manager, predictor_manager):
+    # 결과 이미지의 그리기 방식이 바뀌면 올려서 이전 결과 파일을 재사용하지 않도록 함
+    RESULT_VERSION = 1
+    #
+    # Answer.answer_image에 저장되는 결과 이미지 경로 (MEDIA_ROOT 기준)
+    MEDIA_PREFIX = 'pybo/answer_image'
+    #
+    def __init__(self, config, detector_manager, predictor_manager, inference_client=None):
         super().__init__(config, detector_manager, predictor_manager)
+        self.inference_client = inference_client # 추론 서버 클라이언트 (None이면 프로세스 내에서 추론)
+        self.face_analysis = None # 마지막으로 처리한 이미지의 분석 결과 (FaceAnalysis)
+        #
+    #
+    def analysis_fingerprint(self):
+        """분석 결과(얼굴 박스, 예측)에 영향을 주는 설정(선택된 탐지기/예측기, 탐지 방식, 타일링)을 문자열로 반환"""
+        # 추론 서버를 사용하면 이 프로세스에 모델이 없으므로, 모델 객체가 아닌 설정에서 계산
+        detectors = [name for name in DETECTOR_CHOICES if name in self.config.get('selected_detectors', ())]
+        if detectors and self.config.get('detection_strategy', 'all') != 'all': # 캐스케이드는 실행되는 탐지기가 달라짐
+            policy = CascadePolicy(**(self.config.get('cascade_policy') or {}))
+            # 탐지기별 신뢰도 기준(기본값 + settings의 low_confidence)도 포함하여, 기준을 조정하면 저장된 결과를 재사용하지 않음
+            thresholds = '/'.join(f"{name}:{value}" for name, value in sorted(policy.low_confidence.items()))
+            detectors.append(f"cascade{policy.min_confidence}/{policy.min_face_size}/{policy.count_tolerance}/{thresholds}")
+            #
+        #
+        tiling = self.config.get('detection_tiling') or {}
+        if detectors and tiling.get('tile_size'): # 타일링은 탐지 결과에 영향을 줌
+            detectors.append(f"tiles{tiling['tile_size']}/{tiling.get('tile_overlap', 256)}")
+            #
+        #
+        predictors = [name for name in PREDICTOR_CHOICES if name in self.config.get('selected_predictors', ())]
+        return f"detectors={','.join(detectors)}|predictors={','.join(predictors)}"
+        #
+    #
+    def config_fingerprint(self):
+        """결과 이미지에 영향을 주는 설정(분석 설정, 결과 버전, 인코딩)을 문자열로 반환"""
+        return f"v{self.RESULT_VERSION}|{self.analysis_fingerprint()}|encoding={self.encoder.fingerprint}"
+        #
+    #
+    def result_name(self, image_path):
+        """
+        결과 이미지 파일 이름: 원본 이미지 내용 + 설정의 SHA-256 해시
+
+        같은 이미지를 같은 설정으로 분석하면 항상 같은 이름이 되므로 이전 결과를 재사용할 수 있고,
+        파일 이름이 같은 다른 이미지를 동시에 분석해도 서로의 결과를 덮어쓰지 않음
+        """
+        digest = file_sha256(image_path, self.config_fingerprint().encode('utf-8'))
+        return digest + self.encoder.ext # 확장자는 결과 인코딩 형식을 따름
+        #
+    #
+    def render_style(self):
+        """결과 이미지의 그리기 방식(결과 버전, 인코딩)을 문자열로 반환 (요청 시 그린 이미지의 캐시 키와 ETag에 사용)"""
+        return f"v{self.RESULT_VERSION}|encoding={self.encoder.fingerprint}"
         #
     #
     def process_image(self, image_path, target_encodings):
-        """이미지에서 얼굴을 탐지하고 결과를 저장"""
+        """
+        이미지에서 얼굴을 탐지하고 결과를 저장
+
+        분석 결과(FaceAnalysis)는 self.face_analysis에 남긴다.
+        config['render_on_demand']가 True이면 결과 이미지를 그리거나 파일로 저장하지 않고 None을 반환한다
+        (결과 이미지는 요청 시 render_image로 그림).
+        """
+        self.face_analysis = None
+        on_demand = self.config.get('render_on_demand', False)
         try:
-            image_rgb, faces = self._detect_faces(image_path) # 얼굴 탐지
-            if self.predictor_manager: # 예측기가 있는 경우
-                predictions, face_cnt, race_cnt, male_cnt = self._complicate_predictions(image_rgb, faces, target_encodings) # 얼굴 예측
-            else:
-                predictions, face_cnt, race_cnt, male_cnt = faces, f'{len(faces)}', None, None
-            result_image = self._draw_results(image_rgb, predictions, face_cnt, male_cnt, race_cnt) # 결과 그리기
-            output_path = self._save_results(image_path, result_image, predictions)
-            logging.info(f"이미지 분석 결과 저장: {image_path}")
-            logging.info(f"이미지 분석 결과 저장: {output_path}")
-            django_path = os.path.join(
-                
-                # 이미지 경로를 Django에서 사용할 수 있는 형태로 변환
-                'pybo/answer_image', 
-                
-                os.path.basename(output_path)
-                )
-            return django_path
+            result_name = self.result_name(image_path)
+            output_path = os.path.join(self.config['results_folder'], result_name)
+            django_path = f"{self.MEDIA_PREFIX}/{result_name}" # Django에서 사용할 수 있는 형태의 경로
+            #
+            # 같은 이미지를 같은 설정으로 분석한 결과가 있으면 재사용
+            if not on_demand and os.path.exists(output_path):
+                logging.info(f"이전 분석 결과 재사용: {output_path}")
+                return django_path
+                #
+            #
+            # 같은 이미지를 같은 설정으로 분석한 결과가 DB에 있으면 추론하지 않음 (결과 이미지 파일이 필요하면 다시 그림)
+            from ..face_analysis import image_digest, load_face_analysis, save_face_analysis # Django 모델은 처음 사용할 때 import
+            digest = image_digest(image_path)
+            stored = load_face_analysis(digest, self.analysis_fingerprint())
+            if stored is not None:
+                self.face_analysis = stored
+                if on_demand:
+                    logging.info(f"저장된 분석 결과 재사용: {image_path}")
+                    return None
+                    #
+                #
+                self._save_results(output_path, self.render_analysis(stored))
+                logging.info(f"저장된 분석 결과로 결과 이미지 생성: {output_path}")
+                return django_path
+                #
+            #
+            timings = {}
+            started = time.perf_counter()
+            with self._load_image(image_path) as (image_bytes, image_rgb, frame): # 프레임은 결과를 그린 뒤 해제
+                image_rgb, analysis = self._analyze(image_path, image_bytes, image_rgb, frame, target_encodings, digest) # 얼굴 탐지/예측
+                timings['analyze_ms'] = (time.perf_counter() - started) * 1000
+                predictions, face_cnt, race_cnt, male_cnt = analysis
+                if not on_demand:
+                    result_image = self._draw_results(image_rgb, predictions, face_cnt, male_cnt, race_cnt) # 결과 그리기
+                    timings['draw_ms'] = (time.perf_counter() - started) * 1000 - timings['analyze_ms']
+                    #
+                #
+            #
+            if not on_demand:
+                self._save_results(output_path, result_image, predictions)
+                logging.info(f"이미지 분석 결과 저장: {output_path}")
+                #
+            #
+            timings['total_ms'] = (time.perf_counter() - started) * 1000
+            timings['inference'] = self.inference_source
+            logging.info(f"이미지 분석 완료: {image_path}")
+            #
+            # 박스/예측/얼굴 인코딩을 저장하여 다시 그리거나 조회할 때 추론하지 않도록 함
+            labeled = race_cnt is not None
+            self.face_analysis = save_face_analysis(image_path, digest, self.analysis_fingerprint(), analysis, self.face_details, labeled, timings)
+            return None if on_demand else django_path
+        except SchedulerBusy: # 추론 서버가 바쁨 (호출한 쪽에서 나중에 다시 시도)
+            raise
         except Exception as e:
             logging.error(f"이미지 처리 중 오류 발생: {e}")
             #
         #
     #
+    def inference_options(self):
+        """추론 서버에 전달할 요청 설정 (선택된 탐지기/예측기, 탐지 방식, 요청한 사용자와 작업 클래스)"""
+        return {
+            'detectors': list(self.config.get('selected_detectors', ())),
+            'predictors': list(self.config.get('selected_predictors', ())),
+            'strategy': self.config.get('detection_strategy', 'all'),
+            'user': self.config.get('job_user'),
+            'job_class': self.config.get('job_class', 'interactive'),
+        }
+        #
+    #
+    @contextmanager
+    def _load_image(self, image_path):
+        """
+        추론 서버를 사용하면 이미지를 읽어 (이미지 바이트, RGB 프레임, FrameHandle)을 반환 (사용하지 않으면 모두 None)
+
+        프레임은 프로세스의 공유 메모리 링 버퍼에 디코딩하므로, 서버는 다시 디코딩하지 않고 같은 메모리를 읽으며
+        이 프로세스는 같은 프레임으로 결과를 그린다. 링 버퍼를 사용할 수 없으면 서버에 이미지 바이트를 보낸다.
+        """
+        if self.inference_client is None:
+            yield None, None, None
+            return
+            #
+        #
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+            #
+        #
+        ring = worker_frame_ring(self.inference_client.frame_ring_size)
+        frame = None
+        if ring is not None:
+            try:
+                frame = ring.decode_into(image_bytes, timeout=0) # 공간이 없으면 기다리지 않음
+            except (FrameTooLarge, TimeoutError) as e:
+                logging.info(f"공유 메모리 프레임을 사용하지 않습니다: {e}")
+                #
+            #
+        #
+        if frame is None:
+            yield image_bytes, decode_image_rgb(image_bytes), None
+            return
+            #
+        #
+        try:
+            yield image_bytes, ring.view(frame), frame
+        finally:
+            ring.release(frame.offset)
+            #
+        #
+    #
+    def _analyze(self, image_path, image_bytes, image_rgb, frame, target_encodings, digest=None):
+        """
+        얼굴 탐지/예측 후 (RGB 이미지, (predictions, face_cnt, race_cnt, male_cnt))를 반환
+
+        추론 서버가 있으면 공유 메모리 프레임(또는 이미지 바이트)을 보내 서버의 모델로 분석하고,
+        서버에 연결할 수 없으면 이 프로세스에서 모델을 로드해 분석한다.
+        digest(원본 이미지의 SHA-256)는 저장된 얼굴 인코딩을 찾을 때 사용한다 (서버에는 요청 설정으로 전달).
+        얼굴별 정보는 self.face_details, 분석한 위치('server' 또는 'local')는 self.inference_source에 남긴다.
+        """
+        self.face_details = []
+        if self.inference_client is not None:
+            options = dict(self.inference_options(), image_sha256=digest)
+            try:
+                if frame is not None:
+                    analysis, self.face_details = self.inference_client.analyze_frame(frame, options)
+                else:
+                    analysis, self.face_details = self.inference_client.analyze(image_bytes, options)
+                    #
+                #
+                self.inference_source = 'server'
+                return image_rgb, analysis
+            except InferenceUnavailable as e:
+                logging.warning(f"{e} - 프로세스 내 추론으로 대체합니다.")
+                #
+            #
+        #
+        if self.detector_manager is None and self.predictor_manager is None:
+            self.detector_manager, self.predictor_manager = build_managers(self.config)
+            #
+        #
+        self.inference_source = 'local'
+        image_rgb, faces = self._detect_faces(image_path, image_rgb) # 얼굴 탐지
+        if self.predictor_manager: # 예측기가 있는 경우
+            return image_rgb, self._complicate_predictions(image_rgb, faces, target_encodings, digest) # 얼굴 예측
+            #
+        #
+        self.face_details = self.encode_faces(image_rgb, faces, digest)
+        return image_rgb, (faces, f'{len(faces)}', None, None)
+        #
+    #
+    def render_analysis(self, face_analysis):
+        """저장된 분석 결과(FaceAnalysis)와 원본 이미지로 결과 이미지를 그려서 반환 (추론하지 않음)"""
+        from ..face_analysis import media_path, stored_predictions # Django 모델은 처음 사용할 때 import
+        with open(media_path(face_analysis.image_name), 'rb') as f:
+            image_rgb = decode_image_rgb(f.read())
+            #
+        #
+        predictions, face_cnt, race_cnt, male_cnt = stored_predictions(face_analysis)
+        return self._draw_results(image_rgb, predictions, face_cnt, male_cnt, race_cnt)
+        #
+    #
+    def render_image(self, face_analysis):
+        """저장된 분석 결과로 결과 이미지를 그리고 설정된 형식으로 인코딩하여 EncodedImage로 반환 (파일로 저장하지 않음)"""
+        return self.encoder.encode(self.render_analysis(face_analysis))
+        #
+    #
     def _draw_results(self, image_rgb, predictions, face_cnt, male_cnt, race_cnt):
         """결과를 이미지에 그린 후 리턴"""
         font_size = max(12, int(image_rgb.shape[1] / 200)) # 폰트 크기
@@ -690,12 +1380,9 @@ class ForDjango(AiSystem):
         return image_rgb
         #
     #
-    def _save_results(self, image_path, result_image, predictions=None):
-        """결과 이미지를 저장"""
-        os.makedirs(self.config['results_folder'], exist_ok=True) # 결과 폴더 생성
-        output_path = os.path.join(self.config['results_folder'], os.path.basename(image_path)) # 결과 이미지 경로
-        cv2.imwrite(output_path, cv2.cvtColor(result_image, cv2.COLOR_RGB2BGR)) # 이미지 저장
-        logging.info(f"이미지 분석 결과 저장:\n{output_path}")  
+    def _save_results(self, output_path, result_image, predictions=None):
+        """결과 이미지를 설정된 형식으로 인코딩해 output_path에 원자적으로 저장 (임시 파일에 쓴 뒤 이름 변경)"""
+        self.encoder.save(result_image, output_path, write_bytes_atomic) # 이미지 저장 (크기/시간은 인코더가 로그로 남김)
         #
         return output_path
         #
@@ -704,71 +1391,158 @@ class ForDjango(AiSystem):
 # =========================
 # Django 시스템 설정 데코레이터
 # =========================
+# 질문 등록 폼에서 선택할 수 있는 탐지기/예측기 이름 (question_form.html의 체크박스 값)
+DETECTOR_CHOICES = ('dlib', 'yolo', 'mtcnn')
+PREDICTOR_CHOICES = ('fairface',)
+#
+def django_config():
+    """Django(웹 요청과 추론 서버)에서 사용하는 설정 딕셔너리"""
+    base_dir = os.path.join(Path(__file__).resolve().parent, 'ai_files')
+    django_media_dir = os.path.join(Path(__file__).resolve().parent.parent.parent, 'media/pybo/answer_image')
+    return {
+        "dlib_model_path": os.path.join(base_dir, 'ai_models', 'DilbCNN', 'mmod_human_face_detector.dat'),
+        "yolo_model_path": os.path.join(base_dir, 'ai_models', 'YOLOv8', 'yolov8n-face.pt'),
+        "fair_face_model_path": os.path.join(base_dir, 'ai_models', 'FairFace', 'resnet34_fair_face_4.pt'),
+        "image_folder": os.path.join(base_dir, 'image_test', 'test_park_mind_problem'),
+        "pickle_path": os.path.join(base_dir, 'embedings', 'FaceRecognition(ResNet34).pkl'),
+        "font_path": os.path.join(base_dir, 'fonts', 'NanumGothic.ttf'),
+        "results_folder": django_media_dir,
+        "result_encoding": getattr(settings, 'AI_RESULT_ENCODING', None),
+        "render_on_demand": (getattr(settings, 'AI_RESULT_RENDERING', None) or {}).get('on_demand', False),
+        "face_embeddings": getattr(settings, 'AI_FACE_EMBEDDINGS', None),
+        "face_search": getattr(settings, 'AI_FACE_SEARCH', None),
+        "detection_tiling": getattr(settings, 'AI_DETECTION_TILING', None),
+        "cascade_policy": getattr(settings, 'AI_CASCADE_POLICY', None),
+        "micro_batching": getattr(settings, 'AI_MICRO_BATCHING', None),
+        "selected_detectors": [],
+        "selected_predictors": [],
+        "detection_strategy": 'all',
+        "job_user": None, # 분석을 요청한 사용자 ID (추론 서버의 사용자별 공정 순서)
+        "job_class": 'interactive', # 작업 클래스 (scheduler.PRIORITY_CLASSES)
+    }
+    #
+#
+def build_managers(config):
+    """config에서 선택된 탐지기/예측기로 (detector_manager, predictor_manager)를 생성 (선택이 없으면 None)"""
+    # 얼굴 탐지기 생성 - 사용자가 선택한 탐지기들을 설정
+    detectors = []
+    # 모델은 레지스트리에서 프로세스당 한 번만 로드하여 요청 간에 재사용
+    if 'dlib' in config['selected_detectors']:
+        detectors.append(model_registry.get(DlibFaceDetector, config['dlib_model_path']))
+    if 'yolo' in config['selected_detectors']:
+        detectors.append(model_registry.get(YOLOFaceDetector, config['yolo_model_path']))
+    if 'mtcnn' in config['selected_detectors']:
+        detectors.append(model_registry.get(MTCNNFaceDetector))
+        #
+    #
+    # 선택된 탐지기가 없는 경우
+    if not detectors:
+        logging.warning("탐지기가 선택되지 않았습니다. 탐지 작업을 건너뜁니다.")
+        detector_manager = None
+    else:
+        detector_manager = FaceDetectors(
+            *detectors,
+            strategy=config['detection_strategy'],
+            cascade_policy=CascadePolicy(**(config['cascade_policy'] or {})),
+            **(config['detection_tiling'] or {})
+            )
+        #
+    #
+    # 얼굴 예측기 생성 - 사용자가 선택한 예측기들을 설정
+    predictors = []
+    if 'fairface' in config['selected_predictors']:
+        predictors.append(model_registry.get(FairFacePredictor, config['fair_face_model_path']))
+        #
+    #
+    # 선택된 예측기가 없는 경우
+    if not predictors:
+        logging.warning("예측기가 선택되지 않았습니다. 예측 작업을 건너뜁니다.")
+        predictor_manager = None
+    else:
+        predictor_manager = FacePredictors(*predictors, batcher=face_batcher(config, predictors))
+        #
+    #
+    return detector_manager, predictor_manager
+    #
+#
+def worker_frame_ring(capacity):
+    """추론 서버에 프레임을 넘길 때 사용하는 프로세스별 공유 메모리 링 버퍼 (capacity가 없으면 None)"""
+    if not capacity:
+        return None
+        #
+    #
+    # fork된 워커가 부모의 링 버퍼를 같이 쓰지 않도록 pid별로 생성
+    return model_registry.load(('FrameRing', os.getpid()), lambda: FrameRing(capacity))
+    #
+#
+def face_batcher(config, predictors):
+    """같은 예측기를 사용하는 요청들이 공유하는 MicroBatcher (config['micro_batching']이 없으면 None)"""
+    options = config.get('micro_batching')
+    if not options:
+        return None
+        #
+    #
+    key = ('MicroBatcher',) + tuple(type(predictor).__name__ for predictor in predictors)
+    return model_registry.load(key, lambda: MicroBatcher(
+        FacePredictors(*predictors).predict_batch,
+        concat=np.concatenate,
+        name='face-batch',
+        **options
+        ))
+    #
+#
+def create_django_system(config):
+    """config로 (ForDjango, 타겟 얼굴 인코딩)을 생성 (웹 요청과 관리 명령에서 사용)"""
+    # 추론 서버가 설정되어 있으면 모델은 서버에서 사용하고, 서버에 연결할 수 없을 때만 이 프로세스에서 로드
+    inference_client = InferenceClient.from_settings()
+    if inference_client is None:
+        detector_manager, predictor_manager = build_managers(config)
+    else:
+        detector_manager, predictor_manager = None, None
+        #
+    #
+    # 얼굴 인식 시스템 생성
+    ai_system = ForDjango(config, detector_manager, predictor_manager, inference_client=inference_client)
+    #
+    # 타겟 얼굴 인코딩 로드 (레지스트리에 보관하여 재사용)
+    target_encodings = model_registry.load(('target_encodings', config['pickle_path']), lambda: load_target_encodings(config['pickle_path']))
+    return ai_system, target_encodings
+    #
+#
 def setup_django_system(func):
     """설정 및 시스템 초기화를 처리하는 데코레이터"""
-    def wrapper(request, image_path, *args, **kwargs):
+    def wrapper(request, image_path, selected_detectors=None, selected_predictors=None, *args, **kwargs):
         # 경고 및 로깅 설정
         setup_warnings_and_logging()
         #
         # 설정 파일 로드
-        base_dir = os.path.join(Path(__file__).resolve().parent, 'ai_files')
-        django_media_dir = os.path.join(Path(__file__).resolve().parent.parent.parent, 'media/pybo/answer_image')
-        config = {
-            "dlib_model_path": os.path.join(base_dir, 'ai_models', 'DilbCNN', 'mmod_human_face_detector.dat'),
-            "yolo_model_path": os.path.join(base_dir, 'ai_models', 'YOLOv8', 'yolov8n-face.pt'),
-            "fair_face_model_path": os.path.join(base_dir, 'ai_models', 'FairFace', 'resnet34_fair_face_4.pt'),
-            "image_folder": os.path.join(base_dir, 'image_test', 'test_park_mind_problem'),
-            "pickle_path": os.path.join(base_dir, 'embedings', 'FaceRecognition(ResNet34).pkl'),
-            "font_path": os.path.join(base_dir, 'fonts', 'NanumGothic.ttf'),
-            "results_folder": django_media_dir,
-        }
-        #
-        # 사용자가 요청에서 선택한 모델을 가져옴 (POST나 GET 파라미터로 전달 가능)
-        selected_detectors = request.POST.getlist('detectors')  # 여러 탐지기 선택 가능
-        selected_predictors = request.POST.getlist('predictors')  # 여러 예측기 선택 가능
+        config = django_config()
         #
-        # 얼굴 탐지기 생성 - 사용자가 선택한 탐지기들을 설정
-        detectors = []
-        if 'dlib' in selected_detectors:
-            detectors.append(DlibFaceDetector(config['dlib_model_path']))
-        if 'yolo' in selected_detectors:
-            detectors.append(YOLOFaceDetector(config['yolo_model_path']))
-        if 'mtcnn' in selected_detectors:
-            detectors.append(MTCNNFaceDetector())
+        # 사용할 모델: 호출한 쪽에서 지정한 목록 (수락 제어로 줄인 경우 등), 없으면 사용자가 요청에서 선택한 모델
+        if selected_detectors is None:
+            selected_detectors = request.POST.getlist('detectors')  # 여러 탐지기 선택 가능
             #
         #
-        # 선택된 탐지기가 없는 경우
-        if not detectors:
-            logging.warning("탐지기가 선택되지 않았습니다. 탐지 작업을 건너뜁니다.")
-            detector_manager = None
-        else:
-            detector_manager = FaceDetectors(*detectors)
+        if selected_predictors is None:
+            selected_predictors = request.POST.getlist('predictors')  # 여러 예측기 선택 가능
             #
         #
-        # 얼굴 예측기 생성 - 사용자가 선택한 예측기들을 설정
-        predictors = []
-        if 'fairface' in selected_predictors:
-            predictors.append(FairFacePredictor(config['fair_face_model_path']))
-            #
+        config['selected_detectors'] = list(selected_detectors)
+        config['selected_predictors'] = list(selected_predictors)
         #
-        # 선택된 예측기가 없는 경우
-        if not predictors:
-            logging.warning("예측기가 선택되지 않았습니다. 예측 작업을 건너뜁니다.")
-            predictor_manager = None
-        else:
-            predictor_manager = FacePredictors(*predictors)
+        # 탐지 방식: 선택한 탐지기를 모두 실행('all') 또는 빠른 탐지기부터 필요한 만큼만 실행('cascade')
+        config['detection_strategy'] = request.POST.get('detection_strategy', 'all')
+        if config['detection_strategy'] not in FaceDetectors.STRATEGIES:
+            config['detection_strategy'] = 'all'
             #
         #
-        # 얼굴 인식 시스템 생성
-        ai_system = ForDjango(config, detector_manager, predictor_manager)
+        # 요청한 사용자 (추론 서버에서 사용자별로 공정하게 실행)
+        config['job_user'] = request.user.pk if request.user.is_authenticated else None
         #
-        # 타겟 얼굴 인코딩 로드
-        with open(config['pickle_path'], 'rb') as f:
-            target_encodings = np.array(pickle.load(f))
-            #
+        ai_system, target_encodings = create_django_system(config)
         #
         # 함수 실행
-        return func(request, image_path, ai_system, target_encodings, *args, **kwargs)
+        return func(request, image_path, ai_system, target_encodings, selected_detectors, selected_predictors, *args, **kwargs)
         #
     #
     return wrapper
@@ -790,14 +1564,19 @@ def main():
         "image_folder": os.path.join(base_dir, 'image_test', 'test_park_mind_problem'),
         "pickle_path": os.path.join(base_dir, 'embedings', 'FaceRecognition(ResNet34).pkl'),
         "font_path": os.path.join(base_dir, 'fonts', 'NanumGothic.ttf'),
-        "results_folder": os.path.join(base_dir, 'results_test')
+        "results_folder": os.path.join(base_dir, 'results_test'),
+        "detection_tiling": {"tile_size": 2048, "tile_overlap": 256, "parallel": True},
     }
     #
+    # 런타임 스레드 설정 (모델 로드 전에 적용)
+    model_registry.start()
+    #
     # 얼굴 탐지기 생성
     detector_manager = FaceDetectors(
         DlibFaceDetector(config['dlib_model_path']),
         YOLOFaceDetector(config['yolo_model_path']),
-        MTCNNFaceDetector()
+        MTCNNFaceDetector(),
+        **config['detection_tiling']
         )
     #
     # 얼굴 예측기 생성
@@ -809,17 +1588,16 @@ def main():
     ai_system = AiSystem(config, detector_manager, predictor_manager)
     #
     # 타겟 얼굴 인코딩 로드
-    with open(config['pickle_path'], 'rb') as f:
-        target_encodings = np.array(pickle.load(f))
+    target_encodings = load_target_encodings(config['pickle_path'])
     #
     # 이미지 폴더에서 이미지 로드
     image_list = [f for f in os.listdir(config['image_folder']) if f.lower().endswith(('png', 'jpg', 'jpeg'))]
+    image_paths = [os.path.join(config['image_folder'], image) for image in image_list]
     #
-    # 모든 이미지 처리
-    for image in image_list:
-        image_path = os.path.join(config['image_folder'], image)
+    # 모든 이미지 처리 (디코딩은 별도 프로세스에서 공유 메모리로 미리 진행, 프레임은 복사 없이 사용)
+    for image_path, image_rgb in iter_shared_frames(image_paths):
         logging.info(f"이미지 처리 시작: {image_path}")
-        output_path = ai_system.process_image(image_path, target_encodings)
+        output_path = ai_system.process_image(image_path, target_encodings, image_rgb)
         logging.info(f"이미지 처리 완료: {output_path}")
         #
     #
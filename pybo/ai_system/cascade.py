@@ -0,0 +1,117 @@
+import threading
+from collections import Counter, defaultdict
+#
+# =========================
+# 탐지기 캐스케이드 정책 및 통계
+# =========================
+# numpy/cv2를 사용하지 않으므로 상태 조회(ai_status)에서 AI 모듈을 불러오지 않고 통계를 읽을 수 있다.
+#
+class CascadePolicy:
+    """
+    비용이 낮은 탐지기부터 실행하고, 결과가 불확실할 때만 다음 탐지기를 실행하는 기준
+
+    - no_faces: 얼굴을 하나도 찾지 못함
+    - low_confidence: 신뢰도가 기준보다 낮은 얼굴이 있음 (기준은 탐지기별 LOW_CONFIDENCE 또는 min_confidence)
+    - tiny_faces: min_face_size보다 작은 얼굴이 있음 (작은 얼굴은 느린 탐지기가 더 잘 찾음)
+    - count_mismatch: 이전 단계와 검출 수가 count_tolerance 비율 이상 다름
+    """
+    # 탐지기별 신뢰도 기준 (탐지기마다 점수의 의미가 다르므로 따로 정함)
+    # - YOLO: 클래스 확률(0~1), 탐지 자체는 conf=0.35 이상만 반환하므로 0.5 미만은 경계선의 얼굴
+    # - MTCNN: 마지막 단계(O-Net)의 얼굴 확률(0~1), 실제 얼굴은 대부분 0.99 이상이므로 0.9를 기준으로 함
+    # - dlib mmod: 확률이 아닌 분류 경계로부터의 거리(상한 없음), 0보다 큰 것만 탐지되며
+    #   정면 얼굴은 보통 1 안팎이므로 0.5 미만(경계에 가까운 얼굴)을 불확실한 결과로 봄
+    # 모두 실측으로 보정한 값이 아닌 출발점이므로, ai_status의 cascade 통계(탐지기별 low_confidence 비율)를 보고
+    # settings.AI_CASCADE_POLICY['low_confidence']로 탐지기별로 조정한다.
+    LOW_CONFIDENCE = {'DlibFaceDetector': 0.5, 'YOLOFaceDetector': 0.5, 'MTCNNFaceDetector': 0.9}
+    #
+    def __init__(self, min_confidence=None, min_face_size=24, count_tolerance=0.2, low_confidence=None):
+        self.min_confidence = min_confidence # 모든 탐지기에 같은 기준 (None이면 탐지기별 기준)
+        self.min_face_size = min_face_size
+        self.count_tolerance = count_tolerance
+        self.low_confidence = dict(self.LOW_CONFIDENCE, **(low_confidence or {}))
+        #
+    #
+    def confidence_threshold(self, detector):
+        """탐지기의 신뢰도 기준"""
+        if self.min_confidence is not None:
+            return self.min_confidence
+            #
+        #
+        return self.low_confidence.get(type(detector).__name__, 0.5)
+        #
+    #
+    def escalation_reason(self, detector, faces, scores, previous_counts):
+        """다음 탐지기를 실행해야 하는 이유를 반환 (충분하면 None)"""
+        if not faces:
+            return 'no_faces'
+            #
+        #
+        if scores and min(scores) < self.confidence_threshold(detector):
+            return 'low_confidence'
+            #
+        #
+        if min(min(x2 - x, y2 - y) for x, y, x2, y2 in faces) < self.min_face_size:
+            return 'tiny_faces'
+            #
+        #
+        if previous_counts and abs(len(faces) - previous_counts[-1]) > max(1, self.count_tolerance * len(faces)):
+            return 'count_mismatch'
+            #
+        #
+        return None
+        #
+    #
+#
+class CascadeStats:
+    """탐지기별 실행/건너뜀 횟수와 다음 단계로 넘어간 이유를 누적 (프로세스 단위)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cascades = 0
+        self.runs = Counter()
+        self.skips = Counter()
+        self.reasons = Counter()
+        self.escalations = defaultdict(Counter) # 탐지기별 다음 단계로 넘긴 이유 (기준 조정용)
+        #
+    #
+    def record(self, ran, skipped, reasons):
+        """ran: 실행한 탐지기, skipped: 건너뛴 탐지기, reasons: 실행한 탐지기(마지막 제외)가 다음 단계로 넘긴 이유"""
+        with self._lock:
+            self.cascades += 1
+            self.runs.update(type(d).__name__ for d in ran)
+            self.skips.update(type(d).__name__ for d in skipped)
+            self.reasons.update(reasons)
+            for detector, reason in zip(ran, reasons):
+                self.escalations[type(detector).__name__][reason] += 1
+                #
+            #
+        #
+    #
+    def snapshot(self):
+        """현재 통계를 딕셔너리로 반환"""
+        with self._lock:
+            return {
+                'cascades': self.cascades,
+                'runs': dict(self.runs),
+                'skips': dict(self.skips),
+                'reasons': dict(self.reasons),
+                'escalations': {name: dict(reasons) for name, reasons in self.escalations.items()},
+            }
+            #
+        #
+    #
+    def summary(self):
+        """로그용 요약 문자열 (탐지기별 건너뜀 비율)"""
+        stats = self.snapshot()
+        stages = []
+        for name in sorted(set(stats['runs']) | set(stats['skips'])):
+            ran, skipped = stats['runs'].get(name, 0), stats['skips'].get(name, 0)
+            stages.append(f"{name} 실행 {ran} / 건너뜀 {skipped} ({skipped / (ran + skipped) * 100:.0f}%)")
+            #
+        #
+        return f"캐스케이드 {stats['cascades']}회: " + ", ".join(stages) + f" / 다음 단계 이유: {stats['reasons']}"
+        #
+    #
+#
+# 프로세스 전체의 캐스케이드 통계 (추론 서버를 사용하면 서버 프로세스에 누적됨)
+cascade_stats = CascadeStats()
+#
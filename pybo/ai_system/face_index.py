@@ -0,0 +1,176 @@
+import math
+import threading
+
+import numpy as np
+#
+# =========================
+# 얼굴 인코딩 근사 최근접 이웃 인덱스 (IVF)
+# =========================
+# 얼굴 인코딩(128차원)을 k-means 중심점(nlist개) 중 가장 가까운 목록에 나누어 보관하고,
+# 검색할 때는 질의와 가까운 nprobe개 목록만 비교한다 (전체 N개 대신 약 N * nprobe / nlist개).
+# nlist는 sqrt(N)으로 정하므로, 100만 얼굴이면 약 1000개 목록 중 8개(약 8천 개 인코딩)만 비교한다.
+#
+# - 인코딩은 float16으로 보관하여 메모리를 절반으로 줄이고, 비교할 목록만 float32로 변환한다.
+# - 추가는 가장 가까운 목록 끝에 붙이기만 하며, 크기가 마지막 학습 때의 retrain_factor배를 넘으면
+#   표본으로 중심점을 다시 학습하고 목록을 다시 나눈다 (목록 크기가 sqrt(N) 근처로 유지되도록).
+# - min_train개 미만이면 목록 하나에 모두 보관한다 (전체 비교).
+#
+def nearest_centroids(vectors, centroids, count=1, chunk_size=65536):
+    """vectors 각각에 가장 가까운 중심점 번호 (count > 1이면 가까운 순서로 count개)"""
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    results = []
+    for start in range(0, len(vectors), chunk_size):
+        # |x - c|^2 = |x|^2 - 2x·c + |c|^2 에서 |x|^2는 순위에 영향을 주지 않음
+        scores = centroid_norms - 2.0 * (vectors[start:start + chunk_size] @ centroids.T)
+        if count == 1:
+            results.append(np.argmin(scores, axis=1))
+        else:
+            count = min(count, len(centroids))
+            top = np.argpartition(scores, count - 1, axis=1)[:, :count]
+            order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)
+            results.append(np.take_along_axis(top, order, axis=1))
+            #
+        #
+    #
+    return np.concatenate(results) if results else np.empty((0,) if count == 1 else (0, count), dtype=np.int64)
+    #
+#
+def train_centroids(vectors, nlist, iterations=10, seed=0):
+    """k-means(Lloyd)로 nlist개의 중심점을 학습 (빈 목록의 중심점은 이전 값 유지)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=nlist)
+        present = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        centroids[present] = sums / counts[present, None]
+        #
+    #
+    return centroids
+    #
+#
+class IVFIndex:
+    """
+    (id, 인코딩)을 보관하고 유클리드 거리가 가까운 id를 찾는 IVF 인덱스 (스레드 안전)
+
+    - nprobe: 검색할 때 비교할 목록 수 (클수록 정확하고 느림)
+    - min_train: 이 수 이상 모이면 중심점을 학습 (미만이면 전체 비교)
+    - retrain_factor: 마지막 학습 때보다 이 배수만큼 커지면 다시 학습
+    - sample_size: 중심점 학습에 사용할 최대 표본 수
+    """
+    def __init__(self, dim=128, nprobe=8, min_train=1024, retrain_factor=4, sample_size=65536, iterations=10, seed=0):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.retrain_factor = retrain_factor
+        self.sample_size = sample_size
+        self.iterations = iterations
+        self.seed = seed
+        self._lock = threading.RLock()
+        self.size = 0
+        self.trained_size = 0
+        self.centroids = np.zeros((1, dim), dtype=np.float32) # 학습 전에는 목록 하나
+        self._ids = [[]] # 목록별 id 배열 조각 (검색할 때 하나로 합침)
+        self._vectors = [[]] # 목록별 float16 인코딩 배열 조각
+        #
+    #
+    @property
+    def nlist(self):
+        return len(self.centroids)
+        #
+    #
+    def add(self, ids, vectors):
+        """(id, 인코딩)들을 추가 (가장 가까운 목록 끝에 붙이고, 충분히 커지면 다시 학습)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(ids):
+            return
+            #
+        #
+        with self._lock:
+            self._append(ids, vectors)
+            self.size += len(ids)
+            if self.size >= self.min_train and self.size >= self.trained_size * self.retrain_factor:
+                self._rebuild()
+                #
+            #
+        #
+    #
+    def _append(self, ids, vectors):
+        assignments = nearest_centroids(vectors, self.centroids) if self.nlist > 1 else np.zeros(len(ids), dtype=np.int64)
+        order = np.argsort(assignments, kind='stable')
+        lists, starts = np.unique(assignments[order], return_index=True)
+        for position, list_no in enumerate(lists):
+            end = starts[position + 1] if position + 1 < len(starts) else len(order)
+            selected = order[starts[position]:end]
+            self._ids[list_no].append(ids[selected])
+            self._vectors[list_no].append(vectors[selected].astype(np.float16))
+            #
+        #
+    #
+    def _list(self, list_no):
+        """목록 하나의 (ids, float16 인코딩) - 조각이 여러 개면 합쳐서 보관"""
+        ids, vectors = self._ids[list_no], self._vectors[list_no]
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float16)
+            #
+        #
+        if len(ids) > 1:
+            ids[:] = [np.concatenate(ids)]
+            vectors[:] = [np.concatenate(vectors)]
+            #
+        #
+        return ids[0], vectors[0]
+        #
+    #
+    def _rebuild(self):
+        """전체 인코딩의 표본으로 중심점을 다시 학습하고 모든 인코딩을 다시 나눔"""
+        lists = [self._list(list_no) for list_no in range(self.nlist)]
+        ids = np.concatenate([list_ids for list_ids, _ in lists])
+        vectors = np.concatenate([list_vectors for _, list_vectors in lists]).astype(np.float32)
+        nlist = max(1, int(math.sqrt(len(ids))))
+        rng = np.random.default_rng(self.seed)
+        sample = vectors if len(vectors) <= self.sample_size else vectors[rng.choice(len(vectors), self.sample_size, replace=False)]
+        self.centroids = train_centroids(sample, nlist, self.iterations, self.seed)
+        self._ids = [[] for _ in range(nlist)]
+        self._vectors = [[] for _ in range(nlist)]
+        self._append(ids, vectors)
+        self.trained_size = len(ids)
+        #
+    #
+    def search(self, vector, k=20, max_distance=None, nprobe=None):
+        """vector와 가까운 순서로 (id, 거리) 목록을 반환 (max_distance보다 먼 결과는 제외)"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, self.dim)
+        with self._lock:
+            probes = nearest_centroids(vector, self.centroids, count=nprobe or self.nprobe)
+            probes = probes[0] if probes.ndim == 2 else probes
+            lists = [self._list(list_no) for list_no in probes]
+            #
+        #
+        ids = np.concatenate([list_ids for list_ids, _ in lists])
+        if not len(ids):
+            return []
+            #
+        #
+        vectors = np.concatenate([list_vectors for _, list_vectors in lists]).astype(np.float32)
+        distances = np.linalg.norm(vectors - vector, axis=1)
+        if len(ids) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+        else:
+            top = np.arange(len(ids))
+            #
+        #
+        top = top[np.argsort(distances[top])]
+        return [(int(ids[i]), float(distances[i])) for i in top if max_distance is None or distances[i] <= max_distance]
+        #
+    #
+    def snapshot(self):
+        with self._lock:
+            return {'size': self.size, 'nlist': self.nlist, 'nprobe': self.nprobe, 'trained_size': self.trained_size}
+            #
+        #
+    #
+#
@@ -0,0 +1,381 @@
+import logging
+import mmap
+import multiprocessing
+import os
+import secrets
+import threading
+import weakref
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+#
+# =========================
+# 공유 메모리 프레임 전달
+# =========================
+# 디코딩된 이미지(프레임)를 다른 프로세스(추론 서버, 배치 분석 프로세스)에 넘길 때
+# 파일을 다시 읽어 디코딩하거나 NumPy 배열을 pickle로 복사하지 않도록, 공유 메모리 링 버퍼에 디코딩하고
+# (세그먼트 이름, 위치, shape, dtype)만 전달한다. 받는 쪽은 같은 메모리를 복사 없이 읽기 전용 배열로 본다.
+#
+# 세그먼트 이름: pybo_frames_<만든 프로세스 pid>_<난수>
+# 만든 프로세스가 비정상 종료되어 남은 세그먼트는 cleanup_leaked_segments()가 pid로 찾아 지운다.
+#
+SEGMENT_PREFIX = 'pybo_frames_'
+SHM_DIR = '/dev/shm' # Linux의 POSIX 공유 메모리 위치
+ALIGNMENT = 64 # 프레임 시작 위치 정렬 (캐시 라인)
+#
+#
+class FrameTooLarge(ValueError):
+    """프레임이 링 버퍼 전체보다 큰 경우"""
+    #
+#
+class FrameHandle:
+    """공유 메모리에 있는 프레임 하나의 위치 정보 (프로세스 사이에 전달하는 값)"""
+    __slots__ = ('name', 'offset', 'shape', 'dtype')
+    #
+    def __init__(self, name, offset, shape, dtype):
+        self.name = name
+        self.offset = int(offset)
+        self.shape = tuple(int(v) for v in shape)
+        self.dtype = np.dtype(dtype).str
+        #
+    #
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+        #
+    #
+    def to_meta(self):
+        """JSON/pickle로 보낼 수 있는 딕셔너리로 변환"""
+        return {'shm': self.name, 'offset': self.offset, 'shape': list(self.shape), 'dtype': self.dtype}
+        #
+    #
+    @classmethod
+    def from_meta(cls, meta):
+        return cls(meta['shm'], meta['offset'], meta['shape'], meta['dtype'])
+        #
+    #
+    def __repr__(self):
+        return f"FrameHandle({self.name}, offset={self.offset}, shape={self.shape}, dtype={self.dtype})"
+        #
+    #
+#
+def _segment_owner(name):
+    """세그먼트 이름에서 만든 프로세스의 pid를 읽음 (형식이 다르면 None)"""
+    try:
+        return int(name[len(SEGMENT_PREFIX):].split('_', 1)[0])
+    except ValueError:
+        return None
+        #
+    #
+#
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError: # 다른 사용자의 살아 있는 프로세스
+        return True
+        #
+    #
+    return True
+    #
+#
+def cleanup_leaked_segments():
+    """만든 프로세스가 종료되었는데 남아 있는 프레임 세그먼트를 삭제하고, 삭제한 이름 목록을 반환 (Linux)"""
+    if not os.path.isdir(SHM_DIR):
+        return []
+        #
+    #
+    removed = []
+    for name in os.listdir(SHM_DIR):
+        pid = _segment_owner(name) if name.startswith(SEGMENT_PREFIX) else None
+        if pid is None or _pid_alive(pid):
+            continue
+            #
+        #
+        try:
+            os.unlink(os.path.join(SHM_DIR, name))
+            removed.append(name)
+        except OSError: # 다른 프로세스가 먼저 삭제
+            continue
+            #
+        #
+    #
+    if removed:
+        logging.warning(f"남아 있던 공유 메모리 프레임 세그먼트 {len(removed)}개 삭제: {removed}")
+        #
+    #
+    return removed
+    #
+#
+def _release_segment(segment):
+    """세그먼트를 닫고 삭제 (FrameRing이 정리되거나 프로세스가 종료될 때 한 번 호출)"""
+    try:
+        segment.close()
+    except BufferError: # 아직 배열 뷰가 남아 있음 (프로세스 종료 시 해제됨)
+        pass
+        #
+    #
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+        #
+    #
+#
+class FrameRing:
+    """
+    프레임을 쓰는 프로세스가 소유하는 공유 메모리 링 버퍼
+
+    allocate()는 이전 할당 바로 뒤(끝에 공간이 없으면 처음)에 공간을 잡고, release()는 할당 순서와 관계없이
+    호출할 수 있다. 가장 오래된 할당부터 연속으로 해제된 공간만 다시 사용하므로 단편화가 생기지 않는다.
+    세그먼트는 객체가 정리되거나 프로세스가 정상 종료될 때 삭제된다.
+    """
+    def __init__(self, capacity):
+        cleanup_leaked_segments()
+        self.capacity = int(capacity)
+        self.segment = shared_memory.SharedMemory(
+            name=f"{SEGMENT_PREFIX}{os.getpid()}_{secrets.token_hex(4)}", create=True, size=self.capacity)
+        self.name = self.segment.name
+        self._cond = threading.Condition()
+        self._live = OrderedDict() # 할당 위치 -> [크기, 해제 여부] (할당 순서)
+        self._head = 0 # 다음 할당 위치
+        self._finalizer = weakref.finalize(self, _release_segment, self.segment) # 프로세스 종료 시에도 실행됨
+        #
+    #
+    def _find_space(self, size):
+        """size 바이트를 할당할 위치 (공간이 없으면 None)"""
+        if not self._live:
+            self._head = 0
+            return 0
+            #
+        #
+        tail = next(iter(self._live))
+        if self._head > tail: # 감기지 않음: [head, 끝)과 [0, tail)이 비어 있음
+            if self.capacity - self._head >= size:
+                return self._head
+                #
+            #
+            return 0 if tail >= size else None
+            #
+        #
+        return self._head if tail - self._head >= size else None # 감김: [head, tail)만 비어 있음
+        #
+    #
+    def allocate(self, nbytes, timeout=None):
+        """nbytes를 할당하고 위치를 반환 (공간이 생길 때까지 timeout초 대기, 시간이 지나면 TimeoutError)"""
+        size = max(1, -(-int(nbytes) // ALIGNMENT)) * ALIGNMENT
+        if size > self.capacity:
+            raise FrameTooLarge(f"프레임({nbytes} 바이트)이 링 버퍼({self.capacity} 바이트)보다 큽니다.")
+            #
+        #
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._find_space(size) is not None, timeout):
+                raise TimeoutError("링 버퍼에 빈 공간이 없습니다.")
+                #
+            #
+            offset = self._find_space(size)
+            self._live[offset] = [size, False]
+            self._head = offset + size
+            return offset
+            #
+        #
+    #
+    def release(self, offset):
+        """할당을 해제 (가장 오래된 할당부터 연속으로 해제된 공간을 다시 사용할 수 있게 됨)"""
+        with self._cond:
+            self._live[offset][1] = True
+            while self._live and next(iter(self._live.values()))[1]:
+                self._live.popitem(last=False)
+                #
+            #
+            self._cond.notify_all()
+            #
+        #
+    #
+    def view(self, handle):
+        """이 링 버퍼에 있는 프레임의 쓰기 가능한 배열 뷰"""
+        return np.ndarray(handle.shape, dtype=handle.dtype, buffer=self.segment.buf, offset=handle.offset)
+        #
+    #
+    def put(self, frame, timeout=None):
+        """배열을 링 버퍼에 복사하고 FrameHandle을 반환"""
+        handle = FrameHandle(self.name, self.allocate(frame.nbytes, timeout), frame.shape, frame.dtype)
+        self.view(handle)[...] = frame
+        return handle
+        #
+    #
+    def decode_into(self, data, timeout=None):
+        """인코딩된 이미지 바이트를 RGB로 디코딩해 링 버퍼에 바로 기록하고 FrameHandle을 반환"""
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("이미지를 디코딩할 수 없습니다.")
+            #
+        #
+        handle = FrameHandle(self.name, self.allocate(image.nbytes, timeout), image.shape, image.dtype)
+        try:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self.view(handle)) # BGR -> RGB 변환 결과를 공유 메모리에 기록
+        except Exception:
+            self.release(handle.offset)
+            raise
+            #
+        #
+        return handle
+        #
+    #
+    def close(self):
+        """세그먼트를 삭제 (이미 전달한 프레임을 읽는 쪽은 닫을 때까지 계속 읽을 수 있음)"""
+        self._finalizer()
+        #
+    #
+#
+class FrameReader:
+    """
+    다른 프로세스의 FrameRing에 있는 프레임을 복사 없이 읽기 전용 배열로 보는 객체
+
+    Linux에서는 /dev/shm의 세그먼트를 직접 mmap하여 resource_tracker에 등록하지 않는다
+    (등록하면 이 프로세스가 종료될 때 다른 프로세스가 아직 사용 중인 세그먼트를 지울 수 있음).
+    연결한 세그먼트는 재사용하며, 만든 프로세스가 종료된 세그먼트는 새 세그먼트에 연결할 때 닫는다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._segments = {} # 세그먼트 이름 -> mmap 또는 SharedMemory
+        #
+    #
+    def _open(self, name):
+        path = os.path.join(SHM_DIR, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                #
+            #
+        #
+        return shared_memory.SharedMemory(name=name) # /dev/shm이 없는 플랫폼
+        #
+    #
+    def attach(self, handle):
+        """FrameHandle이 가리키는 프레임의 읽기 전용 배열 뷰"""
+        with self._lock:
+            segment = self._segments.get(handle.name)
+            if segment is None:
+                self._prune()
+                segment = self._segments[handle.name] = self._open(handle.name)
+                #
+            #
+        #
+        buffer = segment.buf if isinstance(segment, shared_memory.SharedMemory) else segment
+        frame = np.ndarray(handle.shape, dtype=handle.dtype, buffer=buffer, offset=handle.offset)
+        frame.flags.writeable = False
+        return frame
+        #
+    #
+    def _prune(self):
+        """만든 프로세스가 종료된 세그먼트 연결을 닫음"""
+        for name in [name for name in self._segments if not _pid_alive(_segment_owner(name) or 0)]:
+            self._close_segment(self._segments.pop(name))
+            #
+        #
+    #
+    @staticmethod
+    def _close_segment(segment):
+        try:
+            segment.close()
+        except BufferError: # 아직 사용 중인 배열 뷰가 있음 (참조가 사라지면 해제됨)
+            logging.warning("공유 메모리 프레임을 사용 중이어서 연결을 바로 닫지 못했습니다.")
+            #
+        #
+    #
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                self._close_segment(segment)
+                #
+            #
+            self._segments.clear()
+            #
+        #
+    #
+#
+# =========================
+# 배치 분석용 프레임 파이프라인
+# =========================
+def _decode_worker(image_paths, capacity, frames, releases):
+    """디코딩 프로세스: 이미지를 링 버퍼에 디코딩하고 위치를 frames 큐로 전달, releases 큐로 해제 요청을 받음"""
+    ring = FrameRing(capacity)
+    #
+    def release_loop():
+        while True:
+            offset = releases.get()
+            if offset is None:
+                return
+                #
+            #
+            ring.release(offset)
+            #
+        #
+    #
+    releaser = threading.Thread(target=release_loop, daemon=True)
+    releaser.start()
+    try:
+        for image_path in image_paths:
+            try:
+                with open(image_path, 'rb') as f:
+                    handle = ring.decode_into(f.read())
+                    #
+                #
+                frames.put((image_path, handle.to_meta(), None))
+            except Exception as e: # 읽기/디코딩 실패, 링 버퍼보다 큰 이미지
+                frames.put((image_path, None, str(e)))
+                #
+            #
+        #
+        frames.put(None)
+        releaser.join() # 받는 쪽이 모든 프레임을 다 쓸 때까지 세그먼트 유지
+    finally:
+        ring.close()
+        #
+    #
+#
+def iter_shared_frames(image_paths, capacity=256 * 1024 * 1024):
+    """
+    별도 프로세스에서 이미지를 디코딩하면서 (이미지 경로, 읽기 전용 RGB 프레임 또는 None)을 차례로 반환
+
+    다음 프레임을 요청하면 이전 프레임의 공간이 해제되므로, 반환된 프레임은 다음 반복 전까지만 사용해야 한다.
+    디코딩에 실패한 이미지(또는 링 버퍼보다 큰 이미지)는 프레임 대신 None을 반환한다.
+    """
+    context = multiprocessing.get_context('spawn')
+    frames, releases = context.Queue(), context.Queue()
+    process = context.Process(target=_decode_worker, args=(list(image_paths), capacity, frames, releases), daemon=True)
+    process.start()
+    reader = FrameReader()
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+                #
+            #
+            image_path, meta, error = item
+            if error is not None:
+                logging.warning(f"공유 메모리 디코딩 실패, 파일에서 직접 읽습니다: {image_path} ({error})")
+                yield image_path, None
+                continue
+                #
+            #
+            handle = FrameHandle.from_meta(meta)
+            try:
+                yield image_path, reader.attach(handle)
+            finally:
+                releases.put(handle.offset)
+                #
+            #
+        #
+    finally:
+        releases.put(None)
+        process.join(timeout=10)
+        reader.close()
+        #
+    #
+#
@@ -0,0 +1,140 @@
+import logging
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+from . import inference_protocol as protocol
+from .scheduler import SchedulerBusy
+#
+# =========================
+# 추론 서버 클라이언트
+# =========================
+class InferenceUnavailable(Exception):
+    """추론 서버에 연결할 수 없거나 응답이 없는 경우 (프로세스 내 추론으로 대체)"""
+    #
+#
+class InferenceError(Exception):
+    """추론 서버가 요청을 처리하다 실패한 경우 (같은 이미지는 프로세스 내에서도 실패하므로 대체하지 않음)"""
+    #
+#
+class InferenceClient:
+    """
+    Django 워커에서 추론 서버(manage.py inference_server)로 이미지를 보내고 탐지/예측 결과를 받는 클라이언트
+
+    요청마다 Unix 소켓 연결을 새로 연다. 서버에 연결하지 못하면 retry_interval초 동안은
+    연결을 시도하지 않고 바로 InferenceUnavailable을 발생시켜, 서버가 없을 때 요청마다 기다리지 않도록 한다.
+    frame_ring_size는 서버에 디코딩된 프레임을 공유 메모리로 넘길 때 사용하는 링 버퍼 크기이다 (None이면 이미지 바이트 전송).
+    """
+    _down_lock = threading.Lock()
+    _down_until = {} # 소켓 경로별 다음 연결 시도 시각 (프로세스 전체에서 공유)
+    #
+    def __init__(self, socket_path, timeout=60.0, retry_interval=10.0, frame_ring_size=None):
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.frame_ring_size = frame_ring_size
+        #
+    #
+    @classmethod
+    def from_settings(cls):
+        """settings.AI_INFERENCE_SERVER 설정으로 클라이언트 생성 (설정이 없거나 socket이 비어 있으면 None)"""
+        options = dict(getattr(settings, 'AI_INFERENCE_SERVER', None) or {})
+        socket_path = options.pop('socket', None)
+        if not socket_path:
+            return None
+            #
+        #
+        for name in ('max_batch', 'max_wait_ms', 'max_queue'): # 서버 설정
+            options.pop(name, None)
+            #
+        #
+        return cls(socket_path, **options)
+        #
+    #
+    def _connect(self):
+        with self._down_lock:
+            if self._down_until.get(self.socket_path, 0) > time.monotonic():
+                raise InferenceUnavailable(f"추론 서버 연결 재시도 대기 중: {self.socket_path}")
+                #
+            #
+        #
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            self._mark_down()
+            raise InferenceUnavailable(f"추론 서버에 연결할 수 없습니다: {self.socket_path} ({e})") from e
+            #
+        #
+        return sock
+        #
+    #
+    def _mark_down(self):
+        with self._down_lock:
+            self._down_until[self.socket_path] = time.monotonic() + self.retry_interval
+            #
+        #
+    #
+    def _request(self, kind, meta=None, payload=b''):
+        """요청 하나를 보내고 응답 (종류, 메타데이터, 페이로드)를 반환"""
+        sock = self._connect()
+        try:
+            protocol.send_message(sock, kind, meta, payload)
+            reply = protocol.recv_message(sock)
+        except (OSError, protocol.ProtocolError) as e: # 시간 초과(socket.timeout)도 OSError
+            self._mark_down()
+            raise InferenceUnavailable(f"추론 서버 응답 없음: {e}") from e
+        finally:
+            sock.close()
+            #
+        #
+        if reply is None:
+            self._mark_down()
+            raise InferenceUnavailable("추론 서버가 응답 없이 연결을 닫았습니다.")
+            #
+        #
+        kind, meta, payload = reply
+        if kind == protocol.ERROR:
+            if 'retry_after' in meta: # 서버 대기열이 가득 참 (프로세스 내 추론으로 대체하면 부하만 늘어나므로 대체하지 않음)
+                raise SchedulerBusy(meta.get('error', '추론 서버가 바쁩니다.'), meta['retry_after'])
+                #
+            #
+            raise InferenceError(meta.get('error', '알 수 없는 오류'))
+            #
+        #
+        return kind, meta, payload
+        #
+    #
+    def ping(self):
+        """서버가 응답하면 서버 상태(메타데이터)를 반환"""
+        return self._request(protocol.PING)[1]
+        #
+    #
+    def analyze(self, image_bytes, options):
+        """
+        인코딩된 이미지 바이트를 분석하여 ((predictions, face_cnt, race_cnt, male_cnt), 얼굴별 정보)를 반환
+
+        options: {'detectors': [...], 'predictors': [...], 'strategy': 'all' | 'cascade',
+                  'user': 사용자 ID, 'job_class': 'interactive' | 'bulk' | 'backfill'}
+        """
+        _, reply_meta, payload = self._request(protocol.ANALYZE, options, image_bytes)
+        logging.info(f"추론 서버 분석 완료: 배치 크기 {reply_meta.get('batch_size')}")
+        return protocol.decode_analysis(reply_meta, payload), protocol.decode_face_details(reply_meta, payload)
+        #
+    #
+    def analyze_frame(self, frame, options):
+        """
+        공유 메모리에 디코딩된 프레임(FrameHandle)을 분석하여 analyze()와 같은 결과를 반환
+
+        서버는 응답하기 전에 프레임 사용을 끝내므로, 응답을 받은 뒤 프레임 공간을 해제해도 된다.
+        """
+        _, reply_meta, payload = self._request(protocol.ANALYZE_FRAME, dict(options, **frame.to_meta()))
+        logging.info(f"추론 서버 분석 완료(공유 메모리 프레임): 배치 크기 {reply_meta.get('batch_size')}")
+        return protocol.decode_analysis(reply_meta, payload), protocol.decode_face_details(reply_meta, payload)
+        #
+    #
+#
@@ -0,0 +1,165 @@
+import json
+import struct
+
+import numpy as np
+#
+# =========================
+# 추론 서버 통신 규약
+# =========================
+# Django 워커와 추론 서버(inference_server.py)는 Unix 소켓으로 아래 형식의 메시지를 주고받는다.
+#
+#   헤더(16바이트) | 메타데이터(JSON, UTF-8) | 페이로드(바이너리)
+#
+# 헤더: 매직(4) | 버전(1) | 메시지 종류(1) | 예약(2) | 메타데이터 길이(4) | 페이로드 길이(4), 네트워크 바이트 순서
+# 요청 페이로드는 인코딩된 이미지 바이트 그대로(JPEG/PNG)이거나, 디코딩된 프레임이 공유 메모리에 있으면 비어 있다.
+# 응답 페이로드는 얼굴 박스 (N, 4) int32 배열이며, 예측기를 사용한 경우 얼굴 인코딩 (N, 128) float32 배열이 이어진다.
+# 크기가 큰 데이터는 JSON에 넣지 않고 페이로드로 전달한다.
+#
+MAGIC = b'PYAI'
+VERSION = 1
+HEADER = struct.Struct('!4sBBHII')
+#
+# 메타데이터/페이로드 최대 크기 (잘못된 헤더로 큰 메모리를 할당하지 않도록 제한)
+MAX_META_SIZE = 1 << 20
+MAX_PAYLOAD_SIZE = 256 << 20
+#
+# 요청 메시지 종류
+ANALYZE = 1  # 페이로드: 인코딩된 이미지 바이트
+ANALYZE_FRAME = 2  # 페이로드 없음, 메타데이터의 shm/offset/shape/dtype(frame_transport.FrameHandle)로 디코딩된 RGB 프레임 전달
+PING = 3
+#
+# 응답 메시지 종류
+RESULT = 0x81
+ERROR = 0x82
+PONG = 0x83
+#
+#
+class ProtocolError(Exception):
+    """통신 규약에 맞지 않는 메시지를 받은 경우"""
+    #
+#
+def _json_default(value):
+    """numpy 스칼라 등 JSON으로 바로 변환되지 않는 값 처리"""
+    if hasattr(value, 'item'):
+        return value.item()
+        #
+    #
+    raise TypeError(f"JSON으로 변환할 수 없는 값입니다: {value!r}")
+    #
+#
+def send_message(sock, kind, meta=None, payload=b''):
+    """메시지 하나를 전송 (페이로드는 복사하지 않고 그대로 전송)"""
+    meta_bytes = json.dumps(meta or {}, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+    sock.sendall(HEADER.pack(MAGIC, VERSION, kind, 0, len(meta_bytes), len(payload)) + meta_bytes)
+    if payload:
+        sock.sendall(payload)
+        #
+    #
+#
+def _recv_exact(sock, size):
+    """정확히 size 바이트를 받아서 반환 (처음부터 연결이 닫혀 있으면 None)"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            if received == 0:
+                return None
+                #
+            #
+            raise ProtocolError(f"메시지를 받는 중 연결이 끊겼습니다 ({received}/{size} 바이트)")
+            #
+        #
+        received += count
+        #
+    #
+    return buffer
+    #
+#
+def recv_message(sock):
+    """메시지 하나를 받아서 (종류, 메타데이터, 페이로드)를 반환 (상대가 연결을 닫았으면 None)"""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+        #
+    #
+    magic, version, kind, _, meta_size, payload_size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError(f"지원하지 않는 메시지입니다: magic={magic!r}, version={version}")
+        #
+    #
+    if meta_size > MAX_META_SIZE or payload_size > MAX_PAYLOAD_SIZE:
+        raise ProtocolError(f"메시지가 너무 큽니다: 메타데이터 {meta_size}, 페이로드 {payload_size} 바이트")
+        #
+    #
+    meta = json.loads(bytes(_recv_exact(sock, meta_size) or b'{}')) if meta_size else {}
+    payload = (_recv_exact(sock, payload_size) or bytearray()) if payload_size else bytearray()
+    return kind, meta, payload
+    #
+#
+def encode_analysis(predictions, face_cnt, race_cnt, male_cnt, labeled, details=None):
+    """
+    분석 결과를 (메타데이터, 페이로드)로 변환
+
+    labeled가 True이면 predictions는 (x, y, w, h, 인종, 성별, 박스 색상, 텍스트),
+    False(예측기 없음)이면 탐지된 얼굴 좌표 그대로이다.
+    details는 얼굴별 {'age', 'embedding', 'distance'} (AiSystem.face_details, predictions와 같은 순서)이다.
+    예측기 없이 탐지만 한 경우 인코딩하지 못한 얼굴의 embedding은 None이며, 페이로드에는 인코딩한 얼굴만 담는다.
+    """
+    boxes = np.asarray([prediction[:4] for prediction in predictions], dtype='>i4').reshape(-1, 4)
+    meta = {
+        'face_cnt': face_cnt,
+        'race_cnt': race_cnt,
+        'male_cnt': male_cnt,
+        'labels': [list(prediction[4:]) for prediction in predictions] if labeled else None,
+        'boxes': len(boxes),
+    }
+    payload = boxes.tobytes()
+    if details:
+        encoded = [detail.get('embedding') for detail in details if detail.get('embedding') is not None]
+        meta['details'] = [
+            {'age': detail.get('age'), 'distance': detail.get('distance'), 'encoded': detail.get('embedding') is not None}
+            for detail in details
+            ]
+        if encoded:
+            embeddings = np.asarray(encoded, dtype='>f4')
+            meta['embedding_dim'] = embeddings.shape[1]
+            payload += embeddings.tobytes()
+            #
+        #
+    #
+    return meta, payload
+    #
+#
+def decode_analysis(meta, payload):
+    """encode_analysis의 반대: (predictions, face_cnt, race_cnt, male_cnt)를 반환"""
+    count = meta.get('boxes')
+    boxes = np.frombuffer(payload, dtype='>i4', count=-1 if count is None else count * 4).reshape(-1, 4).tolist()
+    labels = meta.get('labels')
+    if labels is None:
+        predictions = [tuple(box) for box in boxes]
+    else:
+        predictions = [
+            (*box, race, gender, tuple(box_color), text)
+            for box, (race, gender, box_color, text) in zip(boxes, labels)
+            ]
+        #
+    #
+    return predictions, meta.get('face_cnt'), meta.get('race_cnt'), meta.get('male_cnt')
+    #
+#
+def decode_face_details(meta, payload):
+    """encode_analysis의 details를 복원 (얼굴 인코딩은 float32 배열, 인코딩하지 못한 얼굴은 None, details가 없으면 빈 목록)"""
+    details = meta.get('details')
+    if not details:
+        return []
+        #
+    #
+    offset = meta['boxes'] * 4 * 4
+    encoded = [detail.pop('encoded', True) for detail in details]
+    embeddings = iter(np.frombuffer(payload, dtype='>f4', offset=offset).reshape(sum(encoded), meta.get('embedding_dim', 0)))
+    return [dict(detail, embedding=next(embeddings).astype('<f4') if has_embedding else None)
+            for detail, has_embedding in zip(details, encoded)]
+    #
+#
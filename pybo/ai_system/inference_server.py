@@ -0,0 +1,234 @@
+import logging
+import os
+import socketserver
+import time
+
+from . import inference_protocol as protocol
+from .ai_system import ForDjango, build_managers, decode_image_rgb, load_target_encodings, resize_crops
+from .cascade import cascade_stats
+from .frame_transport import FrameHandle, FrameReader, cleanup_leaked_segments
+from .micro_batcher import MicroBatcher
+from .model_registry import model_registry
+from .scheduler import FairQueue, SchedulerBusy
+#
+# =========================
+# 추론 서버
+# =========================
+# 모든 Django 워커가 공유하는 추론 전용 프로세스 (manage.py inference_server로 실행).
+# 모델(ResNet34, YOLO, dlib CNN, MTCNN)은 이 프로세스에만 한 번 로드되고,
+# 워커는 Unix 소켓으로 이미지를 보내 얼굴 박스와 예측 결과만 받는다 (inference_client.py).
+#
+class InferenceJob:
+    """워커 요청 하나 (연결 스레드가 만들고, 배치 스레드가 결과 또는 오류를 채움)"""
+    def __init__(self, options, image_rgb):
+        self.options = options
+        self.image_rgb = image_rgb
+        self.result = None # (메타데이터, 페이로드)
+        self.error = None
+        self.batch_size = 0
+        #
+    #
+    def finish(self, result=None, error=None):
+        self.result, self.error = result, error
+        #
+    #
+#
+class InferenceEngine:
+    """
+    모델을 소유하고 여러 요청을 한 번에 처리하는 추론 엔진
+
+    얼굴 탐지는 이미지마다 실행하지만, FairFace 예측은 같은 예측기 구성을 사용하는 요청들의
+    얼굴을 모두 모아 한 번의 배치로 실행한다 (요청마다 배치 크기 1로 실행하지 않음).
+    """
+    def __init__(self, config):
+        # 요청들은 서버의 배치 스케줄러가 이미 모아서 전달하므로 예측기마다 따로 모으지 않음
+        self.config = dict(config, micro_batching=None)
+        self.system = ForDjango(self.config, None, None) # 얼굴 인코딩 비교/집계 로직 재사용
+        self.target_encodings = model_registry.load(('target_encodings', config['pickle_path']), lambda: load_target_encodings(config['pickle_path']))
+        self._managers = {}
+        #
+    #
+    def managers(self, options):
+        """요청 설정(탐지기/예측기/탐지 방식)별 (detector_manager, predictor_manager), 모델은 레지스트리에서 공유"""
+        key = (tuple(sorted(options.get('detectors', ()))), tuple(sorted(options.get('predictors', ()))), options.get('strategy', 'all'))
+        if key not in self._managers:
+            config = dict(self.config, selected_detectors=list(key[0]), selected_predictors=list(key[1]), detection_strategy=key[2])
+            self._managers[key] = build_managers(config)
+            #
+        #
+        return self._managers[key]
+        #
+    #
+    def run_batch(self, jobs):
+        """요청 목록을 처리하고 각 요청의 결과(또는 오류)를 채운 뒤 요청 목록을 반환"""
+        prepared = [] # (job, predictor_manager, faces 또는 boxes, crops)
+        for job in jobs:
+            job.batch_size = len(jobs)
+            try:
+                detector_manager, predictor_manager = self.managers(job.options)
+                faces = detector_manager.manage_prediction(job.image_rgb) if detector_manager else []
+                if predictor_manager is None:
+                    details = self.system.encode_faces(job.image_rgb, faces, job.options.get('image_sha256')) # 얼굴 검색용 인코딩
+                    job.finish(protocol.encode_analysis(faces, f'{len(faces)}', None, None, labeled=False, details=details))
+                    continue
+                    #
+                #
+                boxes, crops = self.system._extract_faces(job.image_rgb, faces)
+                prepared.append((job, predictor_manager, boxes, crops))
+            except Exception as e:
+                logging.exception("추론 서버: 얼굴 탐지 중 오류 발생")
+                job.finish(error=str(e))
+                #
+            #
+        #
+        # 예측기 구성이 같은 요청들의 얼굴을 모아 한 번에 예측
+        groups = {}
+        for item in prepared:
+            groups.setdefault(id(item[1]), []).append(item)
+            #
+        #
+        for items in groups.values():
+            predictor_manager = items[0][1]
+            crops = [crop for _, _, _, job_crops in items for crop in job_crops]
+            try:
+                results = predictor_manager.manage_batch_prediction(resize_crops(crops)) if crops else []
+            except Exception as e:
+                logging.exception("추론 서버: 얼굴 예측 중 오류 발생")
+                for job, _, _, _ in items:
+                    job.finish(error=str(e))
+                    #
+                #
+                continue
+                #
+            #
+            offset = 0
+            for job, _, boxes, job_crops in items:
+                job_results = results[offset:offset + len(job_crops)]
+                offset += len(job_crops)
+                try:
+                    analysis = self.system._combine_predictions(job.image_rgb, boxes, job_results, self.target_encodings, job.options.get('image_sha256'))
+                    job.finish(protocol.encode_analysis(*analysis, labeled=True, details=self.system.face_details))
+                except Exception as e:
+                    logging.exception("추론 서버: 예측 결과 처리 중 오류 발생")
+                    job.finish(error=str(e))
+                    #
+                #
+            #
+        #
+        return jobs
+        #
+    #
+#
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """워커 연결 하나를 처리 (연결마다 스레드 하나)"""
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                message = protocol.recv_message(self.request)
+            except (OSError, protocol.ProtocolError) as e:
+                logging.warning(f"추론 서버: 잘못된 요청 - {e}")
+                return
+                #
+            #
+            if message is None: # 워커가 연결을 닫음
+                return
+                #
+            #
+            kind, meta, payload = message
+            if kind == protocol.PING:
+                protocol.send_message(self.request, protocol.PONG, server.status())
+                continue
+                #
+            #
+            try:
+                if kind == protocol.ANALYZE:
+                    image_rgb = decode_image_rgb(payload)
+                elif kind == protocol.ANALYZE_FRAME: # 워커의 공유 메모리 프레임을 복사 없이 사용
+                    image_rgb = server.frames.attach(FrameHandle.from_meta(meta))
+                else:
+                    raise protocol.ProtocolError(f"알 수 없는 메시지 종류입니다: {kind}")
+                    #
+                #
+            except Exception as e:
+                protocol.send_message(self.request, protocol.ERROR, {'error': str(e)})
+                continue
+                #
+            #
+            try:
+                job = server.submit(meta, image_rgb)
+            except SchedulerBusy as e: # 대기 작업이 너무 많음 (워커가 재시도 시간을 전달)
+                protocol.send_message(self.request, protocol.ERROR, {'error': str(e), 'retry_after': e.retry_after})
+                continue
+            except Exception as e: # 배치 전체가 실패한 경우
+                protocol.send_message(self.request, protocol.ERROR, {'error': str(e)})
+                continue
+                #
+            #
+            del image_rgb, job.image_rgb # 응답 후에는 워커가 프레임 공간을 재사용하므로 참조를 남기지 않음
+            if job.error is not None:
+                protocol.send_message(self.request, protocol.ERROR, {'error': job.error})
+            else:
+                reply_meta, reply_payload = job.result
+                reply_meta['batch_size'] = job.batch_size
+                protocol.send_message(self.request, protocol.RESULT, reply_meta, reply_payload)
+                #
+            #
+        #
+    #
+#
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix 소켓으로 워커 요청을 받아 배치 스케줄러(MicroBatcher)로 모아 처리하는 서버
+
+    연결 스레드는 요청을 스케줄러에 넣고 기다리며, 스케줄러는 첫 요청 후 max_wait_ms 동안 또는
+    max_batch개가 모일 때까지 요청을 모아 InferenceEngine.run_batch로 한 번에 처리한다.
+    모델은 스케줄러의 배치 스레드에서만 사용한다.
+    대기열은 요청의 작업 클래스(interactive/bulk/backfill)와 사용자별 공정 순서로 꺼내며(FairQueue),
+    max_queue개를 넘으면 요청을 받지 않고 재시도 시간을 응답한다.
+    """
+    daemon_threads = True
+    #
+    def __init__(self, socket_path, engine, max_batch=8, max_wait_ms=5.0, max_queue=None, weights=None):
+        self.socket_path = str(socket_path)
+        self.engine = engine
+        self.queue = FairQueue(weights, max_depth=max_queue)
+        self.batcher = MicroBatcher(engine.run_batch, max_batch=max_batch, max_wait_ms=max_wait_ms, name='inference-batch', queue=self.queue)
+        self.frames = FrameReader() # 워커들의 공유 메모리 프레임 연결
+        self.started = time.time()
+        cleanup_leaked_segments() # 종료된 워커가 남긴 세그먼트 정리
+        #
+        os.makedirs(os.path.dirname(self.socket_path) or '.', exist_ok=True)
+        if os.path.exists(self.socket_path): # 이전 서버가 남긴 소켓 파일
+            os.unlink(self.socket_path)
+            #
+        #
+        super().__init__(self.socket_path, _RequestHandler)
+        os.chmod(self.socket_path, 0o660) # 같은 그룹(웹 서버 사용자)만 접근
+        #
+    #
+    @property
+    def max_batch(self):
+        return self.batcher.max_batch
+        #
+    #
+    def submit(self, options, image_rgb):
+        """요청 하나를 배치에 넣고 처리가 끝난 InferenceJob을 반환"""
+        job = InferenceJob(options, image_rgb)
+        self.batcher.submit([job], user=options.get('user'), job_class=options.get('job_class', 'interactive'))
+        return job
+        #
+    #
+    def status(self):
+        return dict(self.batcher.stats.snapshot(), queue=self.queue.snapshot(), cascade=cascade_stats.snapshot(), uptime=time.time() - self.started)
+        #
+    #
+    def server_close(self):
+        super().server_close()
+        self.frames.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+            #
+        #
+    #
+#
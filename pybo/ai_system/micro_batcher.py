@@ -0,0 +1,184 @@
+import logging
+import queue as _queue
+import threading
+import time
+#
+# =========================
+# 마이크로 배치 스케줄러
+# =========================
+# 동시에 들어온 여러 요청의 입력(얼굴 이미지, 이미지 등)을 최대 max_wait_ms 동안 또는 max_batch개가 모일 때까지
+# 모아 한 번의 배치 추론으로 실행하고, 결과를 요청별로 나누어 돌려준다.
+# 배치 크기 1로 여러 번 실행하는 것보다 GPU/CPU를 효율적으로 사용하는 대신, 요청마다 최대 max_wait_ms의 대기가 추가된다.
+#
+class MicroBatchStats:
+    """배치 수, 배치 채움 비율(입력 수 / max_batch), 큐 대기 시간을 누적 (배치 스케줄러 단위)"""
+    def __init__(self, max_batch):
+        self._lock = threading.Lock()
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        self.fill_ratio_total = 0.0
+        self.delay_total = 0.0
+        self.delay_max = 0.0
+        #
+    #
+    def record(self, items, delays):
+        with self._lock:
+            self.batches += 1
+            self.requests += len(delays)
+            self.items += items
+            self.fill_ratio_total += min(1.0, items / self.max_batch)
+            self.delay_total += sum(delays)
+            self.delay_max = max(self.delay_max, max(delays))
+            #
+        #
+    #
+    def snapshot(self):
+        """현재 통계를 딕셔너리로 반환 (대기 시간은 ms)"""
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'requests': self.requests,
+                'items': self.items,
+                'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+                'mean_fill_ratio': self.fill_ratio_total / self.batches if self.batches else 0.0,
+                'mean_queue_delay_ms': self.delay_total / self.requests * 1000 if self.requests else 0.0,
+                'max_queue_delay_ms': self.delay_max * 1000,
+            }
+            #
+        #
+    #
+    def summary(self):
+        """로그용 요약 문자열"""
+        stats = self.snapshot()
+        return (
+            f"배치 {stats['batches']}회 (요청 {stats['requests']}건, 입력 {stats['items']}개): "
+            f"평균 크기 {stats['mean_batch_size']:.1f}, 채움 비율 {stats['mean_fill_ratio'] * 100:.0f}%, "
+            f"큐 대기 평균 {stats['mean_queue_delay_ms']:.1f} ms / 최대 {stats['max_queue_delay_ms']:.1f} ms"
+        )
+        #
+    #
+#
+class _BatchRequest:
+    """submit() 호출 하나 (입력 목록과 결과를 기다리는 이벤트)"""
+    def __init__(self, items):
+        self.items = items
+        self.submitted = time.monotonic()
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+        #
+    #
+#
+def _concat_lists(parts):
+    return [item for part in parts for item in part]
+    #
+#
+class MicroBatcher:
+    """
+    동시 요청을 모아 한 번에 실행하는 배치 스케줄러
+
+    run_batch(items)는 입력 목록을 받아 같은 길이의 결과 목록을 반환해야 하며, 배치 스레드 하나에서만 호출된다.
+    concat(parts)는 요청별 입력 목록들을 하나로 합치는 함수이다 (기본값: 리스트 연결, NumPy 배치는 np.concatenate).
+    max_batch보다 많은 입력을 가진 요청 하나는 나누지 않고 단독 배치로 실행한다.
+    queue는 요청 대기열이다 (기본값: 도착 순서, scheduler.FairQueue를 넣으면 우선순위 클래스/사용자별 공정 순서).
+    """
+    def __init__(self, run_batch, max_batch=16, max_wait_ms=5.0, concat=None, name='micro-batch', queue=None):
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.concat = concat or _concat_lists
+        self.name = name
+        self.stats = MicroBatchStats(self.max_batch)
+        self._queue = queue if queue is not None else _queue.Queue()
+        self._carry = None # 이전 배치에 넣지 못한 요청 (다음 배치의 첫 요청)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        #
+    #
+    def submit(self, items, **put_options):
+        """
+        입력 목록을 배치에 넣고, 배치 실행이 끝나면 이 요청의 결과 목록을 반환 (배치 실행 중 오류는 그대로 발생)
+
+        put_options는 대기열의 put()에 그대로 전달한다 (FairQueue의 user, job_class 등, 대기열이 가득 차면 SchedulerBusy).
+        """
+        if len(items) == 0:
+            return []
+            #
+        #
+        self._ensure_started()
+        request = _BatchRequest(items)
+        self._queue.put(request, **put_options)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+            #
+        #
+        return request.results
+        #
+    #
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'pybo-{self.name}', daemon=True)
+                self._thread.start()
+                #
+            #
+        #
+    #
+    def _collect(self):
+        """첫 요청이 들어온 뒤 max_wait 동안 또는 입력이 max_batch개가 될 때까지 요청을 모음"""
+        first = self._carry or self._queue.get()
+        self._carry = None
+        requests, count = [first], len(first.items)
+        deadline = first.submitted + self.max_wait
+        while count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except _queue.Empty:
+                break
+                #
+            #
+            if count + len(request.items) > self.max_batch: # 넘치는 요청은 다음 배치로
+                self._carry = request
+                break
+                #
+            #
+            requests.append(request)
+            count += len(request.items)
+            #
+        #
+        return requests, count
+        #
+    #
+    def _run(self):
+        while True:
+            requests, count = self._collect()
+            started = time.monotonic()
+            try:
+                results = self.run_batch(self.concat([request.items for request in requests]))
+                offset = 0
+                for request in requests: # 결과를 요청별로 나누어 전달
+                    request.results = results[offset:offset + len(request.items)]
+                    offset += len(request.items)
+                    #
+                #
+            except Exception as e:
+                logging.error(f"{self.name}: 배치 실행 중 오류 발생: {e}")
+                for request in requests:
+                    request.error = e
+                    #
+                #
+            #
+            self.stats.record(count, [started - request.submitted for request in requests])
+            for request in requests:
+                request.done.set()
+                #
+            #
+            logging.debug(f"{self.name}: {self.stats.summary()}")
+            #
+        #
+    #
+#
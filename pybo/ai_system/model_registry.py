@@ -0,0 +1,107 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .runtime import configure_runtime
+#
+# =========================
+# 모델 레지스트리
+# =========================
+class ModelRegistry:
+    """
+    프로세스에서 로드한 AI 모델을 보관하고 재사용하는 레지스트리
+
+    요청마다 모델 파일을 다시 읽지 않도록 (클래스, 생성 인자)별로 한 번만 생성한다.
+    처음 모델을 로드하기 전에 런타임 스레드 설정(runtime.configure_runtime)을 적용한다.
+    모델 객체는 스레드 안전하지 않을 수 있으므로, 모델마다 추론 잠금(inference_lock)을 제공한다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._model_locks = {}
+        self._load_locks = {} # 생성 중인 key별 잠금
+        self.runtime = None
+        #
+    #
+    def start(self, threads=None):
+        """런타임 스레드 설정 적용 (여러 번 호출해도 한 번만 적용, threads가 없으면 settings.AI_NUM_THREADS)"""
+        if self.runtime is None:
+            if threads is None and settings.configured:
+                threads = getattr(settings, 'AI_NUM_THREADS', None)
+                #
+            #
+            self.runtime = configure_runtime(threads)
+            #
+        #
+        return self.runtime
+        #
+    #
+    def load(self, key, factory):
+        """
+        key에 해당하는 객체가 없으면 factory()로 생성해 보관하고 반환
+
+        생성은 key별 잠금 안에서 수행하므로, 느린 모델(dlib CNN, MTCNN, YOLO)을 만드는 동안
+        같은 모델을 요청한 호출만 기다리고 다른 모델의 조회는 막히지 않는다.
+        """
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+                #
+            #
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+            #
+        #
+        with load_lock:
+            with self._lock: # 기다리는 동안 다른 스레드가 생성했으면 그 객체를 사용
+                if key in self._models:
+                    return self._models[key]
+                    #
+                #
+            #
+            self.start()
+            logging.info(f"모델 레지스트리: {key[0] if isinstance(key, tuple) else key} 로드")
+            model = factory()
+            with self._lock:
+                self._models[key] = model
+                self._model_locks[id(model)] = threading.Lock()
+                self._load_locks.pop(key, None)
+                #
+            #
+            return model
+            #
+        #
+    #
+    def get(self, cls, *args):
+        """cls(*args) 모델을 한 번만 생성해 반환"""
+        return self.load((cls.__name__,) + args, lambda: cls(*args))
+        #
+    #
+    @contextmanager
+    def inference_lock(self, model):
+        """같은 모델 객체로 동시에 추론하지 않도록 잠금 (레지스트리 밖에서 만든 모델은 잠그지 않음)"""
+        lock = self._model_locks.get(id(model))
+        if lock is None:
+            yield
+            return
+            #
+        #
+        with lock:
+            yield
+            #
+        #
+    #
+    def clear(self):
+        """보관 중인 모델 제거 (테스트 및 설정 변경용)"""
+        with self._lock:
+            self._models.clear()
+            self._model_locks.clear()
+            self._load_locks.clear()
+            #
+        #
+    #
+#
+# 프로세스당 하나의 레지스트리를 사용
+model_registry = ModelRegistry()
+#
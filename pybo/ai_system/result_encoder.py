@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+#
+# =========================
+# 결과 이미지 인코딩 설정
+# =========================
+# config['result_encoding']으로 덮어쓸 수 있는 기본값
+DEFAULT_ENCODING = {
+    "format": "jpeg",          # jpeg, webp, png
+    "jpeg_quality": 85,        # 0~100 (높을수록 화질↑ 용량↑)
+    "jpeg_progressive": True,  # 점진적 JPEG (큰 이미지가 위에서부터가 아니라 전체가 흐릿하게 먼저 보임)
+    "webp_quality": 80,        # 0~100
+    "png_compression": 6,      # 0~9 (높을수록 용량↓ 인코딩 시간↑)
+    "background": False,       # True이면 인코딩/저장을 백그라운드 스레드에서 수행
+}
+#
+# 형식별 확장자
+FORMAT_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+#
+# 인코딩 결과 (확장자, 인코딩된 바이트, 인코딩에 걸린 시간(초))
+EncodedImage = namedtuple('EncodedImage', ['ext', 'data', 'seconds'])
+#
+#
+def encoding_settings(config):
+    """config의 result_encoding 값과 기본값을 합친 인코딩 설정을 반환"""
+    settings = dict(DEFAULT_ENCODING)
+    settings.update(config.get('result_encoding') or {})
+    if settings['format'] not in FORMAT_EXTENSIONS:
+        raise ValueError(f"지원하지 않는 결과 이미지 형식입니다: {settings['format']}")
+        #
+    #
+    return settings
+    #
+#
+def encode_params(settings):
+    """인코딩 설정을 cv2.imencode 파라미터로 변환"""
+    fmt = settings['format']
+    if fmt == 'jpeg':
+        return [
+            cv2.IMWRITE_JPEG_QUALITY, int(settings['jpeg_quality']),
+            cv2.IMWRITE_JPEG_PROGRESSIVE, int(bool(settings['jpeg_progressive'])),
+        ]
+    if fmt == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, int(settings['webp_quality'])]
+    return [cv2.IMWRITE_PNG_COMPRESSION, int(settings['png_compression'])]
+    #
+#
+def encoding_fingerprint(settings):
+    """결과 파일 이름에 반영할 인코딩 설정 문자열 (화질이 바뀌면 다른 파일이 되도록)"""
+    fmt = settings['format']
+    if fmt == 'jpeg':
+        return f"jpeg:q{settings['jpeg_quality']}:p{int(bool(settings['jpeg_progressive']))}"
+    if fmt == 'webp':
+        return f"webp:q{settings['webp_quality']}"
+    return f"png:c{settings['png_compression']}"
+    #
+#
+def _log_failure(future):
+    """백그라운드 인코딩 중 발생한 오류를 로그로 남김 (요청 처리 흐름에는 전달되지 않으므로)"""
+    error = future.exception()
+    if error is not None:
+        logging.error(f"결과 이미지 인코딩 중 오류 발생: {error}")
+        #
+    #
+#
+# =========================
+# 결과 이미지 인코더
+# =========================
+class ResultEncoder:
+    """
+    결과 이미지(RGB 배열)를 설정된 형식으로 인코딩해 저장하는 클래스
+
+    인코딩은 메모리에서 한 번만 수행하고, 저장은 writer 함수(예: write_bytes_atomic)에 맡긴다.
+    background 설정이 켜져 있으면 인코딩과 저장을 프로세스 공용 스레드 풀에서 수행한다.
+    """
+    # 백그라운드 인코딩용 스레드 풀 (처음 사용할 때 생성)
+    _executor = None
+    _executor_lock = threading.Lock()
+    #
+    def __init__(self, config):
+        self.settings = encoding_settings(config)
+        self.params = encode_params(self.settings)
+        #
+    #
+    @property
+    def ext(self):
+        """결과 파일 확장자"""
+        return FORMAT_EXTENSIONS[self.settings['format']]
+        #
+    #
+    @property
+    def fingerprint(self):
+        return encoding_fingerprint(self.settings)
+        #
+    #
+    def encode(self, image_rgb):
+        """RGB 배열을 인코딩하여 EncodedImage로 반환"""
+        start = time.perf_counter()
+        ok, buffer = cv2.imencode(self.ext, cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR), self.params)
+        if not ok:
+            raise ValueError(f"결과 이미지를 {self.settings['format']} 형식으로 인코딩할 수 없습니다.")
+            #
+        #
+        return EncodedImage(self.ext, buffer.tobytes(), time.perf_counter() - start)
+        #
+    #
+    def save(self, image_rgb, output_path, writer):
+        """
+        인코딩 후 writer(output_path, data)로 저장
+
+        background 설정이 켜져 있으면 Future를, 아니면 EncodedImage를 반환
+        """
+        if self.settings['background']:
+            future = self._get_executor().submit(self._encode_and_write, image_rgb, output_path, writer)
+            future.add_done_callback(_log_failure)
+            return future
+            #
+        #
+        return self._encode_and_write(image_rgb, output_path, writer)
+        #
+    #
+    def _encode_and_write(self, image_rgb, output_path, writer):
+        encoded = self.encode(image_rgb)
+        writer(output_path, encoded.data)
+        logging.info(
+            f"결과 이미지 인코딩: {output_path} ({self.fingerprint}, "
+            f"{len(encoded.data) / 1024:.1f} KB, {encoded.seconds * 1000:.1f} ms)"
+        )
+        return encoded
+        #
+    #
+    @classmethod
+    def _get_executor(cls):
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='pybo-result-encoder')
+                #
+            #
+        #
+        return cls._executor
+        #
+    #
+#
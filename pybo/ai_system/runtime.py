@@ -0,0 +1,125 @@
+import logging
+import os
+import sys
+import threading
+#
+# =========================
+# AI 런타임 스레드 설정
+# =========================
+# torch, OpenCV, TensorFlow(MTCNN), OpenMP/MKL(dlib, numpy)는 기본적으로 모든 코어를 사용한다.
+# 워커 여러 개가 동시에 추론하면 (워커 수 x 코어 수)만큼의 스레드가 경쟁하여 오히려 느려지므로,
+# 워커 하나가 사용할 스레드 수를 (코어 수 / 워커 수)로 제한한다.
+#
+# 스레드 수를 정하는 OpenMP/MKL 환경 변수
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+#
+_lock = threading.Lock()
+_applied = None
+#
+#
+def available_cores():
+    """이 프로세스가 사용할 수 있는 CPU 코어 수 (컨테이너/affinity 제한 반영)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Windows, macOS
+        return os.cpu_count() or 1
+        #
+    #
+#
+def worker_count():
+    """같은 서버에서 동시에 추론하는 워커 프로세스 수 (gunicorn 관례인 WEB_CONCURRENCY 환경 변수, 없으면 1)"""
+    try:
+        return max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    except ValueError:
+        return 1
+        #
+    #
+#
+def default_threads(cores=None, workers=None):
+    """워커 하나가 사용할 기본 스레드 수 = 코어 수 / 워커 수 (최소 1)"""
+    cores = cores or available_cores()
+    workers = workers or worker_count()
+    return max(1, cores // workers)
+    #
+#
+def configure_runtime(threads=None, interop_threads=1):
+    """
+    torch, OpenCV, TensorFlow, OpenMP/MKL의 스레드 수를 한 번에 설정 (프로세스당 한 번만 적용)
+
+    threads가 None이면 default_threads()를 사용한다.
+    환경 변수는 라이브러리가 처음 import되기 전에 설정되어야 효과가 있으므로,
+    이미 import된 라이브러리는 각 라이브러리의 API로 설정한다.
+    설정된 값을 딕셔너리로 반환한다.
+    """
+    global _applied
+    with _lock:
+        if _applied is not None:
+            return _applied
+            #
+        #
+        threads = int(threads or default_threads())
+        applied = {'threads': threads, 'interop_threads': interop_threads}
+        #
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(threads)
+            #
+        #
+        os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+        os.environ['TF_NUM_INTEROP_THREADS'] = str(interop_threads)
+        #
+        import cv2
+        cv2.setNumThreads(threads)
+        applied['cv2'] = cv2.getNumThreads()
+        #
+        # torch는 모델을 처음 만들 때 import되므로, 아직 import되지 않았으면 apply_torch_threads()에서 설정
+        if 'torch' in sys.modules:
+            _set_torch_threads(sys.modules['torch'], applied)
+            #
+        #
+        # TensorFlow는 MTCNN이 사용할 때 import되므로, 이미 import된 경우에만 API로 설정
+        if 'tensorflow' in sys.modules:
+            tf = sys.modules['tensorflow']
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(threads)
+                tf.config.threading.set_inter_op_parallelism_threads(interop_threads)
+            except RuntimeError: # TensorFlow 런타임이 이미 초기화됨 (환경 변수 값도 적용되지 않음)
+                logging.warning("TensorFlow 런타임이 이미 초기화되어 스레드 수를 변경하지 않습니다.")
+                #
+            #
+        #
+        logging.info(f"AI 런타임 스레드 설정: {applied} (코어 {available_cores()}개, 워커 {worker_count()}개)")
+        _applied = applied
+        return applied
+        #
+    #
+#
+def apply_torch_threads():
+    """
+    configure_runtime()의 스레드 수를 torch에 적용 (torch를 처음 import한 직후 호출, 한 번만 적용)
+
+    torch는 탐지기/예측기를 처음 생성할 때 import되어 configure_runtime() 시점에는 없으므로,
+    torch를 import하는 곳(FairFacePredictor, YOLOFaceDetector)에서 호출한다.
+    런타임 설정 전이면 아무것도 하지 않는다 (이후 configure_runtime()이 이미 import된 torch에 적용).
+    """
+    with _lock:
+        if _applied is not None and 'torch' not in _applied and 'torch' in sys.modules:
+            _set_torch_threads(sys.modules['torch'], _applied)
+            logging.info(f"torch 스레드 설정: {_applied['torch']} (interop {_applied['interop_threads']})")
+            #
+        #
+        return _applied
+        #
+    #
+#
+def _set_torch_threads(torch, applied):
+    """torch의 연산/interop 스레드 수를 설정하고 적용된 값을 applied에 기록"""
+    torch.set_num_threads(applied['threads'])
+    try:
+        torch.set_num_interop_threads(applied['interop_threads'])
+    except RuntimeError: # 이미 병렬 작업이 실행된 뒤에는 변경할 수 없음
+        logging.warning("torch interop 스레드 수는 이미 설정되어 변경하지 않습니다.")
+        #
+    #
+    applied['torch'] = torch.get_num_threads()
+    #
+#
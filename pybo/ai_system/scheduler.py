@@ -0,0 +1,330 @@
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+#
+# =========================
+# AI 분석 작업 스케줄러
+# =========================
+# 분석 작업을 우선순위 클래스와 사용자별 흐름(flow)으로 나누어 가중 공정 큐잉(WFQ)으로 실행 순서를 정한다.
+# - 클래스 가중치가 클수록 더 자주 실행된다 (interactive 8 : bulk 2 : backfill 1이면 대기 작업이 모두 있을 때 8:2:1).
+# - 같은 클래스 안에서는 사용자마다 같은 몫을 받으므로, 한 사용자가 500장을 올려도 다른 사용자의 작업이 사이사이 실행된다.
+# - 큐가 max_depth를 넘거나 사용자별 할당량을 넘으면 SchedulerBusy(재시도까지의 예상 시간 포함)를 발생시킨다.
+#
+# 질문 등록(interactive), 관리 명령으로 다시 분석(bulk), 분석 결과가 없는 질문 채우기(backfill)
+PRIORITY_CLASSES = {'interactive': 8, 'bulk': 2, 'backfill': 1}
+#
+#
+class SchedulerBusy(Exception):
+    """대기 작업이 너무 많아 받을 수 없는 경우 (retry_after: 다시 시도할 때까지의 예상 시간(초))"""
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        #
+    #
+#
+class QuotaExceeded(SchedulerBusy):
+    """사용자 한 명의 대기/실행 중인 작업이 할당량을 넘은 경우"""
+    #
+#
+class _Entry:
+    __slots__ = ('item', 'flow', 'job_class', 'enqueued', 'removed')
+    #
+    def __init__(self, item, flow, job_class):
+        self.item = item
+        self.flow = flow
+        self.job_class = job_class
+        self.enqueued = time.monotonic()
+        self.removed = False
+        #
+    #
+#
+class FairQueue:
+    """
+    우선순위 클래스 가중치와 사용자별 흐름으로 순서를 정하는 스레드 안전 큐 (queue.Queue와 같은 get/put 형태)
+
+    자기 시계 공정 큐잉(SCFQ): 작업의 종료 태그 = max(가상 시간, 같은 흐름의 마지막 종료 태그) + 비용 / 클래스 가중치,
+    종료 태그가 가장 작은 작업부터 꺼내고 가상 시간을 그 태그로 옮긴다.
+    """
+    def __init__(self, weights=None, max_depth=None, user_quota=None):
+        self.weights = dict(weights or PRIORITY_CLASSES)
+        self.max_depth = max_depth
+        self.user_quota = user_quota
+        self._cond = threading.Condition()
+        self._heap = []
+        self._entries = {} # id(item) -> _Entry (discard용)
+        self._seq = itertools.count()
+        self._virtual = 0.0
+        self._finish = {} # 흐름 -> 마지막 종료 태그
+        self._queued_flows = Counter()
+        self._queued_users = Counter()
+        self._queued_classes = Counter()
+        self._size = 0
+        # 통계
+        self._dequeue_interval = None # 작업을 꺼내는 평균 간격(초, 지수 이동 평균)
+        self._last_dequeue = None
+        self._waits = defaultdict(lambda: [0, 0.0, 0.0]) # 클래스 -> [횟수, 합계, 최대] 대기 시간(초)
+        self._rejected = Counter()
+        #
+    #
+    def retry_after(self):
+        """현재 대기 작업이 모두 빠지기까지의 예상 시간(초)"""
+        interval = self._dequeue_interval if self._dequeue_interval is not None else 1.0
+        return max(1.0, self._size * interval)
+        #
+    #
+    def _admit(self, user, job_class, extra_user_jobs=0):
+        if job_class not in self.weights:
+            raise ValueError(f"알 수 없는 작업 클래스입니다: {job_class}")
+            #
+        #
+        if self.max_depth is not None and self._size >= self.max_depth:
+            self._rejected[job_class] += 1
+            raise SchedulerBusy(f"AI 분석 대기 작업이 너무 많습니다 ({self._size}개).", self.retry_after())
+            #
+        #
+        if self.user_quota is not None and user is not None and self._queued_users[user] + extra_user_jobs >= self.user_quota:
+            self._rejected[job_class] += 1
+            raise QuotaExceeded(f"사용자의 AI 분석 작업이 할당량({self.user_quota}개)을 넘었습니다.", self.retry_after())
+            #
+        #
+    #
+    def check(self, user=None, job_class='interactive', extra_user_jobs=0):
+        """작업을 넣지 않고 받을 수 있는지만 확인 (받을 수 없으면 SchedulerBusy)"""
+        with self._cond:
+            self._admit(user, job_class, extra_user_jobs)
+            #
+        #
+    #
+    def put(self, item, user=None, job_class='interactive', cost=1.0, extra_user_jobs=0, admit=True):
+        """
+        작업을 넣음 (extra_user_jobs: 할당량 계산에 더할 이 사용자의 실행 중인 작업 수)
+
+        admit=False이면 이미 check()로 받은 작업이므로 큐 한도와 할당량을 다시 확인하지 않는다.
+        """
+        with self._cond:
+            if admit:
+                self._admit(user, job_class, extra_user_jobs)
+            elif job_class not in self.weights:
+                raise ValueError(f"알 수 없는 작업 클래스입니다: {job_class}")
+                #
+            #
+            flow = (job_class, user)
+            start = max(self._virtual, self._finish.get(flow, 0.0))
+            tag = start + float(cost) / self.weights[job_class]
+            self._finish[flow] = tag
+            entry = _Entry(item, flow, job_class)
+            heapq.heappush(self._heap, (tag, next(self._seq), entry))
+            self._entries[id(item)] = entry
+            self._count(entry, 1)
+            self._cond.notify()
+            #
+        #
+    #
+    def _count(self, entry, delta):
+        self._queued_flows[entry.flow] += delta
+        self._queued_users[entry.flow[1]] += delta
+        self._queued_classes[entry.job_class] += delta
+        self._size += delta
+        if self._queued_flows[entry.flow] <= 0:
+            del self._queued_flows[entry.flow]
+            if self._finish.get(entry.flow, 0.0) <= self._virtual: # 흐름이 끝나면 종료 태그를 잊음
+                self._finish.pop(entry.flow, None)
+                #
+            #
+        #
+    #
+    def _pop(self):
+        while self._heap:
+            tag, _, entry = heapq.heappop(self._heap)
+            if entry.removed:
+                continue
+                #
+            #
+            self._virtual = max(self._virtual, tag)
+            self._entries.pop(id(entry.item), None)
+            self._count(entry, -1)
+            now = time.monotonic()
+            wait = self._waits[entry.job_class]
+            elapsed = now - entry.enqueued
+            wait[0] += 1
+            wait[1] += elapsed
+            wait[2] = max(wait[2], elapsed)
+            if self._last_dequeue is not None:
+                interval = now - self._last_dequeue
+                self._dequeue_interval = interval if self._dequeue_interval is None else 0.8 * self._dequeue_interval + 0.2 * interval
+                #
+            #
+            self._last_dequeue = now
+            return entry.item
+            #
+        #
+        raise queue.Empty
+        #
+    #
+    def get(self, block=True, timeout=None):
+        """종료 태그가 가장 작은 작업을 꺼냄 (없으면 queue.Empty)"""
+        with self._cond:
+            if block and not self._cond.wait_for(lambda: self._size > 0, timeout):
+                raise queue.Empty
+                #
+            #
+            return self._pop()
+            #
+        #
+    #
+    def get_nowait(self):
+        return self.get(block=False)
+        #
+    #
+    def discard(self, item):
+        """아직 꺼내지 않은 작업을 제거 (이미 꺼냈으면 False)"""
+        with self._cond:
+            entry = self._entries.pop(id(item), None)
+            if entry is None:
+                return False
+                #
+            #
+            entry.removed = True
+            self._count(entry, -1)
+            return True
+            #
+        #
+    #
+    def qsize(self):
+        return self._size
+        #
+    #
+    def queued_for(self, user):
+        return self._queued_users.get(user, 0)
+        #
+    #
+    def snapshot(self):
+        """클래스별 대기 작업 수와 대기 시간(ms), 거절 수"""
+        with self._cond:
+            return {
+                'depth': self._size,
+                'max_depth': self.max_depth,
+                'queued': {name: self._queued_classes.get(name, 0) for name in self.weights},
+                'wait_ms': {
+                    name: {
+                        'mean': self._waits[name][1] / self._waits[name][0] * 1000 if self._waits[name][0] else 0.0,
+                        'max': self._waits[name][2] * 1000,
+                        'count': self._waits[name][0],
+                    }
+                    for name in self.weights
+                },
+                'rejected': dict(self._rejected),
+                'retry_after': self.retry_after(),
+            }
+            #
+        #
+    #
+#
+class _Ticket:
+    __slots__ = ('user', 'granted')
+    #
+    def __init__(self, user):
+        self.user = user
+        self.granted = threading.Event()
+        #
+    #
+#
+class AnalysisScheduler:
+    """
+    프로세스 안에서 동시에 실행하는 분석 작업 수를 concurrency개로 제한하고, 대기 작업은 FairQueue 순서로 실행
+
+    slot()은 차례가 올 때까지 기다렸다가 실행 권한을 주는 컨텍스트 매니저이다.
+    사용자 할당량은 대기 중인 작업과 실행 중인 작업을 합쳐서 센다.
+    """
+    def __init__(self, concurrency=2, max_depth=16, user_quota=4, weights=None, max_wait=120):
+        self.concurrency = max(1, int(concurrency))
+        self.max_wait = max_wait
+        self.queue = FairQueue(weights, max_depth, user_quota)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._running_users = Counter()
+        #
+    #
+    @classmethod
+    def from_settings(cls):
+        return cls(**(getattr(settings, 'AI_ANALYSIS_SCHEDULER', None) or {}))
+        #
+    #
+    def check(self, user=None, job_class='interactive'):
+        """지금 작업을 받을 수 있는지 확인 (받을 수 없으면 SchedulerBusy, 실행 슬롯이 남아 있으면 항상 받음)"""
+        with self._lock:
+            self.queue.check(user, job_class, self._running_users[user])
+            #
+        #
+    #
+    def _dispatch(self):
+        while self._running < self.concurrency:
+            try:
+                ticket = self.queue.get_nowait()
+            except queue.Empty:
+                return
+                #
+            #
+            self._running += 1
+            self._running_users[ticket.user] += 1
+            ticket.granted.set()
+            #
+        #
+    #
+    def _release(self, user):
+        with self._lock:
+            self._running -= 1
+            self._running_users[user] -= 1
+            if self._running_users[user] <= 0:
+                del self._running_users[user]
+                #
+            #
+            self._dispatch()
+            #
+        #
+    #
+    @contextmanager
+    def slot(self, user=None, job_class='interactive', cost=1.0, admit=True):
+        """
+        실행 차례가 올 때까지 기다린 뒤 작업을 실행 (admit=False면 check()로 이미 받은 작업이므로 한도를 확인하지 않음)
+
+        max_wait초 안에 차례가 오지 않으면 SchedulerBusy를 발생시킨다.
+        """
+        ticket = _Ticket(user)
+        with self._lock:
+            self.queue.put(ticket, user, job_class, cost, self._running_users[user], admit)
+            self._dispatch()
+            #
+        #
+        if not ticket.granted.wait(self.max_wait):
+            with self._lock:
+                if self.queue.discard(ticket): # 기다리는 동안 차례가 오지 않음
+                    raise SchedulerBusy("AI 분석 차례를 기다리는 시간이 초과되었습니다.", self.queue.retry_after())
+                    #
+                #
+            #
+        #
+        try:
+            yield
+        finally:
+            self._release(user)
+            #
+        #
+    #
+    def snapshot(self):
+        stats = self.queue.snapshot()
+        stats.update(running=self._running, concurrency=self.concurrency)
+        return stats
+        #
+    #
+#
+# 프로세스당 하나의 스케줄러를 사용 (질문 등록 등 웹 요청의 분석 작업)
+analysis_scheduler = AnalysisScheduler.from_settings()
+#
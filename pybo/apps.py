@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PyboConfig(AppConfig):
     name = 'pybo'
+
+    def ready(self):
+        # 캐시 무효화 시그널 등록
+        from . import signals  # noqa: F401
@@ -0,0 +1,88 @@
+import hashlib  # ETag 값을 만들기 위한 해시
+
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import Question, Answer, Comment, ImageHash
+
+# =======================================
+# 조건부 요청(ETag) 처리
+# =======================================
+# 목록/상세 페이지는 DB의 작성일시·수정일시·개수로 ETag를 만든다.
+# 브라우저가 If-None-Match로 같은 ETag를 보내면 페이지를 다시 만들지 않고 304 응답을 반환한다.
+# 같은 URL이라도 로그인 사용자마다 페이지가 다르므로 사용자 ID를 ETag에 포함한다.
+
+def _make_etag(*parts):
+    """ 여러 값을 합쳐 약한(weak) ETag를 만든다 (HTML은 바이트 단위로 같음을 보장하지 않음) """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return 'W/"{}"'.format(digest)
+
+
+def _viewer(request):
+    """ 페이지 내용에 영향을 주는 사용자 식별값 """
+    if request.user.is_authenticated:
+        return 'u{}'.format(request.user.pk)
+    return 'anon'
+
+
+def _has_messages(request):
+    """ 표시할 메시지가 있으면 페이지가 달라지므로 조건부 응답을 하지 않음 """
+    return len(messages.get_messages(request)) > 0
+
+
+def index_etag(request, page, kw):
+    """ 질문 목록 페이지의 ETag (질문/답변 작성·수정 일시, 개수, 추천 수 기준) """
+    if _has_messages(request):
+        return None
+    questions = Question.objects.aggregate(n=Count('id'), c=Max('create_date'), m=Max('modify_date'))
+    answers = Answer.objects.aggregate(n=Count('id'), c=Max('create_date'), m=Max('modify_date'))
+    votes = Question.voter.through.objects.aggregate(n=Count('id'), m=Max('id'))
+    return _make_etag(
+        'index', _viewer(request), page, kw,
+        questions['n'], questions['c'], questions['m'],
+        answers['n'], answers['c'], answers['m'],
+        votes['n'], votes['m'],
+    )
+
+
+def _original_id(question):
+    """ 비슷한 이미지를 먼저 올린 원본 질문 ID (상세 페이지에 원본 질문 링크가 표시됨, 해시가 없으면 None) """
+    try:
+        return question.image_hash.original_id
+    except ImageHash.DoesNotExist:
+        return None
+
+
+def detail_etag(request, question):
+    """ 질문 상세 페이지의 ETag (질문, 답변, 댓글의 작성·수정 일시와 개수, 추천 수, 원본 질문 기준) """
+    if _has_messages(request):
+        return None
+    answers = Answer.objects.filter(question=question).aggregate(
+        n=Count('id', distinct=True), c=Max('create_date'), m=Max('modify_date'), v=Count('voter'))
+    comments = Comment.objects.filter(question=question).aggregate(
+        n=Count('id'), c=Max('create_date'), m=Max('modify_date'))
+    return _make_etag(
+        'detail', _viewer(request), question.pk,
+        question.create_date, question.modify_date, question.image1.name, question.image2.name, _original_id(question),
+        question.voter.count(),
+        answers['n'], answers['c'], answers['m'], answers['v'],
+        comments['n'], comments['c'], comments['m'],
+    )
+
+
+def not_modified(request, etag):
+    """ 요청의 If-None-Match가 etag와 같으면 304 응답을, 아니면 None을 반환 """
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag)
+
+
+def set_etag(response, etag):
+    """ 응답에 ETag를 붙이고, 브라우저가 매번 재검증하도록 Cache-Control 설정 """
+    if etag is not None:
+        response['ETag'] = etag
+        # private: 사용자별 페이지이므로 공유 캐시에 저장하지 않음
+        # no-cache: 저장은 하되 사용할 때마다 ETag로 재검증
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,180 @@
+import os
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import FaceAnalysis, DetectedFace, FaceEmbedding
+from .storage import content_addressed_storage, hash_file
+
+# 파일 이름(확장자 제외)이 SHA-256 해시인 파일 = 콘텐츠 주소 저장소의 파일 (pybo/storage.py)
+CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+
+def image_digest(image_path):
+    """ 원본 이미지 내용의 SHA-256 해시 (콘텐츠 주소 저장소의 파일은 이름이 해시이므로 파일을 읽지 않음) """
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    if CONTENT_ADDRESSED_NAME.match(stem):
+        return stem
+    with open(image_path, 'rb') as f:
+        return hash_file(f)[0]
+
+
+def media_name(image_path):
+    """ MEDIA_ROOT 아래의 파일이면 MEDIA_ROOT 기준 경로, 아니면 절대 경로 """
+    path = os.path.abspath(image_path)
+    root = os.path.abspath(settings.MEDIA_ROOT)
+    if os.path.commonpath([path, root]) == root:
+        return os.path.relpath(path, root).replace(os.sep, '/')
+    return path
+
+
+def media_path(name):
+    """ media_name의 반대 """
+    return name if os.path.isabs(name) else os.path.join(settings.MEDIA_ROOT, name)
+
+
+# =======================================
+# 분석 결과 저장 / 불러오기
+# =======================================
+def save_face_analysis(image_path, digest, fingerprint, analysis, details, labeled, timings=None):
+    """
+    분석 결과를 FaceAnalysis 1건 + DetectedFace(얼굴 수만큼, bulk_create)로 저장하고 FaceAnalysis를 반환
+
+    analysis: (predictions, face_cnt, race_cnt, male_cnt)
+    - labeled가 True이면 predictions는 (x, y, w, h, 인종, 성별, 박스 색상, 텍스트), details는 얼굴별
+      {'age', 'embedding', 'distance'} (AiSystem.face_details)
+    - False(예측기 없음)이면 predictions는 탐지된 얼굴 좌표 (x, y, x2, y2), details는 얼굴 검색을 사용할 때만 얼굴별 {'embedding'}
+    같은 이미지와 설정의 결과가 이미 있으면(동시에 분석한 경우) 저장된 결과를 반환한다.
+    원본 이미지가 콘텐츠 주소 저장소의 파일이면 참조를 하나 추가하여, 질문이 삭제되어도 결과를 다시 그릴 수 있게 한다
+    (FaceAnalysis가 삭제되면 pybo/signals.py에서 해제).
+    """
+    predictions, face_cnt, race_cnt, male_cnt = analysis
+    if labeled:
+        boxes = [prediction[:4] for prediction in predictions]
+    else:
+        boxes = [(x, y, x2 - x, y2 - y) for x, y, x2, y2 in predictions]
+    image_name = media_name(image_path)
+    try:
+        with transaction.atomic():
+            face_analysis = FaceAnalysis.objects.create(
+                image_sha256=digest,
+                fingerprint=fingerprint,
+                image_name=image_name,
+                boxes=boxes,
+                labeled=labeled,
+                face_cnt=int(face_cnt or 0),
+                male_cnt=male_cnt,
+                race_cnt=race_cnt,
+                timings=timings or {},
+            )
+            faces = []
+            for index, prediction in enumerate(predictions):
+                face = DetectedFace(analysis=face_analysis, index=index)
+                detail = details[index] if index < len(details) else {}
+                face.embedding = detail.get('embedding')  # 예측기가 없어도 얼굴 검색을 사용하면 인코딩이 있음
+                if labeled:
+                    face.race, face.gender, box_color, face.label = prediction[4:]
+                    face.box_color = box_color
+                    face.age = detail.get('age') or ''
+                    face.match_distance = detail.get('distance')
+                faces.append(face)
+            DetectedFace.objects.bulk_create(faces)
+            if content_addressed_storage.owns(image_name):
+                content_addressed_storage.acquire(image_name)
+    except IntegrityError:
+        return FaceAnalysis.objects.get(image_sha256=digest, fingerprint=fingerprint)
+    return face_analysis
+
+
+def load_face_analysis(digest, fingerprint):
+    """ 저장된 분석 결과 (얼굴 포함, 없으면 None) """
+    return (FaceAnalysis.objects.filter(image_sha256=digest, fingerprint=fingerprint)
+            .prefetch_related('faces').first())
+
+
+def stored_predictions(face_analysis):
+    """ 저장된 결과를 분석 직후와 같은 (predictions, face_cnt, race_cnt, male_cnt)로 변환 (결과 이미지를 다시 그릴 때 사용) """
+    boxes = [[int(value) for value in box] for box in face_analysis.boxes]  # 방금 저장한 객체는 ndarray가 아닌 목록
+    if not face_analysis.labeled:
+        predictions = [(x, y, x + w, y + h) for x, y, w, h in boxes]
+        return predictions, str(face_analysis.face_cnt), None, None
+    predictions = [
+        (*boxes[face.index], face.race, face.gender, tuple(int(value) for value in face.box_color), face.label)
+        for face in face_analysis.faces.all()
+    ]
+    return predictions, face_analysis.face_cnt, face_analysis.race_cnt, face_analysis.male_cnt
+
+
+def image_size(image_path):
+    """ 분석할 때 디코딩한 이미지의 (너비, 높이) - 헤더만 읽으며, cv2처럼 EXIF 회전(90/270도)을 반영 """
+    from PIL import Image  # 처음 사용할 때 import
+    with Image.open(image_path) as image:
+        width, height = image.size
+        orientation = image.getexif().get(0x0112, 1)
+    return (height, width) if orientation in (5, 6, 7, 8) else (width, height)
+
+
+def face_at_point(face_analysis, x, y):
+    """
+    결과 이미지에서 클릭한 얼굴 (DetectedFace, 없으면 None)
+
+    x, y: 결과 이미지의 원본 영역(위쪽 안내 문구 아래의 정사각형, ForDjango._draw_results)에서의 위치 (0~1)
+    원본 이미지는 정사각형 가운데에 긴 변을 맞춰 그려지므로 원본 좌표로 되돌려 박스와 비교하고,
+    박스가 겹치면 가장 작은 박스를 선택한다.
+    """
+    width, height = image_size(media_path(face_analysis.image_name))
+    side = max(width, height)
+    px, py = x * side - (side - width) / 2, y * side - (side - height) / 2
+    hits = [(w * h, index) for index, (bx, by, w, h) in enumerate(face_analysis.boxes.tolist())
+            if bx <= px <= bx + w and by <= py <= by + h]
+    if not hits:
+        return None
+    return face_analysis.faces.filter(index=min(hits)[1]).first()
+
+# =======================================
+# 얼굴 인코딩 저장소 (이미지 해시 + 양자화한 박스)
+# =======================================
+def box_key(box, quantum=8):
+    """ 얼굴 박스 (x, y, x2, y2)를 quantum 픽셀 단위로 양자화한 키 (예: '8:12,3,20,11') """
+    return '{}:{}'.format(quantum, ','.join(str(int(round(value / quantum))) for value in box))
+
+
+def _parse_box_key(key):
+    quantum, cells = key.split(':')
+    return int(quantum), tuple(int(cell) for cell in cells.split(','))
+
+
+def load_face_embeddings(digest, boxes, quantum=8, tolerance=1):
+    """
+    boxes (x, y, x2, y2 목록)와 같은 순서로 저장된 얼굴 인코딩을 반환 (없는 박스는 None)
+
+    박스의 양자화한 좌표가 모두 tolerance칸 이내인 저장된 박스 중 가장 가까운 것을 사용한다
+    (탐지기가 달라 박스가 몇 픽셀 달라져도 같은 얼굴이면 재사용). 이미지당 한 번만 조회한다.
+    """
+    if not boxes:
+        return []
+    stored = []
+    for key, embedding in FaceEmbedding.objects.filter(image_sha256=digest).values_list('box_key', 'embedding'):
+        stored_quantum, cells = _parse_box_key(key)
+        if stored_quantum == quantum:
+            stored.append((cells, embedding))
+    embeddings = []
+    for box in boxes:
+        cells = _parse_box_key(box_key(box, quantum))[1]
+        best, best_distance = None, None
+        for stored_cells, embedding in stored:
+            distance = max(abs(a - b) for a, b in zip(cells, stored_cells))
+            if distance <= tolerance and (best_distance is None or distance < best_distance):
+                best, best_distance = embedding, distance
+        embeddings.append(best)
+    return embeddings
+
+
+def save_face_embeddings(digest, boxes, embeddings, quantum=8):
+    """ 새로 계산한 얼굴 인코딩을 저장 (같은 이미지와 박스 키가 이미 있으면 건너뜀, bulk_create 1번) """
+    rows = {box_key(box, quantum): embedding for box, embedding in zip(boxes, embeddings) if embedding is not None}
+    FaceEmbedding.objects.bulk_create(
+        [FaceEmbedding(image_sha256=digest, box_key=key, embedding=embedding) for key, embedding in rows.items()],
+        ignore_conflicts=True,
+    )
@@ -0,0 +1,84 @@
+import threading
+
+from django.conf import settings
+
+from .models import FaceAnalysis, FaceEmbedding, Question
+
+# =======================================
+# 얼굴 검색 인덱스 (같은 사람이 있는 질문 찾기)
+# =======================================
+class FaceSearchIndex:
+    """
+    모든 질문 이미지에서 탐지한 얼굴의 인코딩(FaceEmbedding)을 IVF 인덱스(pybo/ai_system/face_index.py)로 검색
+
+    - 처음 검색할 때 저장된 인코딩을 batch_size개씩 읽어 인덱스를 만들고,
+      이후에는 검색할 때마다 마지막으로 읽은 id보다 큰 인코딩(새로 분석한 업로드)만 추가한다.
+    - FaceEmbedding은 이미지와 얼굴 영역마다 하나이므로, 같은 이미지를 여러 설정으로 분석해도 중복되지 않는다.
+    - 인덱스는 워커 프로세스마다 하나씩 메모리에 만든다 (얼굴 100만 개 = 인코딩 약 256MB).
+    """
+
+    def __init__(self, nprobe=8, min_train=1024, max_distance=0.5, results=20, batch_size=10000):
+        self.index_options = {'nprobe': nprobe, 'min_train': min_train}
+        self.max_distance = max_distance  # 같은 사람으로 보는 최대 거리 (face_recognition 기본값 0.6보다 엄격)
+        self.results = results
+        self.batch_size = batch_size
+        self.last_id = 0
+        self._index = None
+        self._sync_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(**(getattr(settings, 'AI_FACE_SEARCH', None) or {}))
+
+    @property
+    def index(self):
+        if self._index is None:
+            from .ai_system.face_index import IVFIndex  # numpy는 처음 검색할 때 import
+            self._index = IVFIndex(**self.index_options)
+        return self._index
+
+    def sync(self):
+        """ 인덱스에 아직 없는 인코딩을 추가 (새 인코딩이 없으면 인덱스를 사용하는 쿼리 1번) """
+        import numpy as np
+        with self._sync_lock:
+            while True:
+                rows = list(FaceEmbedding.objects.filter(id__gt=self.last_id).order_by('id')
+                            .values_list('id', 'embedding')[:self.batch_size])
+                if rows:
+                    self.index.add([row[0] for row in rows], np.stack([row[1] for row in rows]))
+                    self.last_id = rows[-1][0]
+                if len(rows) < self.batch_size:
+                    return
+
+    def similar_questions(self, embedding, exclude_sha256=None):
+        """
+        embedding과 같은 사람이 있는 질문을 [(질문, 거리)]로 반환 (가까운 순서, 이미지마다 가장 가까운 얼굴 기준)
+
+        exclude_sha256: 제외할 이미지 (검색한 얼굴이 있는 이미지)
+        """
+        self.sync()
+        hits = self.index.search(embedding, k=self.results * 4, max_distance=self.max_distance)  # 같은 이미지의 얼굴이 여럿일 수 있음
+        id_to_sha256 = dict(FaceEmbedding.objects.filter(id__in=[face_id for face_id, _ in hits])
+                            .values_list('id', 'image_sha256'))
+        distances = {}
+        for face_id, distance in hits:
+            digest = id_to_sha256.get(face_id)
+            if digest is not None and digest != exclude_sha256 and digest not in distances:
+                distances[digest] = distance
+
+        # 이미지 해시 -> 원본 이미지 경로 (콘텐츠 주소 저장소의 이름) -> 그 이미지를 올린 질문들
+        image_distances = {}
+        for digest, image_name in (FaceAnalysis.objects.filter(image_sha256__in=distances)
+                                   .values_list('image_sha256', 'image_name').distinct()):
+            image_distances[image_name] = distances[digest]
+        questions = Question.objects.filter(image1__in=image_distances).select_related('author')
+        matches = sorted(((question, image_distances[question.image1.name]) for question in questions),
+                         key=lambda match: (match[1], -match[0].id))
+        return matches[:self.results]
+
+    def snapshot(self):
+        return dict(self.index.snapshot(), last_id=self.last_id) if self._index is not None else None
+
+
+# 프로세스당 하나의 인덱스 (처음 검색할 때 만듦)
+face_search_index = FaceSearchIndex.from_settings()
@@ -0,0 +1,53 @@
+import base64
+
+from django.db import models
+
+# =======================================
+# PackedArrayField (NumPy 배열을 바이너리로 저장하는 필드)
+# =======================================
+class PackedArrayField(models.BinaryField):
+    """
+    고정 자료형의 NumPy 배열을 바이트 그대로 저장하는 필드
+
+    - dtype: 저장할 자료형 (바이트 순서를 명시, 예: '<i4', '<f4', 'u1')
+    - columns: 행마다 값의 수 (예: 얼굴 박스는 4), None이면 1차원 배열
+    DB에서 읽으면 읽기 전용 ndarray(bytes를 그대로 참조)로 반환한다.
+    NumPy는 값을 변환할 때 import하므로, 모델을 불러오는 것만으로는 import되지 않는다.
+    """
+
+    def __init__(self, *args, dtype='<f4', columns=None, **kwargs):
+        self.dtype = dtype
+        self.columns = columns
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['dtype'] = self.dtype
+        if self.columns is not None:
+            kwargs['columns'] = self.columns
+        return name, path, args, kwargs
+
+    def _to_array(self, value):
+        import numpy as np
+        array = np.frombuffer(bytes(value), dtype=self.dtype)
+        return array.reshape(-1, self.columns) if self.columns else array
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else self._to_array(value)
+
+    def to_python(self, value):
+        if value is None or hasattr(value, 'dtype'):
+            return value
+        if isinstance(value, str):  # 직렬화된 값 (value_to_string)
+            value = base64.b64decode(value.encode('ascii'))
+        return self._to_array(value)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        import numpy as np
+        return np.ascontiguousarray(value, dtype=self.dtype).tobytes()
+
+    def value_to_string(self, obj):
+        value = self.get_prep_value(self.value_from_object(obj))
+        return None if value is None else base64.b64encode(bytes(value)).decode('ascii')
@@ -0,0 +1,55 @@
+import logging  # 로그 출력을 위한 모듈
+import queue  # 삭제할 파일을 담아두는 작업 큐
+import threading  # 백그라운드 삭제 스레드
+
+from django.db import close_old_connections
+
+logger = logging.getLogger('pybo')
+
+# =======================================
+# 파일 정리 큐 (백그라운드 삭제)
+# =======================================
+class FileCleanupQueue:
+    """
+    더 이상 참조되지 않는 미디어 파일을 백그라운드 스레드에서 삭제하는 큐
+
+    요청을 처리하는 스레드에서는 파일 시스템 호출을 하지 않고 큐에 넣기만 한다.
+    삭제 스레드는 처음 파일이 들어올 때 시작된다.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def enqueue(self, storage, name):
+        """ storage에 저장된 name 파일을 삭제 대기열에 추가 """
+        self._ensure_worker()
+        self._queue.put((storage, name))
+
+    def join(self):
+        """ 대기열의 파일이 모두 삭제될 때까지 대기 (테스트 및 관리 명령용) """
+        self._queue.join()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='pybo-file-cleanup', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            storage, name = self._queue.get()
+            try:
+                storage.delete(name)
+                logger.info("이전 파일 삭제: %s", name)
+            except Exception:
+                logger.exception("파일 삭제 중 오류 발생: %s", name)
+            finally:
+                # 참조 카운트 저장소는 DB를 사용하므로 작업마다 이 스레드의 연결을 정리
+                close_old_connections()
+                self._queue.task_done()
+
+
+# 프로세스당 하나의 정리 큐를 사용
+cleanup_queue = FileCleanupQueue()
@@ -1,12 +1,52 @@
 from django import forms
+from django.conf import settings
 from pybo.models import Question, Answer, Comment
 
 ########################################################################################################
 
+# ===================================
+# UploadValidationMixin (업로드 검증 결과 반영)
+# ===================================
+class UploadValidationMixin:
+    """
+    ImageUploadHandler(pybo/upload_handlers.py)의 스트리밍 검증 결과를 폼에 반영하는 믹스인
+
+    - 업로드 중에 거절된 파일은 request.FILES에 없으므로, '필수 항목' 대신 거절 사유를 오류로 표시
+    - 업로드 중에 계산한 SHA-256 해시를 파일 객체의 content_hash 속성으로 전달
+    - 이미지 크기(가로 x 세로)는 헤더만 읽어 확인하고 픽셀은 디코딩하지 않음
+    """
+
+    def __init__(self, *args, upload_errors=None, upload_digests=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+        for name, message in self.upload_errors.items():
+            if name in self.fields:
+                self.fields[name].error_messages['required'] = message
+        for name, digest in (upload_digests or {}).items():
+            if name in self.files:
+                self.files[name].content_hash = digest
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # 수정 폼처럼 기존 이미지가 있어 필수 검사를 통과한 경우에도 거절 사유를 표시
+        for name, message in self.upload_errors.items():
+            if name in self.fields and name not in self.errors:
+                self.add_error(name, message)
+
+        # ImageField 검증 시 Pillow가 헤더만 읽어 둔 이미지 정보로 픽셀 수 제한 확인
+        max_pixels = getattr(settings, 'MAX_UPLOAD_PIXELS', None)
+        for name in self.files:
+            image = getattr(cleaned_data.get(name), 'image', None)
+            if max_pixels and image is not None and image.width * image.height > max_pixels:
+                self.add_error(name, "이미지 해상도가 너무 큽니다. ({}x{})".format(image.width, image.height))
+        return cleaned_data
+
+########################################################################################################
+
 # ===================================
 # QuestionForm (질문 생성 및 수정 폼)
 # ===================================
-class QuestionForm(forms.ModelForm):
+class QuestionForm(UploadValidationMixin, forms.ModelForm):
     class Meta:
         model = Question  # 이 폼이 Question 모델과 연결됨
         fields = ['subject', 'content', 'image1', 'image2']  # 사용할 필드 (제목, 내용, 이미지1, 이미지2)
@@ -24,7 +64,7 @@ class QuestionForm(forms.ModelForm):
 # ===================================
 # AnswerForm (답변 생성 및 수정 폼)
 # ===================================
-class AnswerForm(forms.ModelForm):
+class AnswerForm(UploadValidationMixin, forms.ModelForm):
     class Meta:
         model = Answer  # 이 폼이 Answer 모델과 연결됨
         fields = ['content', 'answer_image']  # 사용할 필드 (답변 내용, 첨부 이미지)
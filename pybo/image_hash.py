@@ -0,0 +1,143 @@
+from itertools import combinations
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import ImageHash, Question
+
+# dHash 크기: 9x8 흑백 이미지에서 가로로 이웃한 픽셀의 밝기 비교 64비트
+HASH_WIDTH, HASH_HEIGHT = 8, 8
+
+# 다중 인덱스 해싱: 64비트를 16비트씩 4개 구간(band0~band3, 각각 DB 인덱스)으로 나눔
+BAND_BITS = 16
+BAND_COUNT = 64 // BAND_BITS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# =======================================
+# dHash 계산
+# =======================================
+def dhash(image_file):
+    """
+    업로드된 이미지 파일의 64비트 dHash (디코딩할 수 없으면 None)
+
+    크기를 바꾸거나 다시 압축해도 비슷한 값(해밍 거리가 작음)이 된다.
+    JPEG는 draft로 작게 디코딩하고, EXIF 회전을 반영해 분석(cv2)과 같은 방향으로 계산한다.
+    """
+    from PIL import Image, ImageOps  # 처음 사용할 때 import
+
+    try:
+        image_file.seek(0)
+        with Image.open(image_file) as image:
+            image.draft('L', ((HASH_WIDTH + 1) * 8, HASH_HEIGHT * 8))  # JPEG: DCT 단계에서 축소해서 디코딩
+            image = ImageOps.exif_transpose(image).convert('L').resize((HASH_WIDTH + 1, HASH_HEIGHT), Image.BILINEAR)
+            pixels = list(image.getdata())
+    except (OSError, ValueError):
+        return None
+    finally:
+        image_file.seek(0)
+
+    value = 0
+    for row in range(HASH_HEIGHT):
+        for col in range(HASH_WIDTH):
+            left = pixels[row * (HASH_WIDTH + 1) + col]
+            value = (value << 1) | (left < pixels[row * (HASH_WIDTH + 1) + col + 1])
+    return value
+
+
+def hamming(a, b):
+    """ 두 해시의 해밍 거리 (다른 비트 수) """
+    return bin(a ^ b).count('1')
+
+
+def split_bands(value):
+    """ 64비트 해시를 16비트 구간 4개로 나눔 """
+    return [(value >> (BAND_BITS * band)) & BAND_MASK for band in range(BAND_COUNT)]
+
+
+def to_signed(value):
+    """ BigIntegerField(부호 있는 64비트)에 저장할 값 """
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def band_neighbours(band, radius):
+    """ 구간 값과 해밍 거리가 radius 이하인 모든 값 (radius 1이면 17개) """
+    values = [band]
+    for distance in range(1, radius + 1):
+        for bits in combinations(range(BAND_BITS), distance):
+            flipped = band
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+# =======================================
+# 비슷한 이미지 찾기 (다중 인덱스 해싱)
+# =======================================
+def find_near_duplicate(value, max_distance=None, max_candidates=None, before=None):
+    """
+    해시가 value와 해밍 거리 max_distance 이하인 이미지를 올린 원본 질문 (없으면 None)
+
+    before: 이 ID보다 먼저 올린 질문에서만 찾음 (이미 저장된 질문의 원본을 다시 찾을 때, 자기 자신과 순환 방지)
+
+    거리가 max_distance 이하이면 4개 구간 중 적어도 하나는 거리가 max_distance // 4 이하이므로(비둘기집 원리)
+    구간마다 그 반경 안의 값을 인덱스로 찾아 후보를 모은 뒤 전체 거리를 계산한다.
+    기본값(거리 6)이면 구간마다 17개 값을 찾으므로 100만 개에서 후보는 보통 수백 개 이하다.
+    찾은 질문도 다른 질문의 중복이면 그 원본 질문을 반환한다.
+    """
+    options = getattr(settings, 'IMAGE_HASH', None) or {}
+    if max_distance is None:
+        max_distance = options.get('max_distance', 6)
+    if max_candidates is None:
+        max_candidates = options.get('max_candidates', 2000)
+
+    radius = max_distance // BAND_COUNT
+    condition = Q()
+    for band, band_value in enumerate(split_bands(value)):
+        condition |= Q(**{'band{}__in'.format(band): band_neighbours(band_value, radius)})
+
+    # 한 값에 후보가 몰린 경우(단색 이미지 등)를 대비해 오래된 순서로 max_candidates개까지만 비교
+    candidates = ImageHash.objects.filter(condition)
+    if before is not None:
+        candidates = candidates.filter(question_id__lt=before)
+    candidates = candidates.order_by('id').values_list('dhash', 'question_id', 'original_id')[:max_candidates]
+    best = None
+    for dhash_value, question_id, original_id in candidates:
+        distance = hamming(value, to_unsigned(dhash_value))
+        if distance <= max_distance and (best is None or distance < best[0]):
+            best = (distance, original_id or question_id)
+    if best is None:
+        return None
+    return Question.objects.filter(pk=best[1]).first()
+
+
+def save_image_hash(question, value, original=None):
+    """ 질문 이미지의 해시를 저장 (original: 비슷한 이미지를 먼저 올린 원본 질문, 이미 있으면 갱신) """
+    bands = split_bands(value)
+    image_hash, _ = ImageHash.objects.update_or_create(question=question, defaults={
+        'dhash': to_signed(value),
+        'band0': bands[0], 'band1': bands[1], 'band2': bands[2], 'band3': bands[3],
+        'original': original,
+    })
+    return image_hash
+
+
+def update_image_hash(question, image_file):
+    """
+    질문의 image1을 바꾸거나 지운 뒤 해시와 원본 질문을 다시 정함
+
+    - 새 이미지를 디코딩할 수 없거나 이미지를 지웠으면 이전 이미지의 해시를 삭제 (이전 이미지로 찾아지지 않도록)
+    - 이 질문을 원본으로 가리키던 질문들은 먼저 올린 질문 중에서 원본을 다시 찾음 (없으면 null)
+    """
+    value = dhash(image_file) if image_file else None
+    if value is None:
+        ImageHash.objects.filter(question=question).delete()
+    else:
+        save_image_hash(question, value, find_near_duplicate(value, before=question.pk))
+    # 먼저 올린 질문부터 다시 정하므로, 나중 질문은 이미 갱신된 원본을 따라감
+    for duplicate in ImageHash.objects.filter(original=question).order_by('question_id'):
+        duplicate.original = find_near_duplicate(to_unsigned(duplicate.dhash), before=duplicate.question_id)
+        duplicate.save(update_fields=['original'])
@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import time  # 실행 시간 측정
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pybo.ai_system.runtime import apply_torch_threads, available_cores, configure_runtime, default_threads
+
+# 테스트 이미지 폴더 (pybo/ai_system/ai_files/image_test)
+DEFAULT_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'ai_system', 'ai_files', 'image_test')
+
+# 워커 프로세스에서 사용하는 모델 (워커마다 한 번 생성)
+_model = None
+
+
+def _init_worker(threads):
+    """ 워커 프로세스 초기화: 스레드 설정 후 FairFace와 같은 구조(ResNet34)의 모델 생성 """
+    global _model
+    if threads:
+        configure_runtime(threads)
+    import torch
+    from torchvision import models
+    apply_torch_threads()
+    _model = models.resnet34(num_classes=18).eval()
+    torch.set_grad_enabled(False)
+
+
+def _inference_job(image_path, faces):
+    """ 요청 1건에 해당하는 작업: 이미지 디코딩, 얼굴 크기 배치 리사이즈, ResNet34 forward """
+    import cv2
+    import torch
+    from pybo.ai_system.ai_system import resize_crops
+
+    start = time.perf_counter()
+    image = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2RGB)
+    height, width = image.shape[:2]
+    size = max(16, min(height, width) // 4)
+    offsets = [((i * 37) % (height - size + 1), (i * 53) % (width - size + 1)) for i in range(faces)]
+    crops = [image[y:y + size, x:x + size] for y, x in offsets]
+    batch = torch.from_numpy(resize_crops(crops)).permute(0, 3, 1, 2).float().div_(255)
+    _model(batch)
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "워커 수(동시 요청 수)와 스레드 설정별 AI 추론 처리량을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,2,4', help="동시에 실행할 워커 프로세스 수 목록 (기본값: 1,2,4)")
+        parser.add_argument('--requests', type=int, default=16, help="설정마다 처리할 요청 수 (기본값: 16)")
+        parser.add_argument('--faces', type=int, default=8, help="요청당 얼굴 수 (기본값: 8)")
+        parser.add_argument('--folder', default=DEFAULT_FOLDER, help="테스트 이미지 폴더 (하위 폴더 포함)")
+
+    def handle(self, *args, **options):
+        images = [os.path.join(root, name) for root, _, files in os.walk(options['folder'])
+                  for name in sorted(files) if name.lower().endswith(('png', 'jpg', 'jpeg'))]
+        if not images:
+            raise CommandError("테스트 이미지가 없습니다: {}".format(options['folder']))
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        requests = options['requests']
+        context = multiprocessing.get_context('spawn')  # 워커마다 라이브러리를 새로 초기화
+
+        self.stdout.write("코어 {}개, 요청 {}건, 요청당 얼굴 {}개".format(available_cores(), requests, options['faces']))
+        self.stdout.write("  {:>6} {:<18} {:>10} {:>12}".format("워커", "스레드", "처리량", "평균 지연"))
+        for workers in levels:
+            # 라이브러리 기본값(모든 코어 사용)과 코어/워커 수로 나눈 설정 비교
+            for label, threads in (("기본값", None), ("{}개/워커".format(default_threads(workers=workers)),
+                                                       default_threads(workers=workers))):
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                         initializer=_init_worker, initargs=(threads,)) as executor:
+                    # 워커 준비(모델 생성)가 끝난 뒤부터 측정
+                    wait([executor.submit(_inference_job, images[0], 1) for _ in range(workers)])
+                    start = time.perf_counter()
+                    futures = [executor.submit(_inference_job, images[i % len(images)], options['faces'])
+                               for i in range(requests)]
+                    latencies = [future.result() for future in futures]
+                    elapsed = time.perf_counter() - start
+                self.stdout.write("  {:>6} {:<18} {:>7.2f}/s {:>9.0f} ms".format(
+                    workers, label, requests / elapsed, sum(latencies) / len(latencies) * 1000))
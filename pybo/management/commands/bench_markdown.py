@@ -0,0 +1,72 @@
+import time  # 실행 시간 측정
+
+import markdown  # 기존 방식(매번 markdown.markdown 호출)과 비교하기 위한 모듈
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from pybo.markdown_cache import MARKDOWN_EXTENSIONS, markdown_cache
+
+# 질문 상세 페이지의 본문 렌더링 부분만 떼어낸 템플릿
+THREAD_TEMPLATE = """{% load pybo_filter %}
+<div class="card-text">{{ question.content|mark }}</div>
+{% for answer in answers %}<div class="card-text">{{ answer.content|mark }}</div>{% endfor %}
+"""
+
+# 답변 본문 예시 (목록, 코드 블록, 줄바꿈이 섞인 일반적인 답변)
+ANSWER_BODY = """답변 {n}번 입니다.
+이미지에서 **{n}명**의 얼굴이 검출되었습니다.
+
+- 탐지기: dlib, yolo
+- 예측기: fairface
+
+```python
+faces = detector_manager.manage_prediction(image_rgb, image_path)
+print(len(faces))  # {n}
+```
+
+자세한 내용은 [문서](https://python-markdown.github.io/)를 참고하세요.
+"""
+
+
+class Command(BaseCommand):
+    help = "답변이 많은 질문 상세 페이지의 마크다운 렌더링 시간을 측정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--answers', type=int, default=200, help="답변 수 (기본값: 200)")
+        parser.add_argument('--repeat', type=int, default=5, help="반복 횟수 (기본값: 5)")
+
+    def handle(self, *args, **options):
+        answers = [{'content': ANSWER_BODY.format(n=n)} for n in range(options['answers'])]
+        question = {'content': "질문 본문\n\n" + ANSWER_BODY.format(n=0)}
+        context = Context({'question': question, 'answers': answers})
+        template = Template(THREAD_TEMPLATE)
+        repeat = options['repeat']
+
+        # 1. 기존 방식: 본문마다 markdown.markdown() 호출 (Markdown 객체를 매번 생성)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for body in [question] + answers:
+                markdown.markdown(body['content'], extensions=MARKDOWN_EXTENSIONS)
+        baseline = (time.perf_counter() - start) / repeat
+
+        # 2. 캐시가 비어 있는 상태에서 템플릿 렌더링 (변환기 재사용 효과만 반영)
+        cold = 0.0
+        for _ in range(repeat):
+            markdown_cache.clear()
+            start = time.perf_counter()
+            template.render(context)
+            cold += time.perf_counter() - start
+        cold /= repeat
+
+        # 3. 캐시가 채워진 상태에서 템플릿 렌더링
+        template.render(context)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            template.render(context)
+        warm = (time.perf_counter() - start) / repeat
+
+        self.stdout.write("답변 {}개 스레드, {}회 평균".format(len(answers), repeat))
+        self.stdout.write("  markdown.markdown 매번 호출 : {:8.2f} ms".format(baseline * 1000))
+        self.stdout.write("  템플릿 렌더링 (캐시 비어 있음): {:8.2f} ms".format(cold * 1000))
+        self.stdout.write("  템플릿 렌더링 (캐시 적중)    : {:8.2f} ms".format(warm * 1000))
+        self.stdout.write("  캐시 적중 {} / 미적중 {}".format(markdown_cache.hits, markdown_cache.misses))
@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+
+import cv2
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from pybo.ai_system.result_encoder import ResultEncoder
+
+# 테스트 이미지 폴더 (pybo/ai_system/ai_files/image_test)
+DEFAULT_FOLDER = Path(__file__).resolve().parents[2] / 'ai_system' / 'ai_files' / 'image_test'
+
+# 비교할 인코딩 설정
+CANDIDATES = (
+    ('jpeg q95', {'format': 'jpeg', 'jpeg_quality': 95, 'jpeg_progressive': False}),
+    ('jpeg q85', {'format': 'jpeg', 'jpeg_quality': 85, 'jpeg_progressive': False}),
+    ('jpeg q85 progressive', {'format': 'jpeg', 'jpeg_quality': 85, 'jpeg_progressive': True}),
+    ('jpeg q75', {'format': 'jpeg', 'jpeg_quality': 75, 'jpeg_progressive': False}),
+    ('webp q80', {'format': 'webp', 'webp_quality': 80}),
+    ('png c1', {'format': 'png', 'png_compression': 1}),
+    ('png c6', {'format': 'png', 'png_compression': 6}),
+    ('png c9', {'format': 'png', 'png_compression': 9}),
+)
+
+
+class Command(BaseCommand):
+    help = "테스트 이미지로 AI 결과 이미지의 인코딩 형식별 용량과 인코딩 시간을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--folder', default=str(DEFAULT_FOLDER), help="테스트 이미지 폴더 (하위 폴더 포함)")
+        parser.add_argument('--repeat', type=int, default=3, help="이미지당 반복 횟수 (기본값: 3)")
+
+    def handle(self, *args, **options):
+        images = self._load_images(options['folder'])
+        if not images:
+            raise CommandError("테스트 이미지가 없습니다: {}".format(options['folder']))
+        repeat = options['repeat']
+        source_bytes = sum(size for _, size in images)
+
+        self.stdout.write("이미지 {}개 (원본 합계 {}), {}회 평균".format(len(images), filesizeformat(source_bytes), repeat))
+        self.stdout.write("  {:<22} {:>12} {:>10} {:>12}".format("형식", "용량 합계", "원본 대비", "인코딩 시간"))
+        for label, encoding in CANDIDATES:
+            encoder = ResultEncoder({'result_encoding': encoding})
+            total_bytes = 0
+            elapsed = 0.0
+            for image_rgb, _ in images:
+                for _ in range(repeat):
+                    encoded = encoder.encode(image_rgb)
+                    elapsed += encoded.seconds
+                total_bytes += len(encoded.data)
+            self.stdout.write("  {:<22} {:>12} {:>9.0f}% {:>9.1f} ms".format(
+                label, filesizeformat(total_bytes), total_bytes / source_bytes * 100, elapsed / repeat * 1000))
+
+    def _load_images(self, folder):
+        """ 폴더의 JPEG/PNG 이미지를 RGB 배열로 읽음 """
+        images = []
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                if not name.lower().endswith(('png', 'jpg', 'jpeg')):
+                    continue
+                path = os.path.join(root, name)
+                image = cv2.imread(path)
+                if image is None:
+                    self.stderr.write("읽을 수 없는 이미지 (건너뜀): {}".format(path))
+                    continue
+                images.append((cv2.cvtColor(image, cv2.COLOR_BGR2RGB), os.path.getsize(path)))
+        return images
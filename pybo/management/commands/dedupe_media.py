@@ -0,0 +1,89 @@
+import os
+from collections import Counter
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+
+from pybo.models import Question, Answer, FaceAnalysis, StoredFile
+from pybo.storage import content_addressed_name, content_addressed_storage, hash_file
+
+# 콘텐츠 주소 저장소를 사용하는 이미지 필드
+IMAGE_FIELDS = (
+    (Question, 'image1'),
+    (Question, 'image2'),
+    (Answer, 'answer_image'),
+    (FaceAnalysis, 'image_name'),  # 분석 결과도 원본 이미지의 참조를 가짐 (MEDIA_ROOT 밖의 절대 경로는 제외)
+)
+
+
+class Command(BaseCommand):
+    help = "기존 미디어 파일을 내용 해시 이름으로 옮겨 중복을 제거하고 참조 카운트를 다시 계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="파일과 DB를 바꾸지 않고 결과만 출력")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = content_addressed_storage
+        references = self._count_references()
+
+        # 1. 참조 중인 파일마다 해시를 계산해 새 이름을 정함
+        renames = {}  # 기존 이름 -> 해시 이름
+        blobs = {}  # 해시 이름 -> (sha256, 크기)
+        for name in sorted(references):
+            if not storage.exists(name):
+                self.stderr.write("파일 없음 (건너뜀): {}".format(name))
+                continue
+            with storage.open(name, 'rb') as f:
+                digest, size = hash_file(f)
+            target = content_addressed_name(digest, name, storage.prefix)
+            blobs[target] = (digest, size)
+            if target != name:
+                renames[name] = target
+
+        # 새로 만들어야 하는 해시 파일 (나머지는 이미 있는 파일과 내용이 같은 중복)
+        new_blobs = {target for target in renames.values() if not storage.exists(target)}
+        duplicates = len(renames) - len(new_blobs)
+        saved = sum(blobs[target][1] for target in renames.values()) - sum(blobs[target][1] for target in new_blobs)
+        self.stdout.write("참조 중인 파일 {}개, 이름 변경 {}개, 중복 {}개 ({} 절약)".format(
+            len(references), len(renames), duplicates, filesizeformat(saved)))
+        if dry_run:
+            return
+
+        # 2. 해시 이름의 파일이 없으면 복사 (기존 파일은 DB가 바뀐 뒤에 삭제)
+        for name, target in renames.items():
+            if target in new_blobs and not storage.exists(target):
+                with storage.open(name, 'rb') as f:
+                    storage._write_atomic(target, File(f))
+
+        # 3. DB의 파일 이름을 바꾸고 참조 카운트를 다시 계산
+        #    queryset.update를 사용하므로 Question.save의 이전 파일 삭제가 실행되지 않음
+        with transaction.atomic():
+            for model, field in IMAGE_FIELDS:
+                for name, target in renames.items():
+                    model.objects.filter(**{field: name}).update(**{field: target})
+            counts = self._count_references()
+            for target, (digest, size) in blobs.items():
+                StoredFile.objects.update_or_create(
+                    name=target, defaults={'sha256': digest, 'size': size, 'ref_count': counts[target]})
+            # 더 이상 참조되지 않는 파일의 참조 카운트 행
+            orphans = list(StoredFile.objects.exclude(name__in=list(counts)).values_list('name', flat=True))
+            StoredFile.objects.filter(name__in=orphans).delete()
+
+        # 4. 커밋된 뒤 이전 이름의 파일과 참조되지 않는 파일 삭제
+        removed = 0
+        for name in list(renames) + orphans:
+            if storage.exists(name):
+                storage.delete(name)
+                removed += 1
+        self.stdout.write(self.style.SUCCESS("완료: 파일 {}개 삭제, 참조 카운트 {}개 갱신".format(removed, len(blobs))))
+
+    def _count_references(self):
+        """ 이미지 필드(분석 결과의 원본 이미지 포함)에 저장된 파일 이름별 참조 수 """
+        counts = Counter()
+        for model, field in IMAGE_FIELDS:
+            names = model.objects.exclude(**{field: ''}).exclude(**{field + '__isnull': True})
+            counts.update(name for name in names.values_list(field, flat=True) if not os.path.isabs(name))
+        return counts
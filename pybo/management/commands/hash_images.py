@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from pybo.image_hash import dhash, find_near_duplicate, save_image_hash
+from pybo.models import Question
+
+
+class Command(BaseCommand):
+    help = ("지각 해시(dHash)가 없는 질문 이미지의 해시를 계산하고, 비슷한 이미지를 먼저 올린 원본 질문을 연결합니다. "
+            "질문을 등록 순서대로 처리하므로 먼저 올린 질문이 원본이 됩니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="처리할 최대 질문 수")
+
+    def handle(self, *args, **options):
+        questions = Question.objects.exclude(image1='').filter(image_hash__isnull=True).order_by('id')
+        if options['limit']:
+            questions = questions[:options['limit']]
+
+        done = duplicates = failed = 0
+        for question in questions.iterator():
+            try:
+                with question.image1.open('rb') as image_file:
+                    image_dhash = dhash(image_file)
+            except OSError:  # 이미지 파일이 없음
+                image_dhash = None
+            if image_dhash is None:
+                failed += 1
+                continue
+
+            original = find_near_duplicate(image_dhash)
+            save_image_hash(question, image_dhash, original)
+            done += 1
+            duplicates += original is not None
+
+        self.stdout.write("해시 계산 {}건 (비슷한 이미지 {}건), 실패 {}건".format(done, duplicates, failed))
@@ -0,0 +1,48 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "모델을 한 번만 로드하고 모든 Django 워커의 AI 추론 요청을 Unix 소켓으로 처리하는 추론 서버를 실행합니다."
+
+    def add_arguments(self, parser):
+        server = getattr(settings, 'AI_INFERENCE_SERVER', None) or {}
+        parser.add_argument('--socket', default=server.get('socket'), help="Unix 소켓 경로 (기본값: settings.AI_INFERENCE_SERVER['socket'])")
+        parser.add_argument('--max-batch', type=int, default=server.get('max_batch', 8), help="한 번에 처리할 최대 요청 수")
+        parser.add_argument('--max-wait-ms', type=float, default=server.get('max_wait_ms', 5.0),
+                            help="첫 요청 후 다른 요청을 기다리는 최대 시간(ms)")
+        parser.add_argument('--max-queue', type=int, default=server.get('max_queue'),
+                            help="대기 요청이 이 수를 넘으면 재시도 시간과 함께 거절 (기본값: 제한 없음)")
+        parser.add_argument('--preload', default='dlib,yolo,mtcnn,fairface',
+                            help="시작할 때 로드할 모델 (쉼표로 구분, 빈 값이면 첫 요청 때 로드)")
+
+    def handle(self, *args, **options):
+        if not options['socket']:
+            raise CommandError("소켓 경로가 없습니다. --socket 또는 settings.AI_INFERENCE_SERVER['socket']을 설정하세요.")
+
+        # 모델과 함께 무거운 라이브러리를 import하므로 명령을 실행할 때 import
+        from pybo.ai_system.ai_system import DETECTOR_CHOICES, django_config, setup_warnings_and_logging
+        from pybo.ai_system.inference_server import InferenceEngine, InferenceServer
+
+        setup_warnings_and_logging()
+        engine = InferenceEngine(django_config())
+        preload = [name for name in options['preload'].split(',') if name]
+        if preload:
+            engine.managers({
+                'detectors': [name for name in preload if name in DETECTOR_CHOICES],
+                'predictors': [name for name in preload if name not in DETECTOR_CHOICES],
+            })
+
+        server = InferenceServer(options['socket'], engine, max_batch=options['max_batch'], max_wait_ms=options['max_wait_ms'],
+                                 max_queue=options['max_queue'],
+                                 weights=(getattr(settings, 'AI_ANALYSIS_SCHEDULER', None) or {}).get('weights'))
+        self.stdout.write("추론 서버 시작: {} (최대 배치 {}, 최대 대기 {} ms)".format(
+            options['socket'], server.max_batch, options['max_wait_ms']))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info("추론 서버 종료: {}".format(server.batcher.stats.summary()))
+        finally:
+            server.server_close()
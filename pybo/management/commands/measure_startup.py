@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+import time  # 실행 시간 측정
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# 무거운 AI 라이브러리 (URLconf를 불러올 때 import되면 안 되는 모듈)
+HEAVY_MODULES = ('cv2', 'dlib', 'torch', 'torchvision', 'ultralytics', 'mtcnn', 'tensorflow', 'face_recognition')
+
+# 새 프로세스에서 첫 요청(질문 목록)을 처리하고 결과를 JSON으로 출력하는 코드
+FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+from django.test import Client
+start = time.perf_counter()
+response = Client(HTTP_HOST='localhost').get('/')
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{'status': response.status_code, 'seconds': elapsed, 'heavy': heavy}}))
+"""
+
+
+class Command(BaseCommand):
+    help = "manage.py check의 시작 시간/메모리와 새 프로세스의 첫 요청 지연 시간을 측정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help="반복 횟수 (기본값: 3)")
+
+    def handle(self, *args, **options):
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+        runs = options['runs']
+
+        checks = [self._run([sys.executable, manage_py, 'check']) for _ in range(runs)]
+        self.stdout.write("manage.py check  : 평균 {:6.0f} ms, 최대 RSS {:6.1f} MB".format(
+            sum(seconds for seconds, _, _ in checks) / runs * 1000, max(rss for _, rss, _ in checks)))
+
+        requests = []
+        for _ in range(runs):
+            seconds, rss, output = self._run([sys.executable, manage_py, 'shell', '-c',
+                                              FIRST_REQUEST_SCRIPT.format(heavy=HEAVY_MODULES)])
+            requests.append((seconds, rss, json.loads(output.strip().splitlines()[-1])))
+        result = requests[-1][2]
+        self.stdout.write("첫 요청 (새 프로세스): 평균 {:6.0f} ms (프로세스 전체 {:6.0f} ms), 최대 RSS {:6.1f} MB, 응답 {}".format(
+            sum(r['seconds'] for _, _, r in requests) / runs * 1000,
+            sum(seconds for seconds, _, _ in requests) / runs * 1000,
+            max(rss for _, rss, _ in requests), result['status']))
+        self.stdout.write("첫 요청 후 import된 AI 라이브러리: {}".format(', '.join(result['heavy']) or '없음'))
+
+    def _run(self, command):
+        """ 명령을 새 프로세스로 실행하고 (실행 시간(초), 최대 RSS(MB), 표준 출력)을 반환 """
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        output = process.stdout.read()
+        _, _, usage = os.wait4(process.pid, 0)  # 자식 프로세스의 자원 사용량 (ru_maxrss: KB, Linux 기준)
+        process.returncode = 0
+        return time.perf_counter() - start, usage.ru_maxrss / 1024, output
@@ -0,0 +1,70 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from pybo.models import Question, Answer
+from pybo.question_analysis import AI_ANSWER_CONTENT
+
+
+class Command(BaseCommand):
+    help = ("질문 이미지를 낮은 우선순위로 다시 분석합니다. "
+            "추론 서버에서는 질문 등록(interactive)보다 적은 몫으로 실행되며, 서버가 바쁘면 기다렸다가 다시 시도합니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--priority', choices=('bulk', 'backfill'), default='bulk',
+                            help="bulk: AI 결과가 있는 질문을 다시 분석 / backfill: AI 결과가 없는 질문(분석을 미룬 질문 포함)만 분석 (기본값: bulk)")
+        parser.add_argument('--detectors', default='dlib', help="사용할 탐지기 (쉼표로 구분, 기본값: dlib)")
+        parser.add_argument('--predictors', default='fairface', help="사용할 예측기 (쉼표로 구분, 빈 값이면 탐지만)")
+        parser.add_argument('--limit', type=int, default=None, help="처리할 최대 질문 수")
+
+    def handle(self, *args, **options):
+        # 모델과 함께 무거운 라이브러리를 import하므로 명령을 실행할 때 import
+        from pybo.ai_system.ai_system import create_django_system, django_config, setup_warnings_and_logging
+        from pybo.ai_system.scheduler import SchedulerBusy
+
+        setup_warnings_and_logging()
+        config = django_config()
+        config['selected_detectors'] = [name for name in options['detectors'].split(',') if name]
+        config['selected_predictors'] = [name for name in options['predictors'].split(',') if name]
+        config['job_class'] = options['priority']
+        ai_system, target_encodings = create_django_system(config)
+
+        # 결과가 있는 AI 답변 (결과 이미지 파일 또는 분석 결과, 분석을 미룬 답변은 둘 다 없음)
+        ai_answers = (Answer.objects.filter(question=OuterRef('pk'), content__startswith=AI_ANSWER_CONTENT)
+                      .filter(Q(face_analysis__isnull=False) | (Q(answer_image__isnull=False) & ~Q(answer_image=''))))
+        questions = Question.objects.exclude(image1='').annotate(has_ai_answer=Exists(ai_answers))
+        questions = questions.filter(has_ai_answer=options['priority'] == 'bulk').order_by('id')
+        if options['limit']:
+            questions = questions[:options['limit']]
+
+        done = failed = 0
+        for question in questions.iterator():
+            config['job_user'] = question.author_id  # 같은 작업 클래스 안에서 작성자별로 공정하게 실행
+            while True:
+                try:
+                    result_image_path = ai_system.process_image(question.image1.path, target_encodings)
+                    break
+                except SchedulerBusy as e:  # 추론 서버가 바쁨 (질문 등록 요청에 자리를 양보)
+                    logging.info("추론 서버가 바쁩니다. {}초 후 다시 시도합니다: {}".format(e.retry_after, e))
+                    time.sleep(e.retry_after)
+            if not result_image_path and ai_system.face_analysis is None:
+                failed += 1
+                continue
+
+            # 기존 AI 답변(분석을 미룬 답변 포함)을 결과로 갱신
+            answer = Answer.objects.filter(question=question, content__startswith=AI_ANSWER_CONTENT).order_by('id').first()
+            if answer is None:
+                answer = Answer(question=question, author=question.author, content=AI_ANSWER_CONTENT,
+                                create_date=timezone.now())
+            else:
+                answer.content = AI_ANSWER_CONTENT
+                answer.modify_date = timezone.now()
+            answer.answer_image = result_image_path
+            answer.face_analysis = ai_system.face_analysis
+            answer.save()
+            done += 1
+
+        self.stdout.write("분석 완료 {}건, 실패 {}건 ({})".format(done, failed, options['priority']))
@@ -0,0 +1,97 @@
+import hashlib  # 본문 내용으로 캐시 키를 만들기 위한 해시
+import threading  # 스레드별 Markdown 변환기 및 캐시 락
+from collections import OrderedDict  # LRU 순서를 유지하기 위한 딕셔너리
+
+import markdown  # 마크다운 문자열을 HTML로 변환하기 위한 모듈
+from django.conf import settings
+
+# 파이보에서 사용하는 마크다운 확장 기능
+# - 'nl2br': 줄바꿈 문자를 <br> 태그로 변환
+# - 'fenced_code': 코드 블록을 마크다운 형식으로 처리
+MARKDOWN_EXTENSIONS = ["nl2br", "fenced_code"]
+
+# =======================================
+# 재사용 가능한 마크다운 변환기
+# =======================================
+_local = threading.local()
+
+
+def get_converter():
+    """
+    현재 스레드의 Markdown 변환기를 반환합니다.
+
+    markdown.markdown()은 호출할 때마다 Markdown 객체와 확장 기능을 새로 만든다.
+    Markdown 객체는 스레드 간에 공유할 수 없으므로 스레드마다 하나를 만들어 재사용한다.
+    """
+    converter = getattr(_local, 'converter', None)
+    if converter is None:
+        converter = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        _local.converter = converter
+    return converter
+
+
+def convert(text):
+    """ 캐시를 거치지 않고 마크다운을 HTML로 변환 """
+    converter = get_converter()
+    try:
+        return converter.convert(text)
+    finally:
+        converter.reset()  # 다음 변환에 이전 문서의 상태가 남지 않도록 초기화
+
+# =======================================
+# 본문 해시 기반 LRU 캐시
+# =======================================
+class RenderedMarkdownCache:
+    """
+    본문 내용의 해시를 키로 변환된 HTML을 보관하는 LRU 캐시
+
+    같은 질문/답변을 다시 렌더링할 때 마크다운 변환을 건너뛴다.
+    내용이 바뀌면 해시도 바뀌므로 별도의 무효화가 필요 없다.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def render(self, text):
+        """ 마크다운 text를 HTML로 변환 (캐시에 있으면 캐시된 결과 반환) """
+        key = self.make_key(text)
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = convert(text)
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# 프로세스당 하나의 캐시를 사용
+markdown_cache = RenderedMarkdownCache(getattr(settings, 'MARKDOWN_CACHE_SIZE', 2048))
+
+
+def render_markdown(text):
+    """ 캐시를 사용해 마크다운을 HTML로 변환 """
+    if not text:
+        return ""
+    return markdown_cache.render(text)
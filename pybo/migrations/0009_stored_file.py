@@ -0,0 +1,42 @@
+# Generated by Django 3.1.3 on 2026-10-19 00:37
+
+from django.db import migrations, models
+import pybo.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0008_answer_answer_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('create_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='answer',
+            name='answer_image',
+            field=models.ImageField(blank=True, null=True, storage=pybo.storage.ContentAddressedStorage(), upload_to='pybo/answer_image', verbose_name='업로드 이미지'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='image1',
+            field=models.ImageField(default='', storage=pybo.storage.ContentAddressedStorage(), upload_to='pybo/image1/', verbose_name='업로드 이미지1'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='image2',
+            field=models.ImageField(default='', storage=pybo.storage.ContentAddressedStorage(), upload_to='pybo/image2/', verbose_name='업로드 이미지2'),
+            preserve_default=False,
+        ),
+    ]
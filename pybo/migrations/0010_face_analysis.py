@@ -0,0 +1,57 @@
+# Generated by Django 3.1.3 on 2026-10-19 01:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import pybo.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0009_stored_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetectedFace',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('race', models.CharField(blank=True, max_length=20)),
+                ('gender', models.CharField(blank=True, max_length=10)),
+                ('age', models.CharField(blank=True, max_length=20)),
+                ('label', models.CharField(blank=True, max_length=50)),
+                ('box_color', pybo.fields.PackedArrayField(dtype='u1', null=True)),
+                ('embedding', pybo.fields.PackedArrayField(dtype='<f4', null=True)),
+                ('match_distance', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['analysis', 'index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FaceAnalysis',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_sha256', models.CharField(max_length=64)),
+                ('fingerprint', models.CharField(max_length=255)),
+                ('image_name', models.CharField(max_length=255)),
+                ('boxes', pybo.fields.PackedArrayField(columns=4, dtype='<i4')),
+                ('labeled', models.BooleanField(default=False)),
+                ('face_cnt', models.PositiveIntegerField(default=0)),
+                ('male_cnt', models.PositiveIntegerField(blank=True, null=True)),
+                ('race_cnt', models.JSONField(blank=True, null=True)),
+                ('timings', models.JSONField(blank=True, default=dict)),
+                ('create_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='faceanalysis',
+            constraint=models.UniqueConstraint(fields=('image_sha256', 'fingerprint'), name='unique_face_analysis'),
+        ),
+        migrations.AddField(
+            model_name='detectedface',
+            name='analysis',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='faces', to='pybo.faceanalysis'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.3 on 2026-10-19 01:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0010_face_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='face_analysis',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='answers', to='pybo.faceanalysis'),
+        ),
+    ]
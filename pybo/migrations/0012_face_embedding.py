@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-19 01:20
+
+from django.db import migrations, models
+import pybo.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0011_answer_face_analysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceEmbedding',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_sha256', models.CharField(max_length=64)),
+                ('box_key', models.CharField(max_length=64)),
+                ('embedding', pybo.fields.PackedArrayField(dtype='<f4')),
+                ('create_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='faceembedding',
+            constraint=models.UniqueConstraint(fields=('image_sha256', 'box_key'), name='unique_face_embedding'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.3 on 2026-10-19 01:25
+
+from django.db import migrations, models
+import pybo.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0012_face_embedding'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='image1',
+            field=models.ImageField(db_index=True, storage=pybo.storage.ContentAddressedStorage(), upload_to='pybo/image1/', verbose_name='업로드 이미지1'),
+        ),
+    ]
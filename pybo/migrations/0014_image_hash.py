@@ -0,0 +1,27 @@
+# Generated by Django 3.1.3 on 2026-10-19 01:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0013_question_image1_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageHash',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dhash', models.BigIntegerField()),
+                ('band0', models.PositiveIntegerField(db_index=True)),
+                ('band1', models.PositiveIntegerField(db_index=True)),
+                ('band2', models.PositiveIntegerField(db_index=True)),
+                ('band3', models.PositiveIntegerField(db_index=True)),
+                ('original', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='near_duplicates', to='pybo.question')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='image_hash', to='pybo.question')),
+            ],
+        ),
+    ]
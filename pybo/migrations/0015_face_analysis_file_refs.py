@@ -0,0 +1,34 @@
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import F
+
+
+def count_analysis_images(apps):
+    """ 분석 결과(FaceAnalysis)가 참조하는 원본 이미지 이름별 개수 """
+    FaceAnalysis = apps.get_model('pybo', 'FaceAnalysis')
+    return Counter(FaceAnalysis.objects.values_list('image_name', flat=True))
+
+
+def acquire_analysis_refs(apps, schema_editor):
+    """ 기존 분석 결과도 원본 이미지의 참조를 갖도록 참조 카운트 증가 (삭제 시그널에서 해제) """
+    StoredFile = apps.get_model('pybo', 'StoredFile')
+    for name, count in count_analysis_images(apps).items():
+        StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') + count)
+
+
+def release_analysis_refs(apps, schema_editor):
+    StoredFile = apps.get_model('pybo', 'StoredFile')
+    for name, count in count_analysis_images(apps).items():
+        StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') - count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0014_image_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(acquire_analysis_refs, release_analysis_refs),
+    ]
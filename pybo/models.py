@@ -1,7 +1,10 @@
-import os
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 
+from .fields import PackedArrayField
+from .file_cleanup import cleanup_queue
+from .storage import content_addressed_storage
+
 # ==========================
 # Question 모델 (질문 데이터)
 # ==========================
@@ -29,27 +32,53 @@ class Question(models.Model):
     voter = models.ManyToManyField(User, related_name='voter_question')
     
     # 이미지1: 질문에 첨부된 첫 번째 이미지, null과 빈 값을 허용하지 않음
-    image1 = models.ImageField(upload_to='pybo/image1/', null=False, blank=False, verbose_name='업로드 이미지1')
+    # 이미지는 내용 해시 이름으로 저장되어 같은 이미지를 올린 질문끼리 파일을 공유함 (pybo/storage.py)
+    # 이미지 이름으로 같은 이미지를 올린 질문을 찾으므로(얼굴 검색) 인덱스를 만듦
+    image1 = models.ImageField(upload_to='pybo/image1/', storage=content_addressed_storage, db_index=True,
+                               null=False, blank=False, verbose_name='업로드 이미지1')
     
     # 이미지2: 질문에 첨부된 두 번째 이미지, null과 빈 값을 허용하지 않음
-    image2 = models.ImageField(upload_to='pybo/image2/', null=False, blank=False, verbose_name='업로드 이미지2')
+    image2 = models.ImageField(upload_to='pybo/image2/', storage=content_addressed_storage,
+                               null=False, blank=False, verbose_name='업로드 이미지2')
+
+    # 변경 여부를 추적할 이미지 필드 목록
+    IMAGE_FIELDS = ('image1', 'image2')
+
+    # DB에서 불러올 때의 이미지 파일 이름 (새로 만든 객체는 비어 있음)
+    _image_snapshot = {}
+
+    # DB에서 객체를 불러올 때 이미지 필드의 원래 값을 기억해 둠
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._image_snapshot = {
+            name: instance.__dict__[name] for name in cls.IMAGE_FIELDS if name in instance.__dict__
+        }
+        return instance
 
-    # save 메서드를 오버라이드하여 기존 이미지 파일을 삭제한 후 새로운 이미지로 교체
+    # save 메서드를 오버라이드하여 이미지가 교체된 경우 기존 이미지 파일을 삭제
+    # 기존 값은 from_db에서 기억해 둔 값과 비교하므로 추가 쿼리나 파일 시스템 호출이 없음
     def save(self, *args, **kwargs):
-        # Question 객체가 이미 존재할 경우 (pk가 있는 경우)
-        if self.pk:
-            old_objects = Question.objects.get(pk=self.pk)
-            # 기존 이미지1을 새 이미지로 대체할 경우, 이전 파일 삭제
-            if old_objects.image1 and old_objects.image1 != self.image1:
-                if os.path.isfile(old_objects.image1.path):
-                    os.remove(old_objects.image1.path)
-            # 기존 이미지2를 새 이미지로 대체할 경우, 이전 파일 삭제
-            if old_objects.image2 and old_objects.image2 != self.image2:
-                if os.path.isfile(old_objects.image2.path):
-                    os.remove(old_objects.image2.path)
-        # 장고의 기본 save 메서드 호출
+        # 장고의 기본 save 메서드 호출 (새로 업로드된 파일은 이 때 저장되어 최종 이름이 정해짐)
         super(Question, self).save(*args, **kwargs)
 
+        update_fields = kwargs.get('update_fields')
+        snapshot = {}
+        for name in self.IMAGE_FIELDS:
+            old_name = self._image_snapshot.get(name)
+            # update_fields에 포함되지 않은 필드는 DB 값이 바뀌지 않았으므로 건너뜀
+            if update_fields is not None and name not in update_fields:
+                snapshot[name] = old_name
+                continue
+            current = getattr(self, name).name
+            snapshot[name] = current
+            # 기존 이미지를 새 이미지로 대체한 경우, 트랜잭션이 커밋된 뒤 이전 파일의 참조를 백그라운드에서 해제
+            # (다른 질문이 같은 파일을 참조하고 있으면 저장소가 파일을 남겨 둠)
+            if old_name and old_name != current:
+                storage = getattr(self, name).storage
+                transaction.on_commit(lambda storage=storage, old_name=old_name: cleanup_queue.enqueue(storage, old_name))
+        self._image_snapshot = snapshot
+
     # 객체를 문자열로 표현할 때 질문 제목을 반환
     def __str__(self):
         return self.subject
@@ -79,7 +108,12 @@ class Answer(models.Model):
     voter = models.ManyToManyField(User, related_name='voter_answer')
     
     # 답변에 첨부된 이미지, null과 빈 값을 허용
-    answer_image = models.ImageField(upload_to='pybo/answer_image', null=True, blank=True, verbose_name='업로드 이미지')
+    answer_image = models.ImageField(upload_to='pybo/answer_image', storage=content_addressed_storage,
+                                     null=True, blank=True, verbose_name='업로드 이미지')
+
+    # AI 답변의 분석 결과: 결과 이미지는 파일로 저장하지 않고 원본과 이 결과로 요청 시 그림 (ai_views.analysis_image)
+    face_analysis = models.ForeignKey('FaceAnalysis', null=True, blank=True, related_name='answers',
+                                      on_delete=models.SET_NULL)
 
     # 객체를 문자열로 표현할 때 답변이 달린 질문의 제목을 반환
     def __str__(self):
@@ -115,3 +149,153 @@ class Comment(models.Model):
     # 객체를 문자열로 표현할 때 댓글 내용의 앞 20자를 반환
     def __str__(self):
         return self.content[:20]
+
+
+# ==========================
+# StoredFile 모델 (콘텐츠 주소 저장 파일의 참조 카운트)
+# ==========================
+class StoredFile(models.Model):
+    # 저장소 안의 파일 이름 (예: pybo/images/ab/abcdef....jpg)
+    name = models.CharField(max_length=255, unique=True)
+
+    # 파일 내용의 SHA-256 해시
+    sha256 = models.CharField(max_length=64, db_index=True)
+
+    # 파일 크기 (바이트)
+    size = models.PositiveIntegerField()
+
+    # 이 파일을 참조하는 이미지 필드의 수: 0이 되면 실제 파일을 삭제함
+    ref_count = models.IntegerField(default=0)
+
+    # 처음 저장된 일시
+    create_date = models.DateTimeField(auto_now_add=True)
+
+    # 객체를 문자열로 표현할 때 파일 이름과 참조 수를 반환
+    def __str__(self):
+        return '{} ({})'.format(self.name, self.ref_count)
+
+
+# ==========================
+# FaceAnalysis 모델 (이미지 하나의 AI 분석 결과)
+# ==========================
+class FaceAnalysis(models.Model):
+    # 분석한 원본 이미지 내용의 SHA-256 해시 (같은 이미지를 올린 질문들이 결과를 공유)
+    image_sha256 = models.CharField(max_length=64)
+
+    # 분석 설정 (선택된 탐지기/예측기, 탐지 방식 등, ForDjango.analysis_fingerprint)
+    fingerprint = models.CharField(max_length=255)
+
+    # 원본 이미지 경로 (MEDIA_ROOT 기준, 저장된 결과로 다시 그릴 때 사용)
+    image_name = models.CharField(max_length=255)
+
+    # 얼굴 박스 (x, y, w, h) int32 배열 (얼굴 수 x 16바이트)
+    boxes = PackedArrayField(dtype='<i4', columns=4)
+
+    # 예측기를 사용했는지 여부 (False이면 박스만 있고 DetectedFace의 예측 값은 비어 있음)
+    labeled = models.BooleanField(default=False)
+
+    # 집계: 검출된 인원 수, 남성 수, 인종별 인원 수
+    face_cnt = models.PositiveIntegerField(default=0)
+    male_cnt = models.PositiveIntegerField(null=True, blank=True)
+    race_cnt = models.JSONField(null=True, blank=True)
+
+    # 단계별 처리 시간(ms)과 추론 위치 (예: {'analyze_ms': 812.4, 'inference': 'server'})
+    timings = models.JSONField(default=dict, blank=True)
+
+    # 분석 일시
+    create_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image_sha256', 'fingerprint'], name='unique_face_analysis'),
+        ]
+
+    # 객체를 문자열로 표현할 때 이미지 해시 앞부분과 얼굴 수를 반환
+    def __str__(self):
+        return '{} ({}명)'.format(self.image_sha256[:12], self.face_cnt)
+
+
+# ==========================
+# DetectedFace 모델 (분석 결과의 얼굴 하나)
+# ==========================
+class DetectedFace(models.Model):
+    # 얼굴이 속한 분석 결과
+    analysis = models.ForeignKey(FaceAnalysis, on_delete=models.CASCADE, related_name='faces')
+
+    # FaceAnalysis.boxes에서 이 얼굴의 행 번호
+    index = models.PositiveSmallIntegerField()
+
+    # FairFace 예측 결과 (인종, 성별, 나이)와 결과 이미지에 표시한 텍스트, 박스 색상 (R, G, B)
+    race = models.CharField(max_length=20, blank=True)
+    gender = models.CharField(max_length=10, blank=True)
+    age = models.CharField(max_length=20, blank=True)
+    label = models.CharField(max_length=50, blank=True)
+    box_color = PackedArrayField(dtype='u1', null=True)
+
+    # 얼굴 인코딩 (128차원 float32, 512바이트)과 타겟 얼굴과의 가장 가까운 거리
+    embedding = PackedArrayField(dtype='<f4', null=True)
+    match_distance = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['analysis', 'index']
+
+    # 얼굴 박스 (x, y, w, h)
+    @property
+    def box(self):
+        return tuple(int(value) for value in self.analysis.boxes[self.index])
+
+    # 객체를 문자열로 표현할 때 분석 결과와 얼굴 번호를 반환
+    def __str__(self):
+        return '{} #{}'.format(self.analysis, self.index)
+
+
+# ==========================
+# FaceEmbedding 모델 (이미지의 얼굴 영역별 얼굴 인코딩)
+# ==========================
+class FaceEmbedding(models.Model):
+    # 원본 이미지 내용의 SHA-256 해시
+    image_sha256 = models.CharField(max_length=64)
+
+    # 양자화한 얼굴 박스 (예: '8:12,3,20,11' = 8px 단위의 x, y, x2, y2, pybo/face_analysis.py의 box_key)
+    # 탐지기/예측기 선택이 달라도 같은 얼굴 영역이면 저장된 인코딩을 재사용
+    box_key = models.CharField(max_length=64)
+
+    # 얼굴 인코딩 (128차원 float32, 512바이트)
+    embedding = PackedArrayField(dtype='<f4')
+
+    # 처음 계산한 일시
+    create_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image_sha256', 'box_key'], name='unique_face_embedding'),
+        ]
+
+    # 객체를 문자열로 표현할 때 이미지 해시 앞부분과 박스를 반환
+    def __str__(self):
+        return '{} [{}]'.format(self.image_sha256[:12], self.box_key)
+
+
+# ==========================
+# ImageHash 모델 (질문 이미지의 지각 해시, 비슷한 이미지 찾기)
+# ==========================
+class ImageHash(models.Model):
+    # 해시를 계산한 질문 (image1)
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='image_hash')
+
+    # 64비트 dHash (부호 있는 정수로 저장, pybo/image_hash.py)
+    dhash = models.BigIntegerField()
+
+    # dHash를 16비트씩 나눈 구간: 해밍 거리로 찾을 때 구간마다 인덱스를 사용 (다중 인덱스 해싱)
+    band0 = models.PositiveIntegerField(db_index=True)
+    band1 = models.PositiveIntegerField(db_index=True)
+    band2 = models.PositiveIntegerField(db_index=True)
+    band3 = models.PositiveIntegerField(db_index=True)
+
+    # 비슷한 이미지(크기 변경, 재압축 등)를 먼저 올린 원본 질문 (없으면 null)
+    original = models.ForeignKey(Question, null=True, blank=True, related_name='near_duplicates',
+                                 on_delete=models.SET_NULL)
+
+    # 객체를 문자열로 표현할 때 질문과 해시를 반환
+    def __str__(self):
+        return '{} ({:016x})'.format(self.question_id, self.dhash & ((1 << 64) - 1))
@@ -0,0 +1,94 @@
+import hashlib  # 검색어를 캐시 키에 넣기 위한 해시
+import time  # 버전 번호의 시작 값
+
+from django.conf import settings
+from django.core.cache import cache  # 장고 캐시 프레임워크 (기본: 로컬 메모리 캐시)
+
+# =======================================
+# 캐시 버전 관리
+# =======================================
+# 캐시를 직접 지우는 대신 버전 번호를 올려서 이전 캐시가 더 이상 조회되지 않게 한다.
+# - 목록 버전: 질문/답변/추천이 바뀌면 증가 (질문 목록 페이지 전체가 무효화됨)
+# - 질문 버전: 해당 질문의 본문/답변/댓글/추천이 바뀌면 증가 (그 질문의 상세 조각만 무효화됨)
+#
+# 버전 키가 없으면(처음 사용, 캐시에서 밀려남) 현재 시각(ns)으로 시작하므로,
+# 밀려나기 전의 버전으로 만든 키와 겹치지 않는다.
+# 로컬 메모리 캐시는 워커마다 따로이므로 한 워커의 무효화가 다른 워커에 전달되지 않는다.
+# 그래서 캐시된 페이지와 조각은 PAGE_CACHE_TIMEOUT이 지나면 만료되도록 저장한다 (settings의 CACHES 참고).
+LIST_VERSION_KEY = 'pybo:list:version'
+QUESTION_VERSION_KEY = 'pybo:question:{}:version'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # 버전 키가 없거나 캐시에서 밀려난 경우 새로 시작
+        version = _new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # 버전 키가 없으면 incr이 실패하므로 새로 설정
+        cache.set(key, _new_version(), timeout=None)
+
+
+def page_timeout():
+    """ 캐시된 페이지와 조각의 유지 시간(초) """
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+
+
+def list_version():
+    """ 질문 목록 캐시 버전 """
+    return _get_version(LIST_VERSION_KEY)
+
+
+def question_version(question_id):
+    """ 질문 상세 조각 캐시 버전 """
+    return _get_version(QUESTION_VERSION_KEY.format(question_id))
+
+
+def invalidate_list():
+    """ 질문 목록 캐시 무효화 """
+    _bump_version(LIST_VERSION_KEY)
+
+
+def invalidate_question(question_id):
+    """ 질문 상세 조각 캐시 무효화 """
+    _bump_version(QUESTION_VERSION_KEY.format(question_id))
+
+# =======================================
+# 질문 목록 페이지 캐시 (비로그인 사용자 전용)
+# =======================================
+def index_cache_key(request, page, kw):
+    """
+    질문 목록 페이지의 캐시 키를 반환합니다.
+
+    로그인한 사용자의 페이지는 사용자별 내용(이름, 로그아웃 링크)이 들어가므로 캐시하지 않고 None을 반환한다.
+    """
+    if request.user.is_authenticated:
+        return None
+    kw_hash = hashlib.md5(kw.encode('utf-8')).hexdigest()
+    return 'pybo:index:{}:{}:{}'.format(list_version(), page, kw_hash)
+
+
+def get_page(key):
+    """ 캐시된 (페이지 본문, ETag) (없으면 None) """
+    if key is None:
+        return None
+    return cache.get(key)
+
+
+def set_page(key, page):
+    """ 렌더링된 (페이지 본문, ETag)를 캐시에 저장 """
+    if key is not None:
+        cache.set(key, page, page_timeout())
+
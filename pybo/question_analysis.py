@@ -0,0 +1,152 @@
+import logging
+
+from django.urls import reverse
+from django.utils import timezone
+
+from .ai_system.admission import admission_controller
+from .ai_system.scheduler import QuotaExceeded, SchedulerBusy, analysis_scheduler
+from .image_hash import dhash, find_near_duplicate, save_image_hash
+from .models import Answer
+
+logger = logging.getLogger('pybo')
+
+# AI가 자동으로 작성하는 답변의 첫 줄 (manage.py reanalyze_images에서 AI 답변을 찾을 때도 사용)
+AI_ANSWER_CONTENT = "AI가 처리한 얼굴 인식 결과입니다."
+
+
+def ai_answer_content(note=""):
+    """ AI 답변 내용 (부하로 분석을 줄이거나 미룬 경우 안내를 덧붙임) """
+    return "{}\n\n({})".format(AI_ANSWER_CONTENT, note) if note else AI_ANSWER_CONTENT
+
+
+def duplicate_note(original, reused):
+    """ 비슷한 이미지를 먼저 올린 원본 질문 안내 (AI 답변에 덧붙임) """
+    link = "[질문 #{}]({})".format(original.id, reverse('pybo:detail', args=[original.id]))
+    if reused:
+        return "이전에 올라온 같은 사진({})의 분석 결과를 재사용했습니다.".format(link)
+    return "이전에 올라온 같은 사진: {}".format(link)
+
+
+def reusable_analysis(request, original):
+    """ 원본 질문의 이미지를 요청과 같은 설정(탐지기/예측기/탐지 방식)으로 분석한 결과 (없으면 None) """
+    # AI 모듈은 처음 사용할 때 import (분석 설정 문자열을 분석할 때와 같은 방식으로 만듦)
+    from .ai_system.ai_system import FaceDetectors, ForDjango, django_config
+    from .face_analysis import image_digest, load_face_analysis
+
+    strategy = request.POST.get('detection_strategy', 'all')
+    config = dict(
+        django_config(),
+        selected_detectors=request.POST.getlist('detectors'),
+        selected_predictors=request.POST.getlist('predictors'),
+        detection_strategy=strategy if strategy in FaceDetectors.STRATEGIES else 'all',
+    )
+    try:
+        digest = image_digest(original.image1.path)  # 콘텐츠 주소 저장소의 이미지는 이름이 해시이므로 파일을 읽지 않음
+    except OSError:
+        return None
+    return load_face_analysis(digest, ForDjango(config, None, None).analysis_fingerprint())
+
+
+def run_analysis(request, question, admission):
+    """
+    수락된 탐지기/예측기로 질문 이미지를 분석하고 (결과 이미지 경로, 분석 결과)를 반환
+
+    결과 이미지를 요청 시 그리는 설정(AI_RESULT_RENDERING)이면 결과 이미지 경로는 None이다.
+    대기열이 가득 차면 분석을 미루고 (None, None)을 반환한다.
+    """
+    # AI 모듈은 처음 사용할 때 import (torch, cv2 등 무거운 라이브러리를 URLconf 로드 시 불러오지 않도록)
+    from .ai_system.ai_pybo import start_ai
+
+    # 실행 차례를 기다린 뒤 분석 (질문 등록 시 이미 확인한 작업이므로 한도를 다시 확인하지 않음)
+    try:
+        with analysis_scheduler.slot(request.user.pk, 'interactive', admit=False):
+            return start_ai(request, question.image1.path, admission.detectors, admission.predictors)
+    except SchedulerBusy as e:
+        logger.warning("AI 분석을 미룹니다 (질문 %s): %s", question.id, e)
+        admission.mode = 'deferred'  # 답변에 지연 안내 (manage.py reanalyze_images --priority backfill로 나중에 처리)
+        return None, None
+
+
+# =======================================
+# 새 질문 이미지의 중복 확인과 AI 분석
+# =======================================
+class QuestionAnalysis:
+    """
+    새 질문의 image1로 비슷한 이미지를 먼저 올린 원본 질문을 찾고, AI 분석을 준비/실행해 답변을 만든다.
+
+    - prepare(): 질문을 저장하기 전에 호출. 원본 질문의 분석 결과를 재사용할 수 있는지 확인하고,
+      재사용할 수 없으면 사용자 할당량 확인(넘으면 QuotaExceeded)과 수락 제어로 실행할 탐지기/예측기를 정한다.
+    - finish(question): 질문을 저장한 뒤 호출. 지각 해시를 저장하고 재사용/분석 결과로 AI 답변을 만든다.
+    """
+
+    def __init__(self, request, image1):
+        self.request = request
+        self.image1 = image1
+        # 탐지기 및 예측기 목록을 POST 요청에서 가져옴
+        self.detectors = request.POST.getlist('detectors')
+        self.predictors = request.POST.getlist('predictors')
+        # 업로드된 이미지의 지각 해시로 비슷한 이미지(크기 변경, 재압축 등)를 먼저 올린 질문을 찾음
+        self.image_dhash = dhash(image1) if image1 else None
+        self.original = find_near_duplicate(self.image_dhash) if self.image_dhash is not None else None
+        self.reused = None
+        self.admission = None
+
+    @classmethod
+    def prepare(cls, request, image1):
+        """ 질문 저장 전 단계 (할당량을 넘으면 QuotaExceeded, 질문은 저장하지 않아야 함) """
+        analysis = cls(request, image1)
+        if not (analysis.detectors or analysis.predictors):
+            return analysis
+        # 원본 질문을 같은 설정으로 분석한 결과가 있으면 분석하지 않고 재사용
+        if analysis.original is not None:
+            analysis.reused = reusable_analysis(request, analysis.original)
+        if image1 and analysis.reused is None:
+            analysis.admit()
+        return analysis
+
+    def admit(self):
+        """ 한 사용자의 작업 할당량을 확인하고 처리 중인 분석 비용에 따라 실행할 탐지기/예측기를 정함 """
+        force = None
+        try:
+            analysis_scheduler.check(self.request.user.pk, 'interactive')
+        except QuotaExceeded:
+            raise  # 질문을 저장하기 전에 호출한 쪽에서 거절 (다시 보내도 질문이 중복 저장되지 않음)
+        except SchedulerBusy as e:
+            logger.warning("AI 분석 대기열이 가득 차 분석을 미룹니다: %s", e)
+            force = 'deferred'
+
+        # 처리 중인 분석 비용에 따라 탐지기/예측기를 줄이거나 분석을 미룸 (이미지 크기는 검증 때 읽은 헤더 정보)
+        image = getattr(self.image1, 'image', None)
+        pixels = image.width * image.height if image is not None else None
+        self.admission = admission_controller.admit(pixels, self.detectors, self.predictors, force=force)
+
+    def finish(self, question):
+        """ 저장된 질문의 지각 해시와 AI 답변 저장 """
+        if self.image_dhash is not None:
+            save_image_hash(question, self.image_dhash, self.original)
+
+        if self.reused is not None:
+            # 원본 질문의 분석 결과로 답변 생성 (결과 이미지는 원본 이미지와 분석 결과로 그림)
+            Answer.objects.create(
+                question=question,
+                author=self.request.user,
+                content=ai_answer_content(duplicate_note(self.original, reused=True)),
+                face_analysis=self.reused,
+                create_date=timezone.now(),
+            )
+        elif self.admission is not None:
+            with self.admission:  # 분석이 끝나면 예약한 비용 반환
+                result_image_path, face_analysis = (
+                    (None, None) if self.admission.deferred else run_analysis(self.request, question, self.admission))
+
+                # AI 처리 결과(또는 축소/지연 안내, 원본 질문 안내)를 포함한 답변 생성
+                notes = [self.admission.note,
+                         duplicate_note(self.original, reused=False) if self.original is not None else ""]
+                Answer.objects.create(
+                    question=question,
+                    author=self.request.user,
+                    content=ai_answer_content(" ".join(note for note in notes if note)),
+                    answer_image=result_image_path,
+                    face_analysis=face_analysis,  # 결과 이미지는 이 분석 결과로 요청 시 그림
+                    create_date=timezone.now(),
+                )
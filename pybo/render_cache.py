@@ -0,0 +1,61 @@
+import threading  # 캐시 락
+from collections import OrderedDict  # LRU 순서를 유지하기 위한 딕셔너리
+
+from django.conf import settings
+
+# =======================================
+# 렌더링된 결과 이미지의 크기 제한 LRU 캐시
+# =======================================
+class RenderedImageCache:
+    """
+    저장된 분석 결과로 그린 결과 이미지(인코딩된 바이트)를 보관하는 LRU 캐시
+
+    항목 수가 아니라 바이트 합계(max_bytes)로 크기를 제한하며, 넘으면 가장 오래 사용하지 않은 이미지부터 버린다.
+    키에 분석 결과 ID와 그리기 방식(결과 버전, 인코딩 설정)이 들어가므로,
+    그리기 방식이 바뀌면 키도 바뀌어 별도의 무효화가 필요 없다.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # 키 -> (Content-Type, 바이트)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        """ 캐시된 (Content-Type, 바이트)를 반환 (없으면 render()로 만들어 보관) """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = render()
+
+        with self._lock:
+            if key not in self._entries and len(entry[1]) <= self.max_bytes:  # 한도보다 큰 이미지는 보관하지 않음
+                self._entries[key] = entry
+                self.size += len(entry[1])
+                while self.size > self.max_bytes:
+                    _, (_, data) = self._entries.popitem(last=False)
+                    self.size -= len(data)
+        return entry
+
+    def snapshot(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = self.misses = 0
+
+
+# 프로세스당 하나의 캐시를 사용
+rendered_image_cache = RenderedImageCache(
+    (getattr(settings, 'AI_RESULT_RENDERING', None) or {}).get('cache_bytes', 64 * 1024 * 1024))
@@ -0,0 +1,88 @@
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import page_cache
+from .file_cleanup import cleanup_queue
+from .models import Question, Answer, Comment, FaceAnalysis
+from .storage import ContentAddressedStorage, content_addressed_storage
+
+# =======================================
+# 캐시 무효화 시그널
+# =======================================
+# 질문/답변/댓글이 저장·삭제되거나 추천이 바뀌면 관련된 캐시만 무효화한다.
+# 조회수는 QuerySet.update()로 반영되어 시그널이 발생하지 않으므로 캐시에 영향을 주지 않는다.
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """ 질문 변경: 질문 상세와 목록 무효화 """
+    page_cache.invalidate_question(instance.pk)
+    page_cache.invalidate_list()
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    """ 답변 변경: 질문 상세와 목록(답변 수 표시) 무효화 """
+    page_cache.invalidate_question(instance.question_id)
+    page_cache.invalidate_list()
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """ 댓글 변경: 댓글이 달린 질문 상세만 무효화 """
+    if instance.question_id:
+        page_cache.invalidate_question(instance.question_id)
+    elif instance.answer_id:
+        question_id = Answer.objects.filter(pk=instance.answer_id).values_list('question_id', flat=True).first()
+        if question_id:
+            page_cache.invalidate_question(question_id)
+
+
+@receiver(m2m_changed, sender=Question.voter.through)
+def question_voted(sender, instance, action, reverse, pk_set, **kwargs):
+    """ 질문 추천 변경: 질문 상세와 목록(추천 수 표시) 무효화 """
+    if not action.startswith('post_'):
+        return
+    question_ids = pk_set if reverse else [instance.pk]
+    for question_id in question_ids or ():
+        page_cache.invalidate_question(question_id)
+    page_cache.invalidate_list()
+
+
+@receiver(m2m_changed, sender=Answer.voter.through)
+def answer_voted(sender, instance, action, reverse, pk_set, **kwargs):
+    """ 답변 추천 변경: 답변이 달린 질문 상세 무효화 """
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        question_ids = Answer.objects.filter(pk__in=pk_set or ()).values_list('question_id', flat=True)
+    else:
+        question_ids = [instance.question_id]
+    for question_id in set(question_ids):
+        page_cache.invalidate_question(question_id)
+
+# =======================================
+# 파일 참조 해제 시그널
+# =======================================
+# 질문/답변/분석 결과가 삭제되면 참조하던 파일의 참조 카운트를 커밋 후 백그라운드에서 줄인다.
+# 마지막 참조가 해제될 때만 저장소가 실제 파일을 삭제한다 (pybo/storage.py).
+# 콘텐츠 주소 저장소가 관리하지 않는 파일(AI 결과 이미지 등 여러 답변이 같은 이름을 쓰는 파일)은 남겨 둔다.
+
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=Answer)
+def release_files(sender, instance, **kwargs):
+    """ 삭제된 행의 이미지 파일 참조 해제 """
+    for field in instance._meta.concrete_fields:
+        if not isinstance(field, models.FileField) or not isinstance(field.storage, ContentAddressedStorage):
+            continue
+        name = getattr(instance, field.attname).name
+        if field.storage.owns(name):
+            transaction.on_commit(lambda storage=field.storage, name=name: cleanup_queue.enqueue(storage, name))
+
+
+@receiver(post_delete, sender=FaceAnalysis)
+def release_analysis_image(sender, instance, **kwargs):
+    """ 삭제된 분석 결과의 원본 이미지 참조 해제 (save_face_analysis에서 추가한 참조) """
+    name = instance.image_name
+    if content_addressed_storage.owns(name):
+        transaction.on_commit(lambda: cleanup_queue.enqueue(content_addressed_storage, name))
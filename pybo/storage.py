@@ -0,0 +1,132 @@
+import hashlib  # 파일 내용 해시
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+# 확장자 정규화 (같은 형식의 파일이 확장자 표기 때문에 따로 저장되지 않도록)
+EXTENSION_ALIASES = {'.jpeg': '.jpg', '.jpe': '.jpg'}
+
+
+def hash_file(content, chunk_size=64 * 1024):
+    """ 파일 객체의 SHA-256 해시와 크기를 스트리밍으로 계산 """
+    hasher = hashlib.sha256()
+    size = 0
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(chunk_size) if hasattr(content, 'chunks') else iter(lambda: content.read(chunk_size), b''):
+        hasher.update(chunk)
+        size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def content_addressed_name(digest, original_name, prefix='pybo/images'):
+    """ 해시값으로 저장 경로를 만듦 (예: pybo/images/ab/abcdef....jpg) """
+    ext = os.path.splitext(original_name)[1].lower()
+    ext = EXTENSION_ALIASES.get(ext, ext)
+    return '{}/{}/{}{}'.format(prefix, digest[:2], digest, ext)
+
+# =======================================
+# 콘텐츠 주소 저장소 (중복 제거 + 참조 카운트)
+# =======================================
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    파일 내용의 SHA-256 해시로 이름을 정하는 저장소
+
+    - 같은 이미지를 여러 질문에서 올려도 실제 파일은 하나만 저장 (필드의 upload_to 대신 prefix 아래에 저장)
+    - 파일을 참조할 때마다 StoredFile.ref_count를 올리고, delete()는 참조를 하나 줄임
+      참조가 0이 될 때만 실제 파일을 삭제하므로 Question.save의 이전 파일 삭제가 다른 질문의 이미지를 지우지 않음
+    - 저장 시점(트랜잭션 안)에 참조를 올리고 삭제는 커밋 후에 하므로,
+      롤백되면 파일이 남을 수는 있어도 참조 중인 파일이 지워지지는 않음
+    - 행이 삭제되면 signals.py에서 커밋 후 이미지 필드의 참조를 해제함
+
+    업로드 핸들러(pybo/upload_handlers.py)가 계산한 해시가 content_hash 속성에 있으면 파일을 다시 읽지 않는다.
+    """
+
+    def __init__(self, prefix='pybo/images', **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+
+    def get_available_name(self, name, max_length=None):
+        # 이름이 내용으로 정해지므로 이미 있어도 새 이름을 만들지 않음
+        return name
+
+    def _save(self, name, content):
+        digest = getattr(content, 'content_hash', None)
+        size = getattr(content, 'size', None)
+        if digest is None or size is None:
+            digest, size = hash_file(content)
+        name = content_addressed_name(digest, name, self.prefix)
+
+        # 참조를 먼저 올리고(행 잠금) 파일을 확인하므로, 마지막 참조를 해제하는 delete()와 겹쳐도 파일이 사라지지 않음
+        # - delete()가 먼저 잠그면 파일 삭제까지 커밋된 뒤 이쪽의 UPDATE가 실행되어 파일을 새로 씀
+        # - 이쪽이 먼저 잠그면 delete()는 남은 참조를 보고 파일을 남겨 둠
+        with transaction.atomic():
+            if self.acquire(name):
+                # 같은 내용의 파일이 이미 있으면 쓰지 않고 참조만 추가 (삭제 도중 롤백되어 파일만 없어진 경우는 다시 씀)
+                if not self.exists(name):
+                    self._write_atomic(name, content)
+                return name
+            self._write_atomic(name, content)
+            self._create(name, digest, size)
+        return name
+
+    def _write_atomic(self, name, content):
+        """ 임시 파일에 쓴 뒤 rename하여, 동시에 같은 파일을 올려도 깨진 파일이 보이지 않게 함 """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def acquire(self, name):
+        """ 이미 저장된 파일의 참조를 하나 추가 (참조 카운트 행이 없으면 False) """
+        from .models import StoredFile
+        return StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') + 1) > 0
+
+    def _create(self, name, digest, size):
+        """ 처음 저장된 파일의 참조 카운트 행 생성 """
+        from .models import StoredFile
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, sha256=digest, size=size, ref_count=1)
+        except IntegrityError:
+            # 동시에 다른 요청이 먼저 생성한 경우
+            self.acquire(name)
+
+    def owns(self, name):
+        """ 이 저장소가 내용 해시 이름으로 저장한(참조 카운트를 관리하는) 파일인지 여부 """
+        return bool(name) and name.startswith(self.prefix + '/')
+
+    def delete(self, name):
+        """ 참조를 하나 줄이고, 더 이상 참조가 없을 때만 실제 파일 삭제 """
+        from .models import StoredFile
+        with transaction.atomic():
+            # UPDATE로 행을 잠근 채 파일까지 삭제하므로, 같은 파일을 저장하는 _save()는 삭제가 끝난 뒤에 참조를 확인함
+            tracked = StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') - 1)
+            if tracked:
+                if StoredFile.objects.filter(name=name, ref_count__gt=0).exists():
+                    return
+                StoredFile.objects.filter(name=name).delete()
+            # 참조 카운트가 없는 파일(중복 제거 이전에 저장된 파일)은 바로 삭제
+            super().delete(name)
+
+
+# 업로드 이미지 필드에서 공유하는 저장소
+content_addressed_storage = ContentAddressedStorage()
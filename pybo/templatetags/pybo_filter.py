@@ -1,7 +1,9 @@
-import markdown  # 마크다운 문자열을 HTML로 변환하기 위한 모듈
 from django import template  # Django 템플릿 라이브러리
 from django.utils.safestring import mark_safe  # 안전한 HTML 문자열로 변환하는 함수
 
+from pybo import page_cache  # 질문 상세 조각 캐시 버전
+from pybo.markdown_cache import render_markdown  # 캐시를 사용하는 마크다운 변환 함수
+
 # ===============================
 # 템플릿 라이브러리 객체 생성
 # ===============================
@@ -46,11 +48,39 @@ def mark(value):
     if value is None:
         value = ""
     
-    # 마크다운 확장 기능 목록 설정
-    extensions = ["nl2br", "fenced_code"]
-    
     # 마크다운을 HTML로 변환하고, 안전한 HTML로 처리하여 반환
-    return mark_safe(markdown.markdown(value, extensions=extensions))
+    # 같은 본문은 캐시된 HTML을 재사용하고, 변환기는 스레드마다 하나를 재사용 (markdown_cache.py 참고)
+    return mark_safe(render_markdown(value))
+
+# ===============================
+# 커스텀 필터: 질문 상세 조각 캐시 버전
+# ===============================
+@register.filter  # Django 템플릿 필터로 등록
+def fragment_version(question_id):
+    """
+    'fragment_version' 필터는 질문 상세 페이지 조각 캐시의 현재 버전을 반환합니다.
+
+    질문/답변/댓글/추천이 바뀌면 signals.py에서 버전이 올라가므로 이전 조각은 더 이상 사용되지 않습니다.
+
+    사용 예:
+    {% cache fragment_timeout question_body question.id question.id|fragment_version %} 형태로 캐시 키에 포함합니다.
+    """
+    return page_cache.question_version(question_id)
+
+# ===============================
+# 커스텀 태그: 질문 상세 조각 캐시 유지 시간
+# ===============================
+@register.simple_tag  # Django 템플릿 태그로 등록
+def fragment_timeout():
+    """
+    'fragment_timeout' 태그는 질문 상세 페이지 조각 캐시의 유지 시간(PAGE_CACHE_TIMEOUT)을 반환합니다.
+
+    다른 워커에서 무효화된 조각도 이 시간이 지나면 다시 렌더링됩니다.
+
+    사용 예:
+    {% fragment_timeout as timeout %} 로 받아 {% cache timeout ... %} 에 사용합니다.
+    """
+    return page_cache.page_timeout()
 
 """
 mark 함수는 markdown 모듈과 mark_safe 함수를 이용하여 입력 문자열을 HTML로 변환하는 필터 함수입니다. 
@@ -1,3 +1,1325 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.conf import settings
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .ai_system import inference_protocol as protocol
+from .ai_system import runtime
+from .ai_system.admission import AdmissionController
+from .ai_system.cascade import CascadePolicy, CascadeStats
+from .ai_system.face_index import IVFIndex
+from .ai_system.frame_transport import FrameHandle, FrameReader, FrameRing
+from .ai_system.inference_client import InferenceClient, InferenceUnavailable
+from .ai_system.micro_batcher import MicroBatcher
+from .ai_system.model_registry import ModelRegistry
+from .ai_system.result_encoder import ResultEncoder
+from .ai_system.scheduler import AnalysisScheduler, FairQueue, QuotaExceeded, SchedulerBusy
+from .face_analysis import (load_face_analysis, load_face_embeddings, save_face_analysis, save_face_embeddings,
+                            stored_predictions)
+from . import page_cache
+from .file_cleanup import cleanup_queue
+from .models import Question, Answer, Comment, StoredFile, DetectedFace, FaceAnalysis, FaceEmbedding, ImageHash
+from .face_search import FaceSearchIndex
+from .markdown_cache import RenderedMarkdownCache, convert, get_converter
+from .image_hash import dhash, find_near_duplicate, hamming, save_image_hash, update_image_hash
+from .render_cache import RenderedImageCache
+from .storage import content_addressed_storage
+from .upload_handlers import ImageUploadHandler
+from .view_counter import ViewCountBuffer, _flush_at_exit, view_count_buffer
+from .views.media_views import serve_media
+
+
+# =======================================
+# 조회수 버퍼 테스트
+# =======================================
+class ViewCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=name, password='pw-12345!') for name in ('a', 'b')]
+        self.questions = [Question.objects.create(author=self.users[0], subject=str(i), content='내용', create_date=timezone.now(),
+                                                  image1='pybo/image1/a.jpg', image2='pybo/image2/b.jpg') for i in range(2)]
+        self.buffer = ViewCountBuffer(flush_interval=3600, max_pending=100)
+        self.addCleanup(self.buffer.close)
+        patcher = mock.patch('pybo.view_counter.view_count_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def view(self, user, question):
+        self.client.force_login(user)
+        self.client.get(reverse('pybo:detail', args=[question.id]))
+
+    def test_repeat_views_in_one_session_count_once_and_flush_in_one_update(self):
+        self.view(self.users[0], self.questions[0])
+        self.view(self.users[0], self.questions[0])
+        self.client.logout()
+        self.view(self.users[1], self.questions[0])
+        self.view(self.users[1], self.questions[1])
+
+        # 플러시 전에는 DB에 반영되지 않고 버퍼에만 누적
+        self.assertEqual((self.buffer.pending(self.questions[0].id), self.buffer.pending(self.questions[1].id)), (2, 1))
+        self.assertEqual(Question.objects.get(pk=self.questions[0].id).view_count, 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('CASE WHEN', queries[0]['sql'])
+        self.assertEqual(list(Question.objects.order_by('id').values_list('view_count', flat=True)), [2, 1])
+
+    def test_exit_flush_skips_replaced_database(self):
+        self.buffer.add(self.questions[0].id)
+        self.buffer.database_name = 'deleted-test-db'
+        with self.assertNumQueries(0):
+            _flush_at_exit()
+        self.assertEqual(self.buffer.pending(self.questions[0].id), 1)
+
+
+# 플러시 스레드는 다른 DB 연결을 사용하므로 TransactionTestCase를 사용
+class ViewCountFlushThreadTest(TransactionTestCase):
+    def test_pending_views_are_flushed_without_further_requests(self):
+        user = User.objects.create_user(username='tester', password='pw-12345!')
+        question = Question.objects.create(author=user, subject='제목', content='내용', create_date=timezone.now(),
+                                           image1='pybo/image1/a.jpg', image2='pybo/image2/b.jpg')
+        view_buffer = ViewCountBuffer(flush_interval=0.05, max_pending=100)
+        self.addCleanup(view_buffer.close)
+        view_buffer.add(question.id)
+
+        for _ in range(100):
+            if Question.objects.get(pk=question.id).view_count:
+                break
+            time.sleep(0.02)
+        self.assertEqual(Question.objects.get(pk=question.id).view_count, 1)
+
+
+# =======================================
+# 이미지 교체 시 이전 파일 정리 테스트
+# =======================================
+# 이전 파일 정리는 커밋 후에 예약되므로 TransactionTestCase를 사용
+class QuestionImageReplaceTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch('pybo.models.cleanup_queue')
+        self.cleanup = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        question = Question(author=User.objects.create_user(username='tester', password='pw-12345!'),
+                            subject='제목', content='내용', create_date=timezone.now())
+        question.image1.save('a.jpg', ContentFile(b'old-image'), save=False)
+        question.image2.save('b.jpg', ContentFile(b'other-image'), save=False)
+        question.save()
+        self.question = Question.objects.get(pk=question.pk)  # from_db로 불러온 객체
+        self.old_name = self.question.image1.name
+
+    def test_old_image_is_released_only_after_commit(self):
+        with transaction.atomic():
+            self.question.image1.save('c.jpg', ContentFile(b'new-image'), save=False)
+            self.question.save()
+            self.cleanup.enqueue.assert_not_called()
+        self.cleanup.enqueue.assert_called_once_with(content_addressed_storage, self.old_name)
+
+    def test_update_fields_without_images_does_nothing(self):
+        self.question.subject = '새 제목'
+        with self.assertNumQueries(1):
+            self.question.save(update_fields=['subject'])
+        self.cleanup.enqueue.assert_not_called()
+
+    def test_rollback_keeps_old_image(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            self.question.image1.save('c.jpg', ContentFile(b'new-image'), save=False)
+            self.question.save()
+            raise ValueError
+        self.cleanup.enqueue.assert_not_called()
+        self.assertEqual(Question.objects.get(pk=self.question.pk).image1.name, self.old_name)
+        self.assertTrue(content_addressed_storage.exists(self.old_name))
+
+
+# =======================================
+# 마크다운 캐시 테스트
+# =======================================
+class MarkdownCacheTest(SimpleTestCase):
+    def test_lru_hits_and_evicts_least_recently_used(self):
+        markdown_cache = RenderedMarkdownCache(max_entries=2)
+        self.assertEqual(markdown_cache.render('**a**'), '<p><strong>a</strong></p>')
+        markdown_cache.render('b')
+        with mock.patch('pybo.markdown_cache.convert', side_effect=AssertionError("캐시된 본문을 다시 변환")):
+            self.assertEqual(markdown_cache.render('**a**'), '<p><strong>a</strong></p>')
+        markdown_cache.render('c')  # 가장 오래 사용하지 않은 'b'를 버림
+
+        self.assertEqual((markdown_cache.hits, markdown_cache.misses), (1, 3))
+        self.assertEqual(list(markdown_cache._entries),
+                         [RenderedMarkdownCache.make_key('**a**'), RenderedMarkdownCache.make_key('c')])
+
+    def test_converter_is_reused_per_thread_and_reset_between_documents(self):
+        converter = get_converter()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertIsNot(executor.submit(get_converter).result(), converter)
+
+        with mock.patch.object(converter, 'reset', wraps=converter.reset) as reset:
+            self.assertIn('<code>x = 1', convert('```\nx = 1\n```'))
+            self.assertEqual(convert('plain'), '<p>plain</p>')  # 이전 문서의 코드 블록이 남지 않음
+        self.assertIs(get_converter(), converter)
+        self.assertEqual(reset.call_count, 2)
+
+
+# =======================================
+# 페이지/조각 캐시 테스트
+# =======================================
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tester', password='pw-12345!')
+        self.question = Question.objects.create(author=self.user, subject='제목', content='내용', create_date=timezone.now(),
+                                                image1='pybo/image1/a.jpg', image2='pybo/image2/b.jpg')
+        self.answer = Answer.objects.create(author=self.user, question=self.question, content='답변', create_date=timezone.now())
+        self.detail_url = reverse('pybo:detail', args=[self.question.id])
+
+    def tearDown(self):
+        view_count_buffer.flush()
+
+    def test_only_anonymous_pages_are_cached(self):
+        self.client.get(reverse('pybo:index'))
+        self.client.get(self.detail_url)
+        # 시그널 없이 바꾸면 캐시된 페이지/조각이 그대로 사용됨
+        Question.objects.filter(pk=self.question.pk).update(subject='바뀐 제목')
+        Answer.objects.filter(pk=self.answer.pk).update(content='바뀐 답변')
+
+        self.assertContains(self.client.get(reverse('pybo:index')), '>제목<')
+        self.assertContains(self.client.get(self.detail_url), '답변')
+        self.assertNotContains(self.client.get(self.detail_url), '바뀐 답변')
+
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('pybo:index')), '바뀐 제목')
+        self.assertContains(self.client.get(self.detail_url), '바뀐 답변')
+
+    def test_signals_invalidate_cached_list_and_fragments(self):
+        self.client.get(reverse('pybo:index'))
+        self.client.get(self.detail_url)
+
+        Answer.objects.create(author=self.user, question=self.question, content='새 답변', create_date=timezone.now())
+        Comment.objects.create(author=self.user, question=self.question, content='새 댓글', create_date=timezone.now())
+        self.question.subject = '바뀐 제목'
+        self.question.save()
+
+        self.assertContains(self.client.get(reverse('pybo:index')), '바뀐 제목')
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, '새 답변')
+        self.assertContains(response, '새 댓글')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_cached_fragments_expire(self):
+        # 다른 워커에서 무효화된 경우(시그널을 받지 못한 경우)에도 만료 후에는 새로 렌더링
+        self.client.get(self.detail_url)
+        Answer.objects.filter(pk=self.answer.pk).update(content='바뀐 답변')
+        self.assertContains(self.client.get(self.detail_url), '바뀐 답변')
+
+    def test_evicted_version_does_not_reuse_old_keys(self):
+        first = page_cache.question_version(self.question.id)
+        page_cache.invalidate_question(self.question.id)
+        second = page_cache.question_version(self.question.id)
+        cache.delete(page_cache.QUESTION_VERSION_KEY.format(self.question.id))  # 캐시에서 밀려남
+
+        self.assertGreater(second, first)
+        self.assertGreater(page_cache.question_version(self.question.id), second)
+
+
+# =======================================
+# 업로드 중 검증 테스트
+# =======================================
+class ImageUploadValidationTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        # 작은 파일도 임시 파일 핸들러가 받도록 설정
+        settings_override = override_settings(MEDIA_ROOT=self.temp_dir, FILE_UPLOAD_TEMP_DIR=self.temp_dir,
+                                              FILE_UPLOAD_MAX_MEMORY_SIZE=0, MAX_UPLOAD_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('tester', password='pw-12345!')
+        self.client.force_login(self.user)
+
+    def post_question(self, image1, client=None):
+        gif = b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+        return (client or self.client).post(reverse('pybo:question_create'), {
+            'subject': '제목', 'content': '내용',
+            'image1': SimpleUploadedFile('a.jpg', image1, 'image/jpeg'),
+            'image2': SimpleUploadedFile('b.gif', gif, 'image/gif'),
+        })
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(message, response.json()['error']['image1'][0])
+        self.assertFalse(Question.objects.exists())
+        self.assertEqual(os.listdir(self.temp_dir), [])  # 받던 임시 파일도 남지 않음
+
+    def test_oversized_file_is_rejected_while_streaming(self):
+        with mock.patch('django.core.files.uploadhandler.TemporaryFileUploadHandler.receive_data_chunk',
+                        autospec=True, side_effect=lambda handler, raw_data, start: raw_data) as downstream:
+            response = self.post_question(b'\xff\xd8\xff' + b'0' * 4096)
+        self.assertRejected(response, '파일 크기는')
+        # 거절된 파일의 청크는 다음 핸들러(임시 파일)로 전달되지 않음
+        self.assertEqual([call.args[0].field_name for call in downstream.call_args_list], ['image2'])
+
+    def test_non_image_is_rejected(self):
+        self.assertRejected(self.post_question(b'<?php echo "not an image"; ?>'), '지원하지 않는 파일 형식')
+
+    def test_handler_is_scoped_to_image_views_and_keeps_csrf(self):
+        request = RequestFactory().post('/admin/')
+        self.assertFalse(any(isinstance(handler, ImageUploadHandler) for handler in request.upload_handlers))
+
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.user)
+        self.assertEqual(self.post_question(b'\xff\xd8\xff', client=csrf_client).status_code, 403)
+
+
+# =======================================
+# 조건부 요청(ETag) 테스트
+# =======================================
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tester', password='pw-12345!')
+        self.question = Question.objects.create(
+            author=self.user, subject='제목', content='**내용**', create_date=timezone.now(),
+            image1='pybo/image1/a.jpg', image2='pybo/image2/b.jpg',
+        )
+        Answer.objects.create(author=self.user, question=self.question, content='답변', create_date=timezone.now())
+
+    def tearDown(self):
+        # 상세 페이지 조회로 쌓인 조회수를 테스트 DB가 남아 있을 때 반영
+        view_count_buffer.flush()
+
+    def assertRepeatViewIsNotModified(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first)
+
+        # 같은 ETag로 다시 요청하면 본문 없이 304 응답
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(len(second.content), 0)
+        self.assertGreater(len(first.content), 0)
+        return first['ETag']
+
+    def test_index_repeat_view(self):
+        self.assertRepeatViewIsNotModified(reverse('pybo:index'))
+
+    def test_cached_index_skips_etag_queries(self):
+        etag = self.client.get(reverse('pybo:index'))['ETag']
+        with self.assertNumQueries(0):  # 캐시된 페이지에 저장한 ETag 사용
+            cached = self.client.get(reverse('pybo:index'))
+            revalidated = self.client.get(reverse('pybo:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((cached.status_code, cached['ETag']), (200, etag))
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_detail_repeat_view(self):
+        self.assertRepeatViewIsNotModified(reverse('pybo:detail', args=[self.question.id]))
+
+    def test_detail_etag_changes_after_new_answer(self):
+        url = reverse('pybo:detail', args=[self.question.id])
+        etag = self.assertRepeatViewIsNotModified(url)
+        Answer.objects.create(author=self.user, question=self.question, content='새 답변', create_date=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '새 답변')
+
+    def test_etag_differs_per_user(self):
+        url = reverse('pybo:detail', args=[self.question.id])
+        anonymous_etag = self.client.get(url)['ETag']
+        self.client.login(username='tester', password='pw-12345!')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, 200)
+
+
+# =======================================
+# 미디어 파일 캐시 헤더 테스트
+# =======================================
+class MediaCacheHeaderTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'pybo'))
+        self.content = b'\xff\xd8\xff\xe0' + b'0' * 1024
+        self.digest = hashlib.sha256(self.content).hexdigest()
+        for name in (self.digest + '.jpg', 'photo.jpg'):
+            with open(os.path.join(self.media_root, 'pybo', name), 'wb') as f:
+                f.write(self.content)
+
+    def serve(self, path, **headers):
+        request = self.factory.get('/media/' + path, **headers)
+        return serve_media(request, path, document_root=self.media_root)
+
+    def test_content_addressed_file_is_immutable(self):
+        response = self.serve('pybo/{}.jpg'.format(self.digest))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"{}"'.format(self.digest))
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+        repeat = self.serve('pybo/{}.jpg'.format(self.digest), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertIn('immutable', repeat['Cache-Control'])
+
+    def test_regular_file_revalidates(self):
+        response = self.serve('pybo/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        repeat = self.serve('pybo/photo.jpg', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(len(repeat.content), 0)
+
+
+# =======================================
+# 콘텐츠 주소 저장소(중복 제거) 테스트
+# =======================================
+# 이전 파일 삭제는 트랜잭션 커밋 후에 실행되므로 TransactionTestCase를 사용
+class ContentAddressedStorageTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='tester', password='pw-12345!')
+
+    def create_question(self, image1, image2):
+        question = Question(author=self.user, subject='제목', content='내용', create_date=timezone.now())
+        question.image1.save('a.JPEG', ContentFile(image1), save=False)
+        question.image2.save('b.jpg', ContentFile(image2), save=False)
+        question.save()
+        return question
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_question(b'same-image', b'other-image')
+        second = self.create_question(b'same-image', b'same-image')
+
+        self.assertEqual(first.image1.name, second.image1.name)
+        self.assertEqual(second.image1.name, second.image2.name)
+        self.assertEqual(first.image1.name, 'pybo/images/{0:.2}/{0}.jpg'.format(hashlib.sha256(b'same-image').hexdigest()))
+        self.assertEqual(StoredFile.objects.get(name=first.image1.name).ref_count, 3)
+
+    def test_replacing_image_keeps_shared_file(self):
+        first = self.create_question(b'same-image', b'other-image')
+        second = self.create_question(b'same-image', b'third-image')
+        shared_name = first.image1.name
+
+        # 첫 번째 질문의 이미지만 교체
+        first.image1.save('c.jpg', ContentFile(b'new-image'), save=False)
+        first.save()
+        cleanup_queue.join()
+
+        self.assertTrue(content_addressed_storage.exists(shared_name))
+        self.assertEqual(StoredFile.objects.get(name=shared_name).ref_count, 1)
+
+        # 마지막 참조까지 교체하면 실제 파일도 삭제
+        second.image1.save('d.jpg', ContentFile(b'newer-image'), save=False)
+        second.save()
+        cleanup_queue.join()
+
+        self.assertFalse(content_addressed_storage.exists(shared_name))
+        self.assertFalse(StoredFile.objects.filter(name=shared_name).exists())
+
+
+    def test_deleting_question_releases_its_files(self):
+        first = self.create_question(b'same-image', b'other-image')
+        second = self.create_question(b'same-image', b'third-image')
+        Answer.objects.create(author=self.user, question=first, content='답변', create_date=timezone.now(),
+                              answer_image=first.image2.name)
+        StoredFile.objects.filter(name=first.image2.name).update(ref_count=2)  # 답변 이미지의 참조
+        shared_name, other_name = first.image1.name, first.image2.name
+
+        first.delete()  # 답변도 함께 삭제됨
+        cleanup_queue.join()
+
+        self.assertEqual(StoredFile.objects.get(name=shared_name).ref_count, 1)
+        self.assertTrue(content_addressed_storage.exists(shared_name))
+        self.assertFalse(StoredFile.objects.filter(name=other_name).exists())
+        self.assertFalse(content_addressed_storage.exists(other_name))
+
+        second.delete()
+        cleanup_queue.join()
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(content_addressed_storage.exists(shared_name))
+
+    def test_face_analysis_keeps_its_image_after_question_is_deleted(self):
+        question = self.create_question(b'analyzed-image', b'other-image')
+        name = question.image1.name
+        analysis = save_face_analysis(question.image1.path, 'cd' * 32, 'detectors=yolo|predictors=',
+                                      ([(1, 2, 3, 4)], 1, None, None), [], labeled=False)
+        self.assertEqual(analysis.image_name, name)
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 2)
+
+        question.delete()
+        cleanup_queue.join()
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 1)
+        self.assertTrue(content_addressed_storage.exists(name))  # 결과를 다시 그릴 수 있음
+
+        analysis.delete()
+        cleanup_queue.join()
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertFalse(content_addressed_storage.exists(name))
+
+    def test_save_racing_last_release_keeps_file(self):
+        name = content_addressed_storage.save('a.jpg', ContentFile(b'racy-image'))
+        acquire = content_addressed_storage.acquire
+
+        # 참조를 확인하기 직전에 다른 스레드가 마지막 참조를 해제한 경우: 파일을 새로 씀
+        def release_then_acquire(stored_name):
+            content_addressed_storage.delete(stored_name)
+            self.assertFalse(content_addressed_storage.exists(stored_name))
+            return acquire(stored_name)
+
+        with mock.patch.object(content_addressed_storage, 'acquire', side_effect=release_then_acquire):
+            self.assertEqual(content_addressed_storage.save('b.jpg', ContentFile(b'racy-image')), name)
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 1)
+        self.assertTrue(content_addressed_storage.exists(name))
+
+        # 참조를 추가한 직후에 마지막이던 참조가 해제된 경우: 새 참조가 남아 파일을 지우지 않음
+        def acquire_then_release(stored_name):
+            acquired = acquire(stored_name)
+            content_addressed_storage.delete(stored_name)
+            return acquired
+
+        with mock.patch.object(content_addressed_storage, 'acquire', side_effect=acquire_then_release):
+            content_addressed_storage.save('c.jpg', ContentFile(b'racy-image'))
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 1)
+        with content_addressed_storage.open(name) as f:
+            self.assertEqual(f.read(), b'racy-image')
+
+
+# =======================================
+# AI 결과 이미지 이름/저장 테스트
+# =======================================
+class ResultImageNameTest(SimpleTestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def write(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def result_name(self, image_path, detectors):
+        from .ai_system.ai_system import ForDjango, django_config
+        config = dict(django_config(), selected_detectors=detectors, selected_predictors=['fairface'])
+        return ForDjango(config, None, None).result_name(image_path)
+
+    def test_name_depends_only_on_content_and_config(self):
+        first = self.write('a.jpg', b'image')
+        renamed = self.write('b.png', b'image')
+
+        self.assertEqual(self.result_name(first, ['yolo', 'dlib']), self.result_name(renamed, ['dlib', 'yolo']))
+        self.assertNotEqual(self.result_name(first, ['yolo']), self.result_name(first, ['dlib']))
+        self.assertNotEqual(self.result_name(first, ['yolo']), self.result_name(self.write('c.jpg', b'other'), ['yolo']))
+
+    def test_failed_write_keeps_previous_result(self):
+        from .ai_system.ai_system import write_bytes_atomic
+        output_path = os.path.join(self.folder, 'results', 'r.jpg')
+        write_bytes_atomic(output_path, b'first')
+
+        with mock.patch('pybo.ai_system.ai_system.os.replace', side_effect=OSError), self.assertRaises(OSError):
+            write_bytes_atomic(output_path, b'second')
+
+        self.assertEqual(os.listdir(os.path.dirname(output_path)), ['r.jpg'])  # 임시 파일이 남지 않음
+        with open(output_path, 'rb') as f:
+            self.assertEqual(f.read(), b'first')
+
+
+# =======================================
+# 결과 이미지 인코딩 테스트
+# =======================================
+class ResultEncoderTest(SimpleTestCase):
+    def setUp(self):
+        self.image = np.random.default_rng(0).integers(0, 256, (32, 48, 3), dtype=np.uint8)
+
+    def test_format_settings_reach_imencode(self):
+        import cv2
+        cases = [
+            ({'format': 'jpeg', 'jpeg_quality': 70, 'jpeg_progressive': True},
+             '.jpg', [cv2.IMWRITE_JPEG_QUALITY, 70, cv2.IMWRITE_JPEG_PROGRESSIVE, 1]),
+            ({'format': 'webp', 'webp_quality': 60}, '.webp', [cv2.IMWRITE_WEBP_QUALITY, 60]),
+            ({'format': 'png', 'png_compression': 9}, '.png', [cv2.IMWRITE_PNG_COMPRESSION, 9]),
+        ]
+        for encoding, ext, params in cases:
+            with self.subTest(format=encoding['format']), \
+                    mock.patch('pybo.ai_system.result_encoder.cv2.imencode', wraps=cv2.imencode) as imencode:
+                encoded = ResultEncoder({'result_encoding': encoding}).encode(self.image)
+
+                self.assertEqual(imencode.call_args.args[0], ext)
+                self.assertEqual(imencode.call_args.args[2], params)
+                self.assertEqual(encoded.ext, ext)
+                self.assertEqual(cv2.imdecode(np.frombuffer(encoded.data, np.uint8), cv2.IMREAD_COLOR).shape, self.image.shape)
+
+        progressive = ResultEncoder({'result_encoding': {'jpeg_progressive': True}}).encode(self.image).data
+        baseline = ResultEncoder({'result_encoding': {'jpeg_progressive': False}}).encode(self.image).data
+        self.assertIn(b'\xff\xc2', progressive)  # SOF2 (점진적 JPEG)
+        self.assertNotIn(b'\xff\xc2', baseline)
+        with self.assertRaises(ValueError):
+            ResultEncoder({'result_encoding': {'format': 'gif'}})
+
+    def test_encoding_settings_change_fingerprint_and_result_name(self):
+        from .ai_system.ai_system import ForDjango, django_config
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        image_path = os.path.join(folder, 'a.jpg')
+        with open(image_path, 'wb') as f:
+            f.write(b'image')
+
+        def system(encoding):
+            return ForDjango(dict(django_config(), selected_detectors=['yolo'], result_encoding=encoding), None, None)
+
+        default = system(None)
+        self.assertEqual(system({'jpeg_quality': 85}).result_name(image_path), default.result_name(image_path))
+        for encoding in ({'jpeg_quality': 70}, {'jpeg_progressive': False}, {'format': 'webp'}):
+            with self.subTest(encoding=encoding):
+                changed = system(encoding)
+                self.assertNotEqual(changed.config_fingerprint(), default.config_fingerprint())
+                self.assertNotEqual(changed.result_name(image_path), default.result_name(image_path))
+        self.assertTrue(system({'format': 'png'}).result_name(image_path).endswith('.png'))
+
+    def test_background_save_writes_same_bytes_and_reports_errors(self):
+        written = {}
+
+        def writer(path, data):
+            written[path] = data
+
+        synchronous = ResultEncoder({'result_encoding': {'background': False}}).save(self.image, 'sync.jpg', writer)
+        future = ResultEncoder({'result_encoding': {'background': True}}).save(self.image, 'background.jpg', writer)
+
+        self.assertEqual(future.result(timeout=10).data, synchronous.data)
+        self.assertEqual(written['background.jpg'], written['sync.jpg'])
+
+        def failing_writer(path, data):
+            raise OSError('disk full')
+
+        with self.assertLogs(level='ERROR') as logs:
+            future = ResultEncoder({'result_encoding': {'background': True}}).save(self.image, 'x.jpg', failing_writer)
+            with self.assertRaises(OSError):
+                future.result(timeout=10)
+            for _ in range(100):  # 완료 콜백은 결과를 기다린 스레드와 별도로 실행될 수 있음
+                if logs.records:
+                    break
+                time.sleep(0.01)
+        self.assertIn('disk full', logs.output[0])
+
+
+# =======================================
+# 분석 이미지 메타데이터(EXIF) 테스트
+# =======================================
+class ImageMetadataTest(SimpleTestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.pixels = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+
+    def source(self, name, image_format):
+        from PIL import Image
+        path = os.path.join(self.folder, name)
+        Image.fromarray(self.pixels).save(path, image_format)
+        with open(path, 'rb') as f:
+            return path, f.read()
+
+    def copy(self, image_path, image_rgb=None):
+        from .ai_system.ai_system import copy_image_and_add_metadata
+        with open(copy_image_and_add_metadata(image_path, os.path.join(self.folder, 'out'), image_rgb), 'rb') as f:
+            return f.read()
+
+    def test_jpeg_gets_exif_without_reencoding(self):
+        import piexif
+        path, source = self.source('a.jpg', 'JPEG')
+        with mock.patch('pybo.ai_system.ai_system.cv2.imdecode') as imdecode:
+            copied = self.copy(path, image_rgb=self.pixels)  # 탐지에 사용한 배열로 썸네일을 만듦
+        imdecode.assert_not_called()
+
+        # 양자화 테이블부터 끝까지(압축된 픽셀 데이터)는 원본 바이트와 같음 (APP0 자리에 EXIF 세그먼트가 들어감)
+        quantization = source.index(b'\xff\xdb')
+        self.assertTrue(copied.endswith(source[quantization:]))
+        exif = piexif.load(copied)
+        self.assertEqual(exif['0th'][piexif.ImageIFD.Artist], b'0!code')
+        self.assertTrue(exif['thumbnail'].startswith(b'\xff\xd8\xff'))
+
+    def test_png_is_saved_once_with_exif(self):
+        from PIL import Image
+        path, _ = self.source('a.png', 'PNG')
+        copied = self.copy(path)  # 배열이 없으면 읽어 둔 바이트를 디코딩해 썸네일을 만듦
+
+        with Image.open(io.BytesIO(copied)) as image:
+            self.assertEqual(image.format, 'PNG')
+            self.assertIn('exif', image.info)
+            self.assertTrue((np.asarray(image.convert('RGB')) == self.pixels).all())  # 무손실 형식은 픽셀이 그대로
+
+
+# =======================================
+# 얼굴 영역 자르기 테스트
+# =======================================
+class FaceCropTest(SimpleTestCase):
+    def test_clamp_face_box_at_edges(self):
+        from .ai_system.ai_system import clamp_face_box
+        self.assertEqual(clamp_face_box((-5, -3, 20, 30), 100, 80), (0, 0, 20, 30))  # MTCNN의 음수 좌표
+        self.assertEqual(clamp_face_box((90, 70, 120, 95), 100, 80), (90, 70, 100, 80))
+        self.assertEqual(clamp_face_box((10, 10, 30, 30), 100, 80, margin=0.5), (0, 0, 40, 40))
+        self.assertEqual(clamp_face_box((150, 10, 180, 30), 100, 80), (100, 10, 100, 30))  # 완전히 밖이면 폭 0
+
+    def test_crops_are_views_and_rejected_faces_are_counted(self):
+        from .ai_system.ai_system import FACE_MIN_SIZE, extract_face_crops
+        image = np.zeros((80, 100, 3), dtype=np.uint8)
+        faces = [(-5, -3, 20, 30), (150, 10, 180, 30), (10, 10, 10 + FACE_MIN_SIZE - 1, 40), (40, 40, 60, 60)]
+
+        boxes, crops, rejected = extract_face_crops(image, faces, margin=0.25)
+
+        self.assertEqual(boxes, [(0, 0, 20, 30), (40, 40, 60, 60)])  # 그리기용 박스에는 margin을 적용하지 않음
+        self.assertEqual(rejected, 2)  # 이미지 밖, min_size 미만
+        self.assertEqual([crop.shape for crop in crops], [(38, 26, 3), (30, 30, 3)])
+        self.assertTrue(all(np.shares_memory(crop, image) for crop in crops))
+
+
+# =======================================
+# 타일 탐지 테스트
+# =======================================
+class BrightSquareDetector:
+    """ 밝은 정사각형(얼굴 대신)의 좌표를 반환하는 탐지기 (타일 밖으로 잘린 정사각형은 탐지하지 않음) """
+
+    def __init__(self):
+        self.tile_shapes = []
+
+    def predict_scored(self, image):
+        import cv2
+        self.tile_shapes.append(image.shape[:2])
+        _, _, stats, _ = cv2.connectedComponentsWithStats((image[..., 0] > 0).astype(np.uint8))
+        faces = [(x, y, x + w, y + h) for x, y, w, h, _ in stats[1:] if w == h]
+        return faces, [1.0] * len(faces)
+
+
+class TiledDetectionTest(SimpleTestCase):
+    def test_tiles_overlap_and_end_at_edges(self):
+        from .ai_system.ai_system import iter_tiles
+        tiles = list(iter_tiles(250, 330, 100, 30))
+
+        self.assertEqual(sorted({x0 for x0, _, _, _ in tiles}), [0, 70, 140, 210, 230])  # 마지막 열은 가장자리에 맞춤
+        self.assertEqual(sorted({y0 for _, y0, _, _ in tiles}), [0, 70, 140, 150])
+        self.assertTrue(all(x1 - x0 == 100 and y1 - y0 == 100 for x0, y0, x1, y1 in tiles))
+        self.assertEqual(list(iter_tiles(50, 80, 100, 30)), [(0, 0, 80, 50)])  # 타일보다 작은 이미지
+
+    def test_face_on_seam_is_found_once_in_image_coordinates(self):
+        from .ai_system.ai_system import FaceDetectors
+        image = np.zeros((150, 300, 3), dtype=np.uint8)
+        image[10:30, 75:95] = 255  # 첫 두 타일의 겹치는 영역 (x 70~100)
+        image[120:140, 250:270] = 255  # 마지막 타일에만 있는 얼굴
+        detector = BrightSquareDetector()
+
+        faces = FaceDetectors(detector, tile_size=100, tile_overlap=30).manage_prediction(image)
+
+        self.assertEqual(sorted(map(tuple, faces)), [(75, 10, 95, 30), (250, 120, 270, 140)])
+        self.assertTrue(all(shape[0] <= 100 and shape[1] <= 100 for shape in detector.tile_shapes))
+
+
+# =======================================
+# 탐지기 캐스케이드 테스트
+# =======================================
+class FixedDetector:
+    """ 정해진 얼굴과 신뢰도를 반환하고 호출 수를 세는 탐지기 """
+
+    def __init__(self, cost, faces, scores):
+        self.COST = cost
+        self.faces = faces
+        self.scores = scores
+        self.calls = 0
+
+    def predict_scored(self, image):
+        self.calls += 1
+        return self.faces, self.scores
+
+
+class CascadeTest(SimpleTestCase):
+    def setUp(self):
+        self.stats = CascadeStats()
+        patcher = mock.patch('pybo.ai_system.ai_system.cascade_stats', self.stats)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.image = np.zeros((100, 100, 3), dtype=np.uint8)
+
+    def test_cascade_stops_after_first_confident_detector(self):
+        from .ai_system.ai_system import FaceDetectors
+        fast = FixedDetector(1, [(10, 10, 60, 60)], [0.95])
+        slow = FixedDetector(3, [(12, 12, 62, 62)], [0.99])
+
+        faces = FaceDetectors(slow, fast, strategy='cascade').manage_prediction(self.image)
+
+        self.assertEqual(list(map(tuple, faces)), [(10, 10, 60, 60)])
+        self.assertEqual((fast.calls, slow.calls), (1, 0))
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot['runs'], {'FixedDetector': 1})
+        self.assertEqual(snapshot['skips'], {'FixedDetector': 1})
+        self.assertEqual(snapshot['reasons'], {})
+
+    def test_low_confidence_runs_next_detector_and_is_recorded(self):
+        from .ai_system.ai_system import FaceDetectors
+        fast = FixedDetector(1, [(10, 10, 60, 60)], [0.3])
+        slow = FixedDetector(3, [(10, 10, 60, 60)], [0.99])
+
+        FaceDetectors(fast, slow, strategy='cascade').manage_prediction(self.image)
+
+        self.assertEqual((fast.calls, slow.calls), (1, 1))
+        self.assertEqual(self.stats.snapshot()['escalations'], {'FixedDetector': {'low_confidence': 1}})
+
+    def test_policy_threshold_can_be_overridden_per_detector(self):
+        policy = CascadePolicy(low_confidence={'FixedDetector': 0.2})
+        detector = FixedDetector(1, [(10, 10, 60, 60)], [0.3])
+
+        self.assertEqual(policy.confidence_threshold(detector), 0.2)
+        self.assertIsNone(policy.escalation_reason(detector, detector.faces, detector.scores, []))
+        self.assertEqual(CascadePolicy().confidence_threshold(detector), 0.5)
+
+    def test_tuned_threshold_changes_analysis_fingerprint(self):
+        from .ai_system.ai_system import ForDjango, django_config
+
+        def fingerprint(cascade_policy):
+            config = dict(django_config(), selected_detectors=['dlib', 'yolo'], detection_strategy='cascade',
+                          cascade_policy=cascade_policy)
+            return ForDjango(config, None, None).analysis_fingerprint()
+
+        default = fingerprint({'min_confidence': None, 'low_confidence': {}})
+        self.assertEqual(fingerprint({'low_confidence': {'DlibFaceDetector': 0.5}}), default)  # 기본값과 같은 기준
+        self.assertNotEqual(fingerprint({'low_confidence': {'DlibFaceDetector': 0.3}}), default)
+        self.assertLessEqual(len(default), FaceAnalysis._meta.get_field('fingerprint').max_length)
+
+
+class CascadeStatusTest(TestCase):
+    @override_settings(AI_INFERENCE_SERVER={'socket': None})
+    def test_ai_status_reports_cascade_stats(self):
+        stats = CascadeStats()
+        stats.record([FixedDetector(1, [], [])], [FixedDetector(3, [], [])], [])
+        User.objects.create_user(username='staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+
+        with mock.patch('pybo.ai_system.cascade.cascade_stats', stats):
+            response = self.client.get(reverse('pybo:ai_status'))
+
+        self.assertEqual(response.json()['cascade']['skips'], {'FixedDetector': 1})
+
+
+# =======================================
+# AI 런타임 스레드 설정 테스트
+# =======================================
+class RuntimeThreadsTest(SimpleTestCase):
+    def setUp(self):
+        import cv2
+        import torch
+        self.torch = torch
+        # 스레드 설정은 프로세스 전역이므로 테스트 후 되돌림
+        self.addCleanup(torch.set_num_threads, torch.get_num_threads())
+        self.addCleanup(cv2.setNumThreads, cv2.getNumThreads())
+        for patcher in (mock.patch.object(runtime, '_applied', None), mock.patch.dict(os.environ)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_torch_imported_after_configure_gets_thread_count(self):
+        target = 1 if self.torch.get_num_threads() > 1 else 2
+        with mock.patch.dict(sys.modules):
+            del sys.modules['torch']  # 모델을 만들기 전이라 torch가 아직 import되지 않은 상태
+            applied = runtime.configure_runtime(target)
+        self.assertNotIn('torch', applied)
+
+        runtime.apply_torch_threads()
+
+        self.assertEqual(self.torch.get_num_threads(), target)
+        self.assertEqual(applied['torch'], target)
+
+    def test_apply_before_configure_does_nothing(self):
+        threads = self.torch.get_num_threads()
+
+        self.assertIsNone(runtime.apply_torch_threads())
+        self.assertEqual(self.torch.get_num_threads(), threads)
+
+
+class ModelRegistryTest(SimpleTestCase):
+    def test_slow_model_blocks_only_callers_of_the_same_model(self):
+        registry = ModelRegistry()
+        registry.runtime = {'threads': 1}  # 런타임 스레드 설정은 적용하지 않음
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_factory():
+            calls.append('slow')
+            started.set()
+            release.wait(10)
+            return object()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(registry.load, 'slow', slow_factory)
+            self.assertTrue(started.wait(10))
+            second = executor.submit(registry.load, 'slow', slow_factory)  # 같은 모델은 생성이 끝나기를 기다림
+
+            fast = registry.load('fast', object)  # 다른 모델은 막히지 않음
+            self.assertIs(registry.load('fast', object), fast)
+            self.assertFalse(first.done() or second.done())
+            release.set()
+
+            self.assertIs(first.result(timeout=10), second.result(timeout=10))
+        self.assertEqual(calls, ['slow'])
+
+
+# =======================================
+# AI 라이브러리 지연 import 테스트
+# =======================================
+class LazyImportTest(SimpleTestCase):
+    HEAVY_MODULES = ('torch', 'torchvision', 'cv2', 'dlib', 'ultralytics', 'tensorflow', 'mtcnn', 'face_recognition')
+
+    def loaded_after_import(self, module):
+        """ 새 프로세스에서 module을 import한 뒤 불러온 무거운 라이브러리 목록 (테스트 프로세스는 이미 불러왔을 수 있음) """
+        code = (
+            "import sys, django; django.setup(); import " + module + "; "
+            "print(' '.join(name for name in " + repr(self.HEAVY_MODULES) + " if name in sys.modules))"
+        )
+        env = dict(os.environ, SECRET_KEY=settings.SECRET_KEY)
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.split()
+
+    def test_urlconf_does_not_load_ai_libraries(self):
+        self.assertEqual(self.loaded_after_import('config.urls'), [])
+
+    def test_ai_system_loads_only_cv2(self):
+        self.assertEqual(self.loaded_after_import('pybo.ai_system.ai_system'), ['cv2'])
+
+
+# =======================================
+# 추론 서버 통신 규약 테스트
+# =======================================
+class InferenceProtocolTest(SimpleTestCase):
+    def test_analysis_round_trip(self):
+        predictions = [(10, 20, 30, 40, '아시아', '남성', (0, 255, 0), '20대')]
+        race_cnt = {'백인': 0, '흑인': 0, '아시아': 1, '중동': 0}
+        meta, payload = protocol.encode_analysis(predictions, 1, race_cnt, 1, labeled=True)
+
+        sender, receiver = socket.socketpair()
+        self.addCleanup(sender.close)
+        self.addCleanup(receiver.close)
+        protocol.send_message(sender, protocol.RESULT, meta, payload)
+        kind, received_meta, received_payload = protocol.recv_message(receiver)
+
+        self.assertEqual(kind, protocol.RESULT)
+        self.assertEqual(protocol.decode_analysis(received_meta, received_payload), (predictions, 1, race_cnt, 1))
+
+    def test_client_reports_unavailable_server(self):
+        client = InferenceClient(os.path.join(tempfile.gettempdir(), 'pybo-missing-inference.sock'))
+        with self.assertRaises(InferenceUnavailable):
+            client.analyze(b'image', {})
+
+
+# =======================================
+# 마이크로 배치 스케줄러 테스트
+# =======================================
+class MicroBatcherTest(SimpleTestCase):
+    def test_concurrent_requests_share_one_batch(self):
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(run_batch, max_batch=6, max_wait_ms=200)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(batcher.submit, [[1, 2], [3], [4, 5, 6]]))
+
+        # 요청별 결과는 입력 순서대로 나누어 돌려받고, 세 요청은 한 번의 배치로 실행됨
+        self.assertEqual(results, [[10, 20], [30], [40, 50, 60]])
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batcher.stats.snapshot()['mean_fill_ratio'], 1.0)
+
+
+# =======================================
+# 공유 메모리 프레임 링 버퍼 테스트
+# =======================================
+class FrameRingTest(SimpleTestCase):
+    def test_ring_reuses_space_in_allocation_order(self):
+        ring = FrameRing(1024)
+        self.addCleanup(ring.close)
+        first, second, third = (ring.allocate(300) for _ in range(3))
+
+        # 가장 오래된 프레임이 해제되기 전에는 다른 프레임을 해제해도 공간이 생기지 않음
+        ring.release(second)
+        with self.assertRaises(TimeoutError):
+            ring.allocate(200, timeout=0)
+        ring.release(first)
+        self.assertEqual(ring.allocate(600, timeout=0), 0)
+
+    def test_reader_sees_frame_without_copy(self):
+        ring = FrameRing(1024)
+        self.addCleanup(ring.close)
+        reader = FrameReader()
+        self.addCleanup(reader.close)
+        frame = np.arange(48, dtype=np.uint8).reshape(4, 4, 3)
+        handle = ring.put(frame)
+
+        shared = reader.attach(FrameHandle.from_meta(handle.to_meta()))
+        self.assertTrue((shared == frame).all())
+        self.assertFalse(shared.flags.writeable)
+        ring.view(handle)[0, 0, 0] = 255  # 같은 메모리를 보므로 쓰는 쪽의 변경이 그대로 보임
+        self.assertEqual(shared[0, 0, 0], 255)
+        del shared
+
+
+# =======================================
+# AI 분석 작업 스케줄러 테스트
+# =======================================
+class FairQueueTest(SimpleTestCase):
+    def test_classes_share_by_weight_and_users_within_class(self):
+        queue = FairQueue({'interactive': 4, 'bulk': 1})
+        for i in range(8):
+            queue.put(('bulk', i), user='bulk-user', job_class='bulk')
+        for i in range(4):
+            queue.put(('a', i), user='a')
+            queue.put(('b', i), user='b')
+
+        order = [queue.get_nowait() for _ in range(10)]
+        # 먼저 들어온 대량 작업보다 대화형 작업이 가중치만큼 먼저 실행되고, 두 사용자는 번갈아 실행됨
+        self.assertEqual(sum(1 for name, _ in order if name == 'bulk'), 2)
+        interactive = [name for name, _ in order if name != 'bulk']
+        self.assertEqual(interactive, ['a', 'b'] * 4)
+
+    def test_rejects_over_depth_and_user_quota(self):
+        queue = FairQueue(max_depth=3, user_quota=2)
+        queue.put(1, user='a')
+        queue.put(2, user='a')
+        with self.assertRaises(QuotaExceeded):
+            queue.put(3, user='a')
+        queue.put(3, user='b')
+        with self.assertRaises(SchedulerBusy) as busy:
+            queue.put(4, user='c')
+        self.assertGreaterEqual(busy.exception.retry_after, 1)
+        self.assertEqual(queue.snapshot()['rejected'], {'interactive': 2})
+
+
+class QuestionCreateAdmissionTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(User.objects.create_user('tester', password='pw-12345!'))
+
+    def post_question(self, scheduler, controller=None):
+        image = b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+        data = {
+            'subject': '제목', 'content': '내용', 'detectors': ['dlib', 'yolo'], 'predictors': ['fairface'],
+            'image1': SimpleUploadedFile('a.gif', image, 'image/gif'),
+            'image2': SimpleUploadedFile('b.gif', image, 'image/gif'),
+        }
+        with mock.patch('pybo.question_analysis.analysis_scheduler', scheduler), \
+                mock.patch('pybo.question_analysis.admission_controller', controller or AdmissionController()):
+            return self.client.post(reverse('pybo:question_create'), data)
+
+    def test_user_over_quota_gets_429_without_saving(self):
+        response = self.post_question(AnalysisScheduler(user_quota=0))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Question.objects.exists())
+
+    def test_saturated_queue_saves_question_and_defers_analysis(self):
+        response = self.post_question(AnalysisScheduler(max_depth=0))
+
+        self.assertEqual(response.status_code, 200)
+        answer = Answer.objects.get(question=Question.objects.get())
+        self.assertIn('분석을 미뤘습니다', answer.content)
+        self.assertFalse(answer.answer_image)
+
+    def test_controller_degrades_by_in_flight_cost(self):
+        controller = AdmissionController(budget=6)
+        with controller.admit(None, ['dlib', 'yolo'], ['fairface']) as first:
+            second = controller.admit(None, ['dlib', 'yolo'], ['fairface'])
+            third = controller.admit(None, ['dlib', 'yolo'], ['fairface'])
+            fourth = controller.admit(None, ['dlib', 'yolo'], ['fairface'])
+
+        self.assertEqual((first.mode, second.mode, third.mode, fourth.mode),
+                         ('full', 'skip_predictors', 'deferred', 'deferred'))
+        self.assertEqual(second.detectors, ['yolo'])
+        second.release()
+        self.assertEqual(controller.in_flight, 0)
+
+
+# =======================================
+# 구조화된 분석 결과 저장 테스트
+# =======================================
+class FaceAnalysisStoreTest(TestCase):
+    def test_round_trip_restores_predictions_for_rerendering(self):
+        predictions = [(10, 20, 30, 40, '아시아', '남성', (0, 255, 0), '20대'), (50, 60, 70, 80, '백인', '여성', (255, 0, 0), '30대')]
+        race_cnt = {'백인': 1, '흑인': 0, '아시아': 1, '중동': 0}
+        embeddings = np.random.default_rng(0).random((2, 128), dtype=np.float32)
+        details = [{'age': '20대', 'embedding': embeddings[0], 'distance': 0.42},
+                   {'age': '30대', 'embedding': embeddings[1], 'distance': None}]
+
+        with self.assertNumQueries(4):  # 분석 INSERT 1번 + 얼굴 bulk_create 1번 (+ 세이브포인트 2번)
+            save_face_analysis('/tmp/a.jpg', 'ab' * 32, 'detectors=yolo|predictors=fairface',
+                               (predictions, 2, race_cnt, 1), details, labeled=True, timings={'total_ms': 12.5})
+
+        stored = load_face_analysis('ab' * 32, 'detectors=yolo|predictors=fairface')
+        self.assertEqual(stored_predictions(stored), (predictions, 2, race_cnt, 1))
+        self.assertEqual(stored.boxes.dtype, np.dtype('<i4'))
+        face = DetectedFace.objects.get(index=0)
+        self.assertEqual(face.box, (10, 20, 30, 40))
+        self.assertTrue(np.array_equal(face.embedding, embeddings[0]))
+        self.assertEqual(face.match_distance, 0.42)
+        self.assertIsNone(load_face_analysis('ab' * 32, 'detectors=dlib|predictors='))
+
+
+    def test_embeddings_are_reused_for_nearby_boxes(self):
+        embedding = np.arange(128, dtype=np.float32)
+        save_face_embeddings('ef' * 32, [(100, 100, 180, 180), (300, 40, 340, 80)], [embedding, None])
+
+        with self.assertNumQueries(1):  # 이미지당 한 번 조회
+            stored = load_face_embeddings('ef' * 32, [(103, 98, 184, 181), (300, 40, 340, 80), (160, 100, 240, 180)])
+        self.assertTrue(np.array_equal(stored[0], embedding))  # 탐지기가 달라 몇 픽셀 달라진 박스
+        self.assertEqual(stored[1:], [None, None])  # 인코딩이 없던 얼굴, 다른 얼굴
+        self.assertEqual(load_face_embeddings('ef' * 32, [(100, 100, 180, 180)], quantum=16), [None])
+
+# =======================================
+# 결과 이미지 요청 시 렌더링 테스트
+# =======================================
+class AnalysisImageTest(TestCase):
+    def test_cache_is_bounded_by_bytes(self):
+        image_cache = RenderedImageCache(max_bytes=10)
+        image_cache.get_or_render('a', lambda: ('image/jpeg', b'1234'))
+        image_cache.get_or_render('b', lambda: ('image/jpeg', b'1234'))
+        image_cache.get_or_render('a', lambda: self.fail("캐시된 이미지를 다시 그림"))
+        image_cache.get_or_render('c', lambda: ('image/jpeg', b'1234'))  # 가장 오래 사용하지 않은 b를 버림
+        self.assertEqual(list(image_cache._entries), ['a', 'c'])
+        self.assertEqual(image_cache.snapshot()['bytes'], 8)
+        image_cache.get_or_render('d', lambda: ('image/jpeg', b'x' * 11))  # 한도보다 큰 이미지는 보관하지 않음
+        self.assertEqual(list(image_cache._entries), ['a', 'c'])
+
+    def test_renders_stored_analysis_once_and_revalidates(self):
+        face_analysis = save_face_analysis('/tmp/a.jpg', 'cd' * 32, 'detectors=yolo|predictors=',
+                                           ([(1, 2, 3, 4)], '1', None, None), [], labeled=False)
+        url = reverse('pybo:analysis_image', args=[face_analysis.id])
+        image = np.zeros((8, 8, 3), dtype=np.uint8)
+        with mock.patch('pybo.views.ai_views.rendered_image_cache', RenderedImageCache(1024 * 1024)), \
+                mock.patch('pybo.ai_system.ai_system.ForDjango.render_analysis', return_value=image) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], 'image/jpeg')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(render.call_count, 1)  # 두 번째 요청은 캐시에서 응답
+        self.assertEqual(revalidated.status_code, 304)
+
+
+# =======================================
+# 얼굴 검색 테스트
+# =======================================
+class FaceSearchTest(TestCase):
+    def test_ivf_index_matches_exhaustive_search_after_training(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(600, 128)).astype(np.float32)
+        index = IVFIndex(nprobe=4, min_train=100)
+        for start in range(0, 600, 50):  # 조금씩 추가 (100, 400개에서 다시 학습)
+            index.add(np.arange(start, start + 50), vectors[start:start + 50])
+        self.assertEqual(index.snapshot()['trained_size'], 400)
+
+        query = vectors[123] + 0.01
+        self.assertEqual(index.search(query, k=1, nprobe=index.nlist)[0][0], 123)
+        self.assertEqual(index.search(query, k=1)[0][0], 123)  # 질의와 가까운 목록만 비교해도 찾음
+        self.assertEqual(index.search(query, k=5, max_distance=0.5), index.search(query, k=1))
+
+    def test_similar_questions_picks_up_new_faces_incrementally(self):
+        user = User.objects.create_user(username='searcher', password='pw')
+        person = np.full(128, 0.1, dtype=np.float32)
+        search_index = FaceSearchIndex(min_train=1000)
+
+        def upload(digest, embedding):
+            name = 'pybo/images/{}/{}.jpg'.format(digest[:2], digest)
+            FaceAnalysis.objects.create(image_sha256=digest, fingerprint='detectors=yolo|predictors=fairface',
+                                        image_name=name, boxes=[(0, 0, 10, 10)], labeled=True, face_cnt=1)
+            save_face_embeddings(digest, [(0, 0, 10, 10)], [embedding])
+            return Question.objects.create(author=user, subject=digest[:4], content='내용', create_date=timezone.now(),
+                                           image1=name, image2=name)
+
+        upload('aa' * 32, person)
+        first = upload('bb' * 32, person + 0.01)
+        upload('cc' * 32, -person)  # 다른 사람
+        self.assertEqual([q for q, _ in search_index.similar_questions(person, exclude_sha256='aa' * 32)], [first])
+
+        second = upload('dd' * 32, person + 0.005)  # 인덱스를 만든 뒤 분석한 업로드
+        self.assertEqual([q for q, _ in search_index.similar_questions(person, exclude_sha256='aa' * 32)], [second, first])
+        self.assertEqual(search_index.snapshot()['size'], 4)
+
+    def test_detection_only_analysis_stores_embeddings_for_search(self):
+        from .ai_system.ai_system import ForDjango, django_config
+        config = dict(django_config(), selected_detectors=['yolo'], selected_predictors=[])
+        system = ForDjango(config, None, None)
+        image = np.zeros((100, 100, 3), dtype=np.uint8)
+        faces = [(10, 10, 50, 50), (-20, 60, 40, 99), (90, 90, 95, 95)]  # 이미지 밖으로 나간 얼굴, 너무 작은 얼굴
+        embedding = np.full(128, 0.2)
+
+        with mock.patch.object(ForDjango, '_face_encoding', return_value=embedding) as encode:
+            details = system.encode_faces(image, faces, 'ee' * 32)
+            system.encode_faces(image, faces, 'ee' * 32)  # 같은 이미지를 다시 분석하면 저장된 인코딩을 재사용
+
+        self.assertEqual(encode.call_count, 2)
+        self.assertEqual([call.args[1] for call in encode.call_args_list], [(10, 10, 50, 50), (0, 60, 40, 99)])
+        self.assertEqual(FaceEmbedding.objects.filter(image_sha256='ee' * 32).count(), 2)
+        self.assertEqual([detail['embedding'] is not None for detail in details], [True, True, False])
+
+        # 추론 서버를 거쳐도 인코딩하지 못한 얼굴의 자리가 유지됨
+        meta, payload = protocol.encode_analysis(faces, '3', None, None, labeled=False, details=details)
+        received = protocol.decode_face_details(json.loads(json.dumps(meta)), payload)
+        self.assertEqual([detail['embedding'] is not None for detail in received], [True, True, False])
+
+        face_analysis = save_face_analysis('/tmp/a.jpg', 'ee' * 32, system.analysis_fingerprint(),
+                                           (faces, '3', None, None), received, labeled=False)
+        stored = list(face_analysis.faces.order_by('index'))
+        self.assertTrue(np.allclose(stored[0].embedding, embedding))
+        self.assertIsNone(stored[2].embedding)
+
+    def test_detection_without_search_computes_no_embeddings(self):
+        from .ai_system.ai_system import ForDjango, django_config
+        config = dict(django_config(), face_search=None)
+        with mock.patch.object(ForDjango, '_face_encoding') as encode:
+            details = ForDjango(config, None, None).encode_faces(np.zeros((100, 100, 3), dtype=np.uint8), [(10, 10, 50, 50)])
+        self.assertEqual(details, [])
+        encode.assert_not_called()
+
+    def test_face_search_requires_login(self):
+        face_analysis = save_face_analysis('/tmp/a.jpg', 'ee' * 32, 'detectors=yolo|predictors=',
+                                           ([(1, 2, 3, 4)], '1', None, None), [], labeled=False)
+        url = reverse('pybo:face_search', args=[face_analysis.id])
+
+        response = self.client.get(url, {'x': 0.5, 'y': 0.5})
+
+        self.assertRedirects(response, reverse('common:login') + '?next=' + url + '%3Fx%3D0.5%26y%3D0.5',
+                             fetch_redirect_response=False)
+
+
+# =======================================
+# 비슷한 이미지(지각 해시) 테스트
+# =======================================
+class NearDuplicateImageTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('tester', password='pw-12345!')
+        self.client.force_login(self.user)
+
+    @staticmethod
+    def jpeg(seed, size=(400, 300), quality=95):
+        from PIL import Image
+        pattern = np.random.default_rng(seed).integers(0, 256, (6, 8, 3), dtype=np.uint8)
+        image = Image.fromarray(pattern).resize((400, 300), Image.BICUBIC).resize(size, Image.BILINEAR)
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=quality)
+        buffer.seek(0)
+        return buffer
+
+    def post_question(self, image_file, **data):
+        image = image_file.getvalue()
+        data.update({'subject': '제목', 'content': '내용',
+                     'image1': SimpleUploadedFile('a.jpg', image, 'image/jpeg'),
+                     'image2': SimpleUploadedFile('b.jpg', image, 'image/jpeg')})
+        # 재사용할 분석 결과가 없으면 할당량 초과(429)로 응답하는 스케줄러
+        with mock.patch('pybo.question_analysis.analysis_scheduler', AnalysisScheduler(user_quota=0)):
+            return self.client.post(reverse('pybo:question_create'), data)
+
+    def test_resized_recompressed_copy_is_found_through_band_index(self):
+        original = dhash(self.jpeg(1))
+        self.assertLessEqual(hamming(original, dhash(self.jpeg(1, size=(200, 150), quality=60))), 6)
+        self.assertGreater(hamming(original, dhash(self.jpeg(2))), 6)
+
+        question = Question.objects.create(author=self.user, subject='원본', content='내용', create_date=timezone.now(),
+                                           image1='pybo/images/aa/a.jpg', image2='pybo/images/aa/a.jpg')
+        save_image_hash(question, original)
+        spread = original ^ (1 << 3) ^ (1 << 20) ^ (1 << 21) ^ (1 << 40) ^ (1 << 60) ^ (1 << 61)  # 4개 구간에 6비트
+        self.assertEqual(find_near_duplicate(spread), question)
+        self.assertIsNone(find_near_duplicate(spread ^ (1 << 62)))  # 거리 7
+
+    def test_repost_reuses_original_analysis_and_links_original(self):
+        from .ai_system.ai_system import ForDjango, django_config
+
+        self.post_question(self.jpeg(1))  # AI 분석 없이 등록한 원본
+        original = Question.objects.get()
+        config = dict(django_config(), selected_detectors=['yolo'], selected_predictors=['fairface'])
+        face_analysis = save_face_analysis(original.image1.path, os.path.basename(original.image1.name)[:64],
+                                           ForDjango(config, None, None).analysis_fingerprint(),
+                                           ([(1, 2, 3, 4)], '1', None, None), [], labeled=False)
+
+        response = self.post_question(self.jpeg(1, size=(200, 150), quality=60), detectors=['yolo'], predictors=['fairface'])
+
+        self.assertEqual(response.status_code, 200)
+        repost = Question.objects.exclude(pk=original.pk).get()
+        self.assertEqual(repost.image_hash.original, original)
+        answer = Answer.objects.get(question=repost)
+        self.assertEqual(answer.face_analysis, face_analysis)
+        self.assertIn('재사용', answer.content)
+        self.assertContains(self.client.get(reverse('pybo:detail', args=[repost.id])), '같은 사진의 원본 질문')
+
+    def test_modified_image_repoints_later_duplicates(self):
+        for image in (self.jpeg(1), self.jpeg(1, size=(200, 150), quality=60), self.jpeg(1, size=(300, 225), quality=70)):
+            self.post_question(image)
+        first, second, third = Question.objects.order_by('id')
+        self.assertEqual([second.image_hash.original, third.image_hash.original], [first, first])
+        url = reverse('pybo:detail', args=[third.id])
+        etag = self.client.get(url)['ETag']
+
+        image = self.jpeg(2).getvalue()
+        response = self.client.post(reverse('pybo:question_modify', args=[first.id]), {
+            'subject': '제목', 'content': '내용',
+            'image1': SimpleUploadedFile('c.jpg', image, 'image/jpeg'),
+            'image2': SimpleUploadedFile('d.jpg', image, 'image/jpeg')})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(find_near_duplicate(dhash(self.jpeg(2))), first)
+        second.image_hash.refresh_from_db()
+        third.image_hash.refresh_from_db()
+        self.assertIsNone(second.image_hash.original)  # 먼저 올린 비슷한 질문이 없음
+        self.assertEqual(third.image_hash.original, second)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)  # 원본 링크가 바뀌어 ETag도 바뀜
+
+    def test_undecodable_or_cleared_image_drops_hash(self):
+        self.post_question(self.jpeg(1))
+        self.post_question(self.jpeg(1, size=(200, 150), quality=60))
+        first, second = Question.objects.order_by('id')
+
+        update_image_hash(first, ContentFile(b'not an image'))
+
+        self.assertFalse(ImageHash.objects.filter(question=first).exists())
+        self.assertIsNone(ImageHash.objects.get(question=second).original)
+        self.assertEqual(find_near_duplicate(dhash(self.jpeg(1))), second)  # 이전 이미지로 찾아지지 않음
+
+        update_image_hash(second, None)
+        self.assertFalse(ImageHash.objects.exists())
@@ -0,0 +1,123 @@
+import hashlib  # 업로드 내용의 해시를 스트리밍으로 계산
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+# =======================================
+# 이미지 파일 시그니처 (매직 바이트)
+# =======================================
+# 클라이언트가 보낸 Content-Type은 믿지 않고 파일 앞부분의 바이트로 형식을 판별한다.
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+# 형식 판별에 필요한 최소 바이트 수
+SIGNATURE_LENGTH = max(len(signature) for signature, _ in IMAGE_SIGNATURES)
+
+
+def sniff_image_type(header):
+    """ 파일 앞부분(header)으로 이미지 MIME 타입을 판별 (이미지가 아니면 None) """
+    for signature, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    return None
+
+# =======================================
+# 업로드 검증 핸들러
+# =======================================
+class ImageUploadHandler(FileUploadHandler):
+    """
+    업로드되는 파일을 스트리밍 중에 검증하는 업로드 핸들러
+
+    이미지를 올리는 뷰에서만 validate_image_uploads로 기본 핸들러 앞에 추가하여 다른 핸들러보다 먼저 청크를 받는다.
+    (관리자 페이지 등 다른 업로드에는 적용하지 않음)
+    - 첫 청크의 매직 바이트로 형식을 판별해 ALLOWED_FILE_TYPES가 아니면 즉시 중단
+    - 받은 크기가 MAX_UPLOAD_SIZE를 넘는 순간 중단 (나머지는 디스크/메모리에 쓰지 않고 버림)
+    - 청크를 받으면서 SHA-256 해시를 계산 (중복 제거용, 파일을 다시 읽지 않음)
+
+    검증에 실패한 파일은 SkipFile로 건너뛰고, 오류 메시지는 request.upload_errors에,
+    정상 파일의 해시는 request.upload_digests에 필드 이름별로 기록한다.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = getattr(settings, 'MAX_UPLOAD_SIZE', None)
+        self.allowed_types = set(getattr(settings, 'ALLOWED_FILE_TYPES', ()))
+        if request is not None:
+            request.upload_errors = {}
+            request.upload_digests = {}
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.received = 0
+        self.header = b''
+        self.sniffed_type = None
+        self.hasher = hashlib.sha256()
+        # 파트 헤더에 크기가 있으면 본문을 받기 전에 거절
+        if content_length is not None:
+            self._check_size(content_length)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        self._check_size(self.received)
+
+        # 첫 청크에서 형식 판별 (청크가 아주 작으면 판별에 필요한 만큼 모아서 판별)
+        if self.sniffed_type is None:
+            self.header += raw_data[:SIGNATURE_LENGTH - len(self.header)]
+            if len(self.header) >= SIGNATURE_LENGTH:
+                self.sniffed_type = sniff_image_type(self.header)
+                if self.sniffed_type is None or self.sniffed_type not in self.allowed_types:
+                    self._reject("지원하지 않는 파일 형식입니다. (JPEG, PNG, GIF만 업로드할 수 있습니다)")
+
+        self.hasher.update(raw_data)
+        return raw_data  # 다음 핸들러(메모리/임시 파일)로 전달
+
+    def file_complete(self, file_size):
+        if self.request is not None:
+            if self.sniffed_type is None:
+                # 형식 판별에 필요한 크기보다 작은 파일은 이미지가 아님
+                self.request.upload_errors[self.field_name] = "지원하지 않는 파일 형식입니다."
+            else:
+                self.request.upload_digests[self.field_name] = self.hasher.hexdigest()
+        return None  # 파일 객체는 다음 핸들러(메모리/임시 파일)가 생성
+
+    def _check_size(self, size):
+        if self.max_size is not None and size > self.max_size:
+            self._reject("파일 크기는 {} 이하여야 합니다.".format(filesizeformat(self.max_size)))
+
+    def _reject(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+
+def validate_image_uploads(view):
+    """
+    뷰의 업로드를 ImageUploadHandler로 검증하는 데코레이터
+
+    업로드 핸들러는 request.POST/FILES를 읽기 전에 추가해야 하는데 CSRF 미들웨어가 먼저 request.POST를 읽으므로,
+    미들웨어의 검사는 건너뛰고(csrf_exempt) 핸들러를 추가한 뒤 뷰에서 CSRF를 검사한다(csrf_protect).
+    """
+    protected_view = csrf_protect(view)
+
+    @wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return protected_view(request, *args, **kwargs)
+    return csrf_exempt(wrapped_view)
+
+# =======================================
+# 검증 결과 전달
+# =======================================
+def upload_form_kwargs(request):
+    """ ImageUploadHandler가 기록한 검증 결과를 폼 생성 인자로 반환 (request.FILES 접근 이후에 호출) """
+    return {
+        'upload_errors': getattr(request, 'upload_errors', {}),
+        'upload_digests': getattr(request, 'upload_digests', {}),
+    }
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import base_views, question_views, answer_views, comment_view
+from .views import base_views, question_views, answer_views, comment_view, ai_views
 
 app_name = 'pybo'  # URL 네임스페이스. 다른 앱의 URL 패턴과 충돌하지 않도록 설정
 
@@ -70,4 +70,17 @@ urlpatterns = [
     
     # 질문에 대한 댓글 삭제. comment_id를 받아 해당 댓글을 삭제하는 comment_view.comment_delete_question 함수 호출.
     path('comment/delete/question/<int:comment_id>/', comment_view.comment_delete_question, name='comment_delete_question'),
+
+    ###########################################################################################################
+    # ai_views.py 관련 URL
+    ###########################################################################################################
+
+    # AI 분석 대기열 상태 (관리자 전용). 대기 작업 수와 작업 클래스별 대기 시간을 JSON으로 반환하는 ai_views.ai_status 함수 호출.
+    path('ai/status/', ai_views.ai_status, name='ai_status'),
+
+    # AI 결과 이미지. analysis_id를 받아 원본 이미지와 저장된 분석 결과로 결과 이미지를 그리는 ai_views.analysis_image 함수 호출.
+    path('ai/analysis/<int:analysis_id>/image/', ai_views.analysis_image, name='analysis_image'),
+
+    # 얼굴 검색. analysis_id와 클릭한 위치(x, y)를 받아 같은 사람이 있는 질문을 보여주는 ai_views.face_search 함수 호출.
+    path('ai/analysis/<int:analysis_id>/similar/', ai_views.face_search, name='face_search'),
 ]
@@ -0,0 +1,146 @@
+import atexit  # 프로세스 종료 시 남은 조회수를 반영하기 위한 모듈
+import logging  # 로그 출력을 위한 모듈
+import threading  # 버퍼 동시 접근을 막기 위한 락
+from collections import Counter  # 질문별 조회수 누적
+
+from django.conf import settings
+from django.core.cache import cache  # 세션별 중복 조회 판별에 사용할 로컬 캐시
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connections
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .models import Question
+
+logger = logging.getLogger('pybo')
+
+# =======================================
+# 조회수 버퍼 (프로세스 메모리)
+# =======================================
+class ViewCountBuffer:
+    """
+    질문 조회수 증가분을 프로세스 메모리에 모아두었다가 한 번의 UPDATE로 반영하는 버퍼
+
+    detail 뷰에서 매번 question.save()를 호출하면 Question.save의 이미지 파일 처리 로직을 타고,
+    동시에 들어온 요청끼리 조회수를 덮어쓰는 경쟁 조건이 생긴다.
+    이 버퍼는 증가분만 누적하고, 플러시할 때
+    UPDATE ... SET view_count = view_count + n 형태로 DB에서 원자적으로 더한다.
+    """
+
+    def __init__(self, flush_interval, max_pending):
+        self.flush_interval = flush_interval  # 플러시 주기(초)
+        self.max_pending = max_pending  # 이 개수 이상 쌓이면 주기와 상관없이 플러시
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._stopped = threading.Event()
+        self._worker = None
+        # 증가분을 기록할 때의 DB 이름 (종료 시 다른 DB에 반영하지 않도록 확인)
+        self.database_name = None
+
+    def add(self, question_id, count=1):
+        """ 조회수 증가분을 버퍼에 누적 (max_pending개가 쌓이면 바로 플러시, 나머지는 플러시 스레드가 주기마다 반영) """
+        self._ensure_worker()
+        with self._lock:
+            self._pending[question_id] += count
+            self.database_name = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+            due = sum(self._pending.values()) >= self.max_pending
+        if due:
+            self.flush()
+
+    def close(self):
+        """ 플러시 스레드를 멈춤 (남은 증가분은 반영하지 않음, 테스트용) """
+        self._stopped.set()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stopped.clear()
+                self._worker = threading.Thread(target=self._run, name='pybo-view-count', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        # 요청이 끊겨도 flush_interval마다 반영되도록 별도 스레드에서 플러시
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                # 요청 밖에서 DB를 사용하므로 플러시마다 이 스레드의 연결을 정리
+                close_old_connections()
+
+    def pending(self, question_id):
+        """ 아직 DB에 반영되지 않은 조회수 증가분 """
+        with self._lock:
+            return self._pending.get(question_id, 0)
+
+    def flush(self):
+        """ 누적된 증가분을 단일 UPDATE 문으로 DB에 반영하고, 반영한 질문 수를 반환 """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        # 질문별 증가분을 CASE WHEN으로 묶어 한 번의 UPDATE로 처리 (Question.save는 호출하지 않음)
+        increment = Case(
+            *[When(pk=question_id, then=Value(count)) for question_id, count in pending.items()],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
+        try:
+            Question.objects.filter(pk__in=list(pending)).update(view_count=F('view_count') + increment)
+        except DatabaseError:
+            # 반영에 실패하면 증가분을 잃지 않도록 버퍼에 되돌려 놓음
+            logger.exception("조회수 반영 중 오류 발생")
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+        return len(pending)
+
+
+# 프로세스당 하나의 버퍼를 사용
+view_count_buffer = ViewCountBuffer(
+    flush_interval=getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10),
+    max_pending=getattr(settings, 'VIEW_COUNT_MAX_PENDING', 100),
+)
+
+
+def _flush_at_exit():
+    """
+    프로세스 종료 시 남아 있는 조회수를 반영
+
+    증가분을 기록한 뒤 DB 설정이 바뀌었으면(테스트 DB 삭제 후 등) 반영하지 않는다.
+    """
+    try:
+        if view_count_buffer.database_name != connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+            return
+        view_count_buffer.flush()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+# =======================================
+# 조회수 기록
+# =======================================
+def _viewer_key(request):
+    """ 중복 조회 판별에 사용할 방문자 식별자 (세션 키, 없으면 IP 주소) """
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    if session_key:
+        return 's:{}'.format(session_key)
+    return 'a:{}'.format(request.META.get('REMOTE_ADDR', ''))
+
+
+def record_view(request, question_id):
+    """
+    질문 조회를 기록합니다.
+
+    같은 방문자가 VIEW_COUNT_DEDUPE_WINDOW(초) 안에 다시 조회하면 세지 않습니다.
+    중복 판별은 cache.add로 처리하므로 세션을 새로 저장하지 않습니다.
+
+    Returns:
+        bool: 조회수가 증가했으면 True
+    """
+    window = getattr(settings, 'VIEW_COUNT_DEDUPE_WINDOW', 30 * 60)
+    key = 'pybo:viewed:{}:{}'.format(_viewer_key(request), question_id)
+    if not cache.add(key, 1, timeout=window):
+        return False
+    view_count_buffer.add(question_id)
+    return True
@@ -0,0 +1,113 @@
+import hashlib
+import mimetypes
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from ..ai_system.admission import admission_controller
+from ..ai_system.scheduler import analysis_scheduler
+from ..face_analysis import face_at_point
+from ..face_search import face_search_index
+from ..models import FaceAnalysis
+from ..render_cache import rendered_image_cache
+
+# =======================================
+# AI 분석 상태 뷰 (관리자 전용)
+# =======================================
+@staff_member_required(login_url='common:login')
+def ai_status(request):
+    """
+    AI 분석 대기열 상태를 JSON으로 반환합니다.
+
+    - worker: 이 워커 프로세스의 스케줄러 (실행 중인 작업 수, 클래스별 대기 작업 수와 대기 시간, 거절 수)
+    - admission: 이 워커 프로세스의 수락 제어 (처리 중인 예상 비용, 단계별 수락 수)
+    - render_cache: 이 워커 프로세스의 결과 이미지 캐시 (보관 수, 바이트, 적중/실패 수)
+    - face_search: 이 워커 프로세스의 얼굴 검색 인덱스 (얼굴 수, 목록 수, 마지막으로 추가한 id, 아직 만들지 않았으면 null)
+    - cascade: 이 워커 프로세스에서 실행한 탐지기 캐스케이드 통계 (탐지기별 실행/건너뜀 수, 다음 단계로 넘긴 이유)
+    - server: 추론 서버의 배치/대기열/캐스케이드 통계 (서버가 없거나 응답하지 않으면 null)
+    """
+    # 추론 서버 클라이언트는 numpy를 사용하므로 이 뷰를 처음 호출할 때 import
+    from ..ai_system.cascade import cascade_stats
+    from ..ai_system.inference_client import InferenceClient, InferenceUnavailable
+
+    server = None
+    client = InferenceClient.from_settings()
+    if client is not None:
+        try:
+            server = client.ping()
+        except InferenceUnavailable:
+            pass
+    return JsonResponse({
+        'worker': analysis_scheduler.snapshot(),
+        'admission': admission_controller.snapshot(),
+        'render_cache': rendered_image_cache.snapshot(),
+        'face_search': face_search_index.snapshot(),
+        'cascade': cascade_stats.snapshot(),
+        'server': server,
+    })
+
+
+# =======================================
+# AI 결과 이미지 뷰 (저장된 분석 결과로 요청 시 그림)
+# =======================================
+def analysis_image(request, analysis_id):
+    """
+    원본 이미지와 저장된 분석 결과(FaceAnalysis)로 결과 이미지를 그려서 반환합니다.
+
+    - ForDjango._draw_results와 같은 방식으로 그리므로, 분석 시 파일로 저장하던 결과 이미지와 같다.
+    - 그린 이미지는 크기가 제한된 캐시(rendered_image_cache)에 보관하여 다시 그리지 않는다.
+    - ETag는 분석 결과 ID와 그리기 방식으로 정해지므로, 재검증 요청은 DB 조회나 그리기 없이 304로 응답한다.
+      그리기 방식(ForDjango.RESULT_VERSION, 결과 인코딩 설정)이 바뀌면 ETag가 바뀌어 새로 그린다.
+    """
+    # AI 모듈은 처음 사용할 때 import (cv2 등 무거운 라이브러리를 URLconf 로드 시 불러오지 않도록)
+    from ..ai_system.ai_system import ForDjango, django_config
+
+    renderer = ForDjango(django_config(), None, None)
+    key = '{}|{}'.format(analysis_id, renderer.render_style())
+    etag = '"{}"'.format(hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        def render():
+            face_analysis = get_object_or_404(FaceAnalysis.objects.prefetch_related('faces'), pk=analysis_id)
+            try:
+                encoded = renderer.render_image(face_analysis)
+            except FileNotFoundError:  # 원본 이미지가 삭제됨
+                raise Http404("원본 이미지가 존재하지 않습니다.")
+            return mimetypes.guess_type('result' + encoded.ext)[0], encoded.data
+
+        content_type, data = rendered_image_cache.get_or_render(key, render)
+        response = HttpResponse(data, content_type=content_type)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)  # 그리기 방식이 바뀔 수 있으므로 매번 재검증
+    return response
+
+
+# =======================================
+# 얼굴 검색 뷰 (결과 이미지에서 클릭한 얼굴과 같은 사람이 있는 질문)
+# =======================================
+@login_required(login_url='common:login')
+def face_search(request, analysis_id):
+    """
+    결과 이미지에서 클릭한 얼굴과 같은 사람이 있는 다른 질문 목록을 보여줍니다.
+
+    - x, y: 결과 이미지의 원본 영역에서 클릭한 위치 (0~1, question_detail.html의 스크립트가 계산)
+    - 클릭한 위치의 얼굴 인코딩으로 얼굴 검색 인덱스(face_search_index)를 검색한다.
+    - 얼굴로 다른 질문의 사람을 찾는 기능이므로 로그인한 사용자만 사용할 수 있다.
+    """
+    face_analysis = get_object_or_404(FaceAnalysis, pk=analysis_id)
+    try:
+        x, y = float(request.GET['x']), float(request.GET['y'])
+        face = face_at_point(face_analysis, x, y)
+    except (KeyError, ValueError):
+        face = None
+    except FileNotFoundError:  # 원본 이미지가 삭제됨
+        raise Http404("원본 이미지가 존재하지 않습니다.")
+
+    matches = []
+    if face is not None and face.embedding is not None:
+        matches = face_search_index.similar_questions(face.embedding, exclude_sha256=face_analysis.image_sha256)
+    context = {'face_analysis': face_analysis, 'face': face, 'matches': matches}
+    return render(request, 'pybo/face_search.html', context)
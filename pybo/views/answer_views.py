@@ -5,6 +5,7 @@ from django.utils import timezone  # 시간 처리를 위한 유틸리티 모듈
 
 from ..forms import AnswerForm  # 답변 작성 폼
 from ..models import Question, Answer  # Question과 Answer 모델
+from ..upload_handlers import upload_form_kwargs, validate_image_uploads  # 업로드 중 검증, 검증 결과를 폼에 전달
 
 ########################################################################################################
 
@@ -13,6 +14,7 @@ from ..models import Question, Answer  # Question과 Answer 모델
 -> 로그인 상태에서만 답변을 작성할 수 있도록 로그인 필요 데코레이터 추가
 """
 @login_required(login_url='common:login')  # 로그인 상태에서만 접근 가능하게 설정, 비로그인 사용자는 로그인 페이지로 리다이렉트
+@validate_image_uploads  # 첨부 이미지를 업로드 중에 검증
 def answer_create(request, question_id):
     """ pybo 답변 등록 """
     
@@ -21,7 +23,7 @@ def answer_create(request, question_id):
     
     # POST 요청 시 답변 폼 데이터 처리
     if request.method == 'POST':
-        form = AnswerForm(request.POST, request.FILES)  # 파일 업로드 처리 (request.FILES 추가)
+        form = AnswerForm(request.POST, request.FILES, **upload_form_kwargs(request))  # 파일 업로드 처리 (request.FILES 추가, 업로드 중 검증 결과 포함)
         
         # 폼이 유효한 경우
         if form.is_valid():
@@ -1,11 +1,15 @@
 from django.core.paginator import Paginator  # 페이징 처리를 위한 Paginator 클래스
+from django.http import HttpResponse  # 캐시된 페이지를 응답으로 반환
 from django.shortcuts import render, get_object_or_404  # 뷰 처리, 객체 조회 기능
 from django.db.models import Q  # 검색 조건을 위한 Q 객체
 import logging  # 로그 출력을 위한 모듈
 
 logger = logging.getLogger('pybo')  # 'pybo'라는 로거 생성
 
+from .. import page_cache  # 페이지 및 조각 캐시
+from ..conditional import index_etag, detail_etag, not_modified, set_etag  # 조건부 요청(ETag) 처리
 from ..models import Question  # Question 모델 가져오기
+from ..view_counter import record_view  # 조회수 기록 (버퍼에 누적 후 일괄 반영)
 
 # =======================================
 # pybo 질문 목록 출력 뷰
@@ -25,6 +29,32 @@ def index(request):
     # GET 요청에서 'kw' (검색어)를 가져옵니다. 없으면 기본값으로 빈 문자열을 사용
     kw = request.GET.get('kw', '')  
     
+    # ===============================
+    # 캐시 조회 (비로그인 사용자만)
+    # ===============================
+
+    # 비로그인 사용자의 목록 페이지는 페이지 번호와 검색어별로 렌더링 결과와 ETag를 함께 캐시
+    # 캐시에 있으면 ETag를 계산하는 집계 쿼리도 실행하지 않음
+    cache_key = page_cache.index_cache_key(request, page, kw)
+    cached = page_cache.get_page(cache_key)
+    if cached is not None:
+        content, etag = cached
+    else:
+        etag = index_etag(request, page, kw)
+
+    # ===============================
+    # 조건부 요청 처리
+    # ===============================
+
+    # 브라우저가 가진 페이지와 ETag가 같으면 본문 없이 304 응답 반환
+    response = not_modified(request, etag)
+    if response is not None:
+        return set_etag(response, etag)
+
+    # 캐시된 페이지를 그대로 반환
+    if cached is not None:
+        return set_etag(HttpResponse(content), etag)
+
     # ===============================
     # 데이터 조회
     # ===============================
@@ -61,7 +91,11 @@ def index(request):
     context = {'QList': page_obj, 'page': page, 'kw': kw}  
     
     # 템플릿 'pybo/question_list.html'을 렌더링하여 응답 반환
-    return render(request, 'pybo/question_list.html', context)  
+    response = render(request, 'pybo/question_list.html', context)
+    
+    # 비로그인 사용자의 경우 렌더링 결과와 ETag를 캐시에 저장 (질문/답변/추천 변경 시 signals.py에서 무효화)
+    page_cache.set_page(cache_key, (response.content, etag))
+    return set_etag(response, etag)
 
 # =======================================
 # pybo 질문 상세 내용 출력 뷰
@@ -70,16 +104,27 @@ def detail(request, question_id):
     ''' pybo 내용 출력 '''
 
     # 주어진 question_id에 해당하는 Question 객체를 가져옵니다. 없으면 404 에러 발생
-    question = get_object_or_404(Question, pk=question_id)  
+    # 원본 질문 링크(image_hash.original_id)는 ETag에도 사용하므로 함께 가져옴
+    question = get_object_or_404(Question.objects.select_related('image_hash'), pk=question_id)
+    
+    # 조회수 기록: question.save()를 호출하지 않고 버퍼에 누적한 뒤 UPDATE 한 번으로 반영
+    record_view(request, question.id)
+    
+    # 브라우저가 가진 페이지와 ETag가 같으면 본문 없이 304 응답 반환 (조회수는 위에서 이미 기록)
+    etag = detail_etag(request, question)
+    response = not_modified(request, etag)
+    if response is not None:
+        return set_etag(response, etag)
     
     # 질문에 달린 댓글들 중, 부모가 없는 댓글들(최상위 댓글)을 가져옵니다.
     comments = question.comments.filter(parent__isnull=True)
     
     # 템플릿에 전달할 데이터 설정 (질문, 댓글)
+    # 댓글/답변 쿼리는 지연 평가되므로 템플릿에서 캐시된 조각을 사용하면 실행되지 않음
     context = {'question': question, 'comments': comments}  
     
     # 템플릿 'pybo/question_detail.html'을 렌더링하여 응답 반환
-    return render(request, 'pybo/question_detail.html', context)  
+    return set_etag(render(request, 'pybo/question_detail.html', context), etag)
 
 #########################################
 # 제네릭 뷰를 사용한 방법 (주석 처리)
@@ -0,0 +1,74 @@
+import mimetypes  # 파일 확장자로 Content-Type 추정
+import posixpath  # URL 경로 정규화
+import re  # 콘텐츠 주소 파일 이름 판별
+from pathlib import Path
+
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+# 파일 이름(확장자 제외)이 내용의 해시값인 파일 = 내용이 바뀌지 않는 파일
+CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{32,64}$')
+
+# 내용이 바뀌지 않는 파일의 브라우저 캐시 유지 시간 (1년)
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+# =======================================
+# 미디어 파일 제공 뷰 (ETag 및 캐시 헤더 포함)
+# =======================================
+def serve_media(request, path, document_root=None):
+    """
+    업로드 이미지와 AI 결과 이미지를 제공합니다.
+
+    django.views.static.serve 대신 사용하며, 조건부 요청(If-None-Match)을 처리합니다.
+    - 파일 이름이 내용 해시인 경우: 강한 ETag(해시값) + 1년 immutable 캐시, 재검증 시 파일을 열지 않음
+    - 그 외의 파일: 수정 시간과 크기로 만든 약한 ETag + 매번 재검증
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    stem = posixpath.splitext(posixpath.basename(path))[0]
+
+    # 콘텐츠 주소 파일은 이름만으로 ETag가 정해지므로 파일 시스템 호출 없이 304 응답 가능
+    if CONTENT_ADDRESSED_NAME.match(stem):
+        etag = '"{}"'.format(stem)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return _patch_immutable(response, etag)
+
+    fullpath = Path(safe_join(document_root, path))
+    try:
+        statobj = fullpath.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('"{}" 파일이 존재하지 않습니다.'.format(path))
+    if fullpath.is_dir():
+        raise Http404("디렉터리 목록은 제공하지 않습니다.")
+
+    if CONTENT_ADDRESSED_NAME.match(stem):
+        response = _file_response(fullpath, statobj)
+        return _patch_immutable(response, etag)
+
+    # 일반 파일: 수정 시간과 크기로 ETag 생성
+    etag = 'W/"{:x}-{:x}"'.format(statobj.st_size, statobj.st_mtime_ns)
+    response = get_conditional_response(request, etag=etag, last_modified=int(statobj.st_mtime))
+    if response is None:
+        response = _file_response(fullpath, statobj)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def _file_response(fullpath, statobj):
+    """ 파일 본문 응답 생성 """
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    response = FileResponse(fullpath.open('rb'), content_type=content_type or 'application/octet-stream')
+    response['Last-Modified'] = http_date(statobj.st_mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def _patch_immutable(response, etag):
+    """ 내용이 바뀌지 않는 파일의 캐시 헤더 설정 """
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
@@ -1,3 +1,5 @@
+import logging  # 로그 출력을 위한 모듈
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
@@ -5,54 +7,48 @@ from django.utils import timezone
 from django.http import JsonResponse
 from django.urls import reverse
 
-from ..ai_system.ai_pybo import start_ai
 from ..forms import QuestionForm
-from ..models import Question, Answer
+from ..image_hash import update_image_hash
+from ..models import Question
+from ..question_analysis import QuestionAnalysis
+from ..upload_handlers import upload_form_kwargs, validate_image_uploads
+from ..ai_system.scheduler import QuotaExceeded
+
+logger = logging.getLogger('pybo')
+
+
+def busy_response(error):
+    """ 사용자의 AI 분석 작업이 할당량을 넘었을 때의 응답 (429, Retry-After 헤더에 다시 시도할 때까지의 시간(초)) """
+    response = JsonResponse({'error': {'__all__': [str(error)]}, 'retry_after': error.retry_after}, status=429)
+    response['Retry-After'] = str(error.retry_after)
+    return response
 
 ########################################################################################################
 
 @login_required(login_url='common:login')
+@validate_image_uploads
 def question_create(request):
     """ pybo 질문 등록 """
     # POST 요청이면 폼 데이터 처리
     if request.method == 'POST':
-        form = QuestionForm(request.POST, request.FILES)  # 파일 업로드 처리
+        form = QuestionForm(request.POST, request.FILES, **upload_form_kwargs(request))  # 파일 업로드 처리 (업로드 중 검증 결과 포함)
         # 폼이 유효한 경우
         if form.is_valid():
+            # 비슷한 이미지를 먼저 올린 질문을 찾고, 이미지가 업로드되고 탐지기나 예측기가 선택된 경우 AI 분석 준비
+            # (원본 질문을 같은 설정으로 분석한 결과가 있으면 분석하지 않고 재사용, pybo/question_analysis.py)
+            try:
+                analysis = QuestionAnalysis.prepare(request, form.cleaned_data.get('image1'))
+            except QuotaExceeded as e:
+                # 한 사용자의 작업이 할당량을 넘으면 질문을 저장하기 전에 거절 (다시 보내도 질문이 중복 저장되지 않음)
+                logger.warning("AI 분석 요청 거절: %s", e)
+                return busy_response(e)
+
             question = form.save(commit=False)  # 데이터베이스에 저장하지 않고, 객체만 반환
             question.author = request.user  # 작성자는 현재 로그인한 사용자
             question.create_date = timezone.now()  # 현재 시간을 질문 작성일로 저장
-            question.save()
-            
-            # 이미지가 업로드된 경우 AI 처리 수행
-            if question.image1:
-                image_path = question.image1.path  # 업로드된 이미지 경로 가져오기
-                
-                # 탐지기 및 예측기 목록을 POST 요청에서 가져옴
-                selected_detectors = request.POST.getlist('detectors')
-                selected_predictors = request.POST.getlist('predictors')
-                
-                # 탐지기나 예측기가 선택되었는지 확인
-                if selected_detectors or selected_predictors:
-                    # AI 모델을 이용해 이미지 처리
-                    result_image_path = start_ai(request, image_path, selected_detectors, selected_predictors)
-                    
-                    # AI 처리 결과를 포함한 답변 생성
-                    answer = Answer(
-                        question=question,
-                        author=request.user,
-                        content="AI가 처리한 얼굴 인식 결과입니다.",
-                        answer_image=result_image_path,
-                        create_date=timezone.now(),
-                    )
-                    answer.save()  # 답변 저장
-            # 이미지 파일 저장
-            if 'image1' in request.FILES:
-                question.image1 = request.FILES['image1']
-            if 'image2' in request.FILES:
-                question.image2 = request.FILES['image2']
-            question.save()  # 최종적으로 질문을 데이터베이스에 저장
-            
+            question.save()  # 질문과 업로드된 이미지(image1, image2)를 한 번에 저장
+            analysis.finish(question)  # 지각 해시 저장, AI 분석 결과(또는 재사용한 결과)로 답변 생성
+
             # 성공 시 JsonResponse로 리다이렉트 URL 반환
             return JsonResponse({'redirect_url': reverse('pybo:index')})
         else:
@@ -69,6 +65,7 @@ def question_create(request):
 ########################################################################################################
 
 @login_required(login_url='common:login')
+@validate_image_uploads
 def question_modify(request, question_id):
     """ pybo 질문 수정 """
     # 수정할 질문을 가져옴, 없으면 404 에러 발생
@@ -81,11 +78,14 @@ def question_modify(request, question_id):
 
     # POST 요청이면 수정 처리
     if request.method == "POST":
-        form = QuestionForm(request.POST, request.FILES, instance=question)
+        form = QuestionForm(request.POST, request.FILES, instance=question, **upload_form_kwargs(request))
         if form.is_valid():
             question = form.save(commit=False)
             question.modify_date = timezone.now()  # 수정일시 저장
             question.save()  # 수정된 질문 저장
+            # 이미지1을 바꾸거나 지운 경우 지각 해시와 원본 질문을 다시 정함 (이 질문을 원본으로 가리키던 질문 포함)
+            if 'image1' in form.changed_data:
+                update_image_hash(question, form.cleaned_data['image1'])
             return JsonResponse({'redirect_url': reverse('pybo:detail', args=[question.id])})
     else:
         # GET 요청이면 기존 데이터를 폼에 담아서 전달